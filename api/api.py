@@ -1,19 +1,119 @@
+from itertools import chain
+from django.conf import settings
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import condition
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import status
-from django.db.models import Q
 from .models import Game
-from .serializers import GameSerializer
+from .filters import PLATFORMS, FilterError, filter_games, filter_key
+from .lookups import id_names, names_generation
+from .filter_index import filter_index
+from .search import SearchResults, find_by_name, search_query
+from .autocomplete import AUTOCOMPLETE_MODELS, autocomplete_index
+from .export import EXPORT_FORMATS, csv_stream, game_chunks, ndjson_stream
+from .response_cache import cached_response
+from .conditional import game_etag, game_last_modified, games_etag
+from .fragments import fragment_response, fragments_requested, game_fragments
+from .pagination import (
+    COUNT_MODES,
+    CursorError,
+    KeysetPagination,
+    StandardResultsSetPagination,
+)
+from .serializers import GameSerializer, serialize_games
+from .optimizer import optimize_queryset
+from .lsh import minhash_index
+from .text_index import blended_recommendations
+from .recommendations import (
+    recommendation_index,
+    eligible_game_ids,
+    stored_recommendations_many,
+    recommendation_holders,
+    update_recommendations,
+)
 from .schema import (
     get_game_schema,
     get_games_schema,
+    get_game_facets_schema,
+    export_games_schema,
+    search_games_schema,
+    autocomplete_schema,
     get_recommended_games_schema,
+    get_recommended_games_batch_schema,
     create_game_schema,
     update_game_schema,
     delete_game_schema,
 )
 
+# Scoring modes accepted by the recommendation endpoints
+RECOMMENDATION_MODES = ("exact", "approx", "text")
+
+# Default and maximum number of completions per kind returned by autocomplete
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+
+# Maximum number of reference games accepted by get_recommended_games_batch
+BATCH_RECOMMENDATION_LIMIT = 50
+
+# Fields of GameSerializer, and the ManyToMany relations among them
+GAME_FIELDS = GameSerializer.Meta.fields
+GAME_RELATIONS = [
+    "supported_languages",
+    "full_audio_languages",
+    "developers",
+    "publishers",
+    "categories",
+    "genres",
+    "tags",
+]
+
+"""
+Parse the sparse fieldset parameters shared by the read endpoints.
+
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            fields (optional): Comma-separated GameSerializer fields to return
+                (default: every field that is not a relation)
+            include (optional): Comma-separated relations to return, e.g.
+                "genres,tags" (default: none when fields is given)
+
+Returns:
+    None when neither parameter is given (every field is returned), otherwise
+    the frozenset of field names to return, which always contains id
+
+Raises:
+    ValueError: If a name is not a field, or include names a non-relation
+"""
+
+
+def requested_fields(request):
+    fields = request.query_params.get("fields")
+    include = request.query_params.get("include")
+    if fields is None and include is None:
+        return None
+
+    def names(value):
+        return {name.strip() for name in (value or "").split(",") if name.strip()}
+
+    if fields is None:
+        selected = set(GAME_FIELDS) - set(GAME_RELATIONS)
+    else:
+        selected = names(fields)
+    unknown = selected - set(GAME_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    included = names(include)
+    unknown = included - set(GAME_RELATIONS)
+    if unknown:
+        raise ValueError(f"Unknown relations: {', '.join(sorted(unknown))}")
+
+    return frozenset(selected | included | {"id"})
+
+
 """
 Retrieve a single game by ID or name.
 
@@ -22,16 +122,23 @@ Parameters:
         Query Parameters:
             id (optional): The unique identifier of the game to retrieve
             name (optional): The name of the game to search for (case-insensitive partial match)
+            fields (optional): Comma-separated fields to return, e.g. "id,name,price"
+            include (optional): Comma-separated relations to return, e.g. "genres,tags"
 
 Returns:
     Response object with:
         - Game data if found
         - HTTP 200 if successful
-        - HTTP 400 if neither id nor name parameter is provided
+        - HTTP 400 if neither id nor name parameter is provided, or fields or
+          include names an unknown field
         - HTTP 404 if no game matches the provided id or name
+        - HTTP 304 if the If-None-Match header matches the ETag of the game, or
+          if the game was not modified since If-Modified-Since (by id only)
 """
 
 
+@condition(etag_func=game_etag, last_modified_func=game_last_modified)
+@cached_response("get_game")
 @get_game_schema()
 @api_view(["GET"])
 def get_game(request):
@@ -44,11 +151,19 @@ def get_game(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    try:
+        fields = requested_fields(request)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Load only the columns and relations of the requested fields
+    games = optimize_queryset(Game.objects.all(), GameSerializer, fields)
+
     try:
         if pk:
-            game = Game.objects.get(pk=pk)
+            game = games.get(pk=pk)
         else:
-            game = Game.objects.filter(name__icontains=name).first()
+            game = find_by_name(games, name)
             if not game:
                 raise Game.DoesNotExist
     except Game.DoesNotExist:
@@ -56,7 +171,7 @@ def get_game(request):
             {"message": "Game does not exist"}, status=status.HTTP_404_NOT_FOUND
         )
 
-    serializer = GameSerializer(game)
+    serializer = GameSerializer(game, fields=fields)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -88,7 +203,8 @@ def create_game(request):
     serializer = GameSerializer(data=request.data)
 
     if serializer.is_valid():
-        serializer.save()
+        game = serializer.save()
+        update_recommendations(game.pk)
         return Response(
             {"message": "Game created successfully", "game": serializer.data},
             status=status.HTTP_201_CREATED,
@@ -133,7 +249,7 @@ def update_game(request):
         if pk:
             game = Game.objects.get(pk=pk)
         else:
-            game = Game.objects.filter(name__icontains=name).first()
+            game = find_by_name(Game.objects.all(), name)
             if not game:
                 raise Game.DoesNotExist
     except Game.DoesNotExist:
@@ -145,6 +261,7 @@ def update_game(request):
 
     if serializer.is_valid():
         serializer.save()
+        update_recommendations(game.pk)
         return Response(
             {"message": "Game updated successfully", "game": serializer.data},
             status=status.HTTP_200_OK,
@@ -187,7 +304,7 @@ def delete_game(request):
         if pk:
             game = Game.objects.get(pk=pk)
         else:
-            game = Game.objects.filter(name__icontains=name).first()
+            game = find_by_name(Game.objects.all(), name)
             if not game:
                 raise Game.DoesNotExist
     except Game.DoesNotExist:
@@ -195,12 +312,39 @@ def delete_game(request):
             {"message": "Game does not exist"}, status=status.HTTP_404_NOT_FOUND
         )
 
+    # Collect the lists holding the game before its rows cascade away
+    game_id = game.pk
+    holders = recommendation_holders(game_id)
     game.delete()
+    update_recommendations(game_id, holders)
     return Response(
         {"message": "Game deleted successfully"}, status=status.HTTP_204_NO_CONTENT
     )
 
 
+"""
+Return the serialized games of game_ids by id, as rendered fragments when
+`fragmented` (see api.fragments) or else as read by serialize_games().
+"""
+
+
+def serialized_games(game_ids, fields, fragmented):
+    if fragmented:
+        return game_fragments(game_ids, fields)
+    return {game["id"]: game for game in serialize_games(game_ids, fields)}
+
+
+"""Return the paginated response of the games of game_ids."""
+
+
+def paginated_games(paginator, game_ids, fields, fragmented):
+    games = serialized_games(game_ids, fields, fragmented)
+    response = paginator.get_paginated_response(
+        [games[game_id] for game_id in game_ids if game_id in games]
+    )
+    return fragment_response(response.data) if fragmented else response
+
+
 """
 Get a paginated list of games with optional filtering and sorting.
 
@@ -209,8 +353,13 @@ Parameters:
         Query Parameters:
             filterBy (optional): Filter games using the following syntax:
                 - genre(Action,RPG): Filter by one or more genres (comma-separated)
+                - tag(...), category(...), developer(...), publisher(...),
+                  language(...): Filter by other attributes the same way; prefix
+                  the first value with 'all:' to require all of them, e.g. "tag(all:Indie,Roguelike)"
                 - platform(windows,mac,linux): Filter by one or more platforms (comma-separated)
                 - year(2021,2022): Filter by one or more release years (comma-separated)
+                - price(0,19.99): Filter by price range (either bound may be empty)
+                - requiredAge(0,16): Filter by required age range (either bound may be empty)
                 Multiple filters can be combined, e.g. "genre(Action)&platform(windows,mac)"
             
             sortBy (optional): Sort results by one of:
@@ -224,108 +373,452 @@ Parameters:
             
             page (optional): Page number for pagination (default: 1)
             pageSize (optional): Number of results per page (default: 100, max: 100)
+            pagination (optional): 'cursor' to use keyset pagination instead of page numbers
+            cursor (optional): Position returned in the 'next' link of a cursor-paginated page
+            count (optional): How the total number of results is reported
+                - exact: Exact count, cached until the next write to a game (default)
+                - estimate: Cached or sampled estimate, see count_exact
+                - none: No count; only the rows up to the next page are read
+                Page number listings are served from the in-memory catalog
+                (settings.GAME_LISTING_INDEX), where counts are always exact
+            fields (optional): Comma-separated fields to return, e.g. "id,name,price"
+            include (optional): Comma-separated relations to return, e.g. "genres,tags"
 
 Returns:
     Response object with:
-        - count: Total number of matching results
+        - count: Total number of matching results (page number pagination only,
+          null when count=none)
+        - count_exact: Whether count is exact (page number pagination only)
         - next: URL for next page of results (null if none)
-        - previous: URL for previous page (null if none)
+        - previous: URL for previous page (null if none, page number pagination only)
         - results: Array of games for current page
         - HTTP 200 if successful
+        - HTTP 400 if filterBy, count, fields, include or the cursor is malformed
+        - HTTP 304 if the If-None-Match header matches the ETag of the page
 """
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 100
-    page_size_query_param = "pageSize"
-    max_page_size = 100
-
-
+@condition(etag_func=games_etag)
+@cached_response("get_games")
 @get_games_schema()
 @api_view(["GET"])
 def get_games(request):
-    paginator = StandardResultsSetPagination()
     games = Game.objects.all()
 
-    # Process filterBy parameter to filter games by genre, platform and year
-    filter_by = request.query_params.get("filterBy", "")
-    if filter_by:
-        # Filter by genre - matches games containing any of the specified genres
-        if "genre(" in filter_by:
-            genres = filter_by.split("genre(")[1].strip(")").split(",")
-            genres_query = None
-            for genre in genres:
-                if genres_query is None:
-                    genres_query = Q(genres__icontains=genre.strip())
-                else:
-                    genres_query |= Q(genres__icontains=genre.strip())
-            if genres_query:
-                games = games.filter(genres_query)
-
-        # Filter by platform - matches games available on any of the specified platforms
-        if "platform(" in filter_by:
-            platforms = filter_by.split("platform(")[1].strip(")").split(",")
-            platform_query = None
-            for platform in platforms:
-                platform = platform.strip().lower()
-                if platform == "windows":
-                    new_query = Q(windows=True)
-                if platform == "mac":
-                    new_query = Q(mac=True)
-                if platform == "linux":
-                    new_query = Q(linux=True)
-                else:
-                    continue
-
-                if platform_query is None:
-                    platform_query = new_query
-                else:
-                    platform_query |= new_query
-            if platform_query:
-                games = games.filter(platform_query)
-
-        # Filter by release year - matches games released in any of the specified years
-        if "year(" in filter_by:
-            years = filter_by.split("year(")[1].strip(")").split(",")
-            year_query = None
-            for year in years:
-                if year_query is None:
-                    year_query = Q(release_date__year=year.strip())
-                else:
-                    year_query |= Q(release_date__year=year.strip())
-            if year_query:
-                games = games.filter(year_query)
+    try:
+        fields = requested_fields(request)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Process filterBy parameter to filter games by genre, platform, year, price
+    # and required age (see api.filters for the grammar)
+    try:
+        games = filter_games(games, request.query_params.get("filterBy", ""))
+    except FilterError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Apply sortBy parameter to sort games by metacritic_score, price and release_date
     # Apply sortOrder parameter to sort direction, either 'asc' or 'desc' (default: desc)
     sort_by = request.query_params.get("sortBy", "")
     sort_order = request.query_params.get("sortOrder", "desc").lower()
 
-    if sort_by:
-        sort_field = ""
-        if sort_by.lower() == "metacriticscore":
-            sort_field = "metacritic_score"
-        if sort_by.lower() == "price":
-            sort_field = "price"
-        if sort_by.lower() == "releasedate":
-            sort_field = "release_date"
-
-        if sort_field:
-            if sort_order == "asc":
-                games = games.order_by(sort_field)
-            else:
-                games = games.order_by(f"-{sort_field}")
+    sort_field = ""
+    if sort_by.lower() == "metacriticscore":
+        sort_field = "metacritic_score"
+    if sort_by.lower() == "price":
+        sort_field = "price"
+    if sort_by.lower() == "releasedate":
+        sort_field = "release_date"
+
+    # Pages are read as ids (and the sort key, read back to build cursors),
+    # and their games are then serialized from .values() rows, or assembled
+    # from their cached JSON with the fragment cache (see api.fragments)
+    fragmented = fragments_requested(request)
+    games = games.only("id", *([sort_field] if sort_field else []))
+
+    # Apply count parameter: exact counts are cached per normalized filterBy and
+    # catalog generation; 'estimate' and 'none' avoid counting every match.
+    # Attribute names are resolved to ids, so renaming one changes the key too
+    count_mode = request.query_params.get("count", "exact").lower()
+    if count_mode not in COUNT_MODES:
+        return Response(
+            {"message": f"count must be one of: {', '.join(COUNT_MODES)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Page-number listings are answered by the in-memory catalog: filters are
+    # bitwise operations, the count is a popcount (exact even when an estimate
+    # is asked for), and only the games of the page are read from the database
+    if settings.GAME_LISTING_INDEX and not KeysetPagination.requested(request):
+        matched = filter_index.match(
+            request.query_params.get("filterBy", ""),
+            sort_field or None,
+            descending=sort_order != "asc",
+        )
+        paginator = StandardResultsSetPagination()
+        result_page = paginator.paginate_queryset(matched, request)
+        if count_mode == "none":
+            paginator.count, paginator.count_exact = None, False
+        return paginated_games(paginator, result_page, fields, fragmented)
+
+    # Opt-in keyset pagination: pages by (sort key, id) with an opaque cursor,
+    # so deep pages cost no more than the first one and no count is computed
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination()
+        try:
+            result_page = paginator.paginate_queryset(
+                games,
+                request,
+                sort_field or "id",
+                descending=bool(sort_field) and sort_order != "asc",
+            )
+        except CursorError as error:
+            return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return paginated_games(
+            paginator, [game.pk for game in result_page], fields, fragmented
+        )
+
+    # Ties are broken by id in the sort direction and games without a value
+    # come last, as in the in-memory catalog and with keyset pagination
+    if sort_field:
+        if sort_order == "asc":
+            games = games.order_by(F(sort_field).asc(nulls_last=True), "id")
+        else:
+            games = games.order_by(F(sort_field).desc(nulls_last=True), "-id")
 
     # Paginate and serialize the filtered/sorted results
+    paginator = StandardResultsSetPagination(
+        count_key=(
+            f"games:{names_generation()}:"
+            f"{filter_key(request.query_params.get('filterBy', ''))}"
+        ),
+        count_mode=count_mode,
+    )
     result_page = paginator.paginate_queryset(games, request)
-    serializer = GameSerializer(result_page, many=True)
+    return paginated_games(
+        paginator, [game.pk for game in result_page], fields, fragmented
+    )
+
+
+"""
+Count the games matching a filterBy expression by genre, tag, category,
+platform and release year, e.g. to show "Action (12,341)" next to filters.
+
+Counts come from the in-memory catalog: the counts of the whole catalog are
+counters kept current as games are created, updated and deleted, and those of
+a filtered listing are computed in one pass over the match.
+
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            filterBy (optional): Filter expression, as for get_games
+
+Returns:
+    Response object with:
+        - count: Number of matching games
+        - facets: genres, tags and categories as {id, name, count} objects,
+          most common first; platforms as {name, count} objects; years as
+          {year, count} objects in ascending order. Values no matching game
+          has are left out
+        - HTTP 200 if successful
+        - HTTP 400 if filterBy is malformed
+"""
+
+
+@get_game_facets_schema()
+@api_view(["GET"])
+def get_game_facets(request):
+    try:
+        count, counts = filter_index.facets(request.query_params.get("filterBy", ""))
+    except FilterError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    facets = {}
+    for relation in ("genres", "tags", "categories"):
+        names = id_names(Game._meta.get_field(relation).related_model)
+        values = [
+            {"id": value, "name": names[value], "count": counts[(relation, value)]}
+            for kind, value in counts
+            if kind == relation and value in names
+        ]
+        facets[relation] = sorted(values, key=lambda v: (-v["count"], v["name"]))
+    facets["platforms"] = [
+        {"name": platform, "count": counts[("platform", platform)]}
+        for platform in PLATFORMS
+        if ("platform", platform) in counts
+    ]
+    facets["years"] = [
+        {"year": year, "count": counts[(kind, year)]}
+        for kind, year in sorted(key for key in counts if key[0] == "year")
+    ]
+    return Response({"count": count, "facets": facets}, status=status.HTTP_200_OK)
+
+
+"""
+Stream every game matching a filterBy expression as NDJSON or CSV.
+
+Meant for clients mirroring the catalog: games are written in id order as
+they are read, a chunk at a time, without counting or paginating them, so
+the memory used does not depend on the number of games exported.
+
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            filterBy (optional): Filter expression, as for get_games
+            output (optional): 'ndjson' (default), one JSON object per line,
+                or 'csv', with a header row and relations joined by '|'
+            fields (optional): Comma-separated fields to return, e.g. "id,name,price"
+            include (optional): Comma-separated relations to return, e.g. "genres,tags"
+
+Returns:
+    StreamingHttpResponse with the games as an attachment (HTTP 200), or a
+    Response with HTTP 400 if output, filterBy, fields or include is invalid
+"""
+
+
+@export_games_schema()
+@api_view(["GET"])
+def export_games(request):
+    output = request.query_params.get("output", "ndjson").lower()
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {"message": f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        fields = requested_fields(request)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # The whole request is validated before streaming starts, since an error
+    # raised while streaming could no longer be answered with a 400: the
+    # filters are built, and the first chunk is read so that the database has
+    # accepted the query
+    try:
+        games = filter_games(
+            Game.objects.all(), request.query_params.get("filterBy", "")
+        )
+        chunks = game_chunks(games.only("id"))
+        first_chunk = next(chunks, None)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    if first_chunk is not None:
+        chunks = chain([first_chunk], chunks)
+
+    stream = ndjson_stream if output == "ndjson" else csv_stream
+    response = StreamingHttpResponse(
+        stream(chunks, fields),
+        content_type=EXPORT_FORMATS[output],
+    )
+    response["Content-Disposition"] = f'attachment; filename="games.{output}"'
+    return response
+
+
+"""
+Search games by name and description, best matches first.
+
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            q: Words to search for; games must contain all of them, in their
+               name or description, and the last word also matches as a prefix
+               (e.g. "elden ri"). Matches in the name rank above matches in the
+               description.
+            page (optional): Page number for pagination
+            pageSize (optional): Number of results per page (default: 100, max: 100)
+            fields (optional): Comma-separated fields to return, e.g. "id,name,price"
+            include (optional): Comma-separated relations to return, e.g. "genres,tags"
+
+Returns:
+    Response object with:
+        - count: Total number of matching games
+        - count_exact: Always true
+        - next: URL for next page of results (null if none)
+        - previous: URL for previous page (null if none)
+        - results: Array of games for current page
+        - HTTP 200 if successful
+        - HTTP 400 if q has no words, or fields or include is malformed
+"""
+
+
+@search_games_schema()
+@api_view(["GET"])
+def search_games(request):
+    query = search_query(request.query_params.get("q", ""))
+    if query is None:
+        return Response(
+            {"message": "Please provide words to search for in the q parameter"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
+    try:
+        fields = requested_fields(request)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # The full-text index ranks the matches and yields the ids of one page;
+    # only the games of that page are loaded
+    paginator = StandardResultsSetPagination()
+    result_page = paginator.paginate_queryset(
+        SearchResults(
+            query, optimize_queryset(Game.objects.all(), GameSerializer, fields)
+        ),
+        request,
+    )
+    serializer = GameSerializer(result_page, many=True, fields=fields)
     return Response(
         paginator.get_paginated_response(serializer.data).data,
         status=status.HTTP_200_OK,
     )
 
 
+"""
+Complete a typed prefix into game names and attribute values.
+
+Meant to be called on every keystroke of a search box: completions come from
+an in-memory index, without querying the games. When the text as typed has
+fewer than `limit` completions of a kind, misspelled words are corrected and
+the completions of the corrected text are added.
+
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            q: Typed text; leading spaces and case are ignored
+            types (optional): Comma-separated kinds among game, genre, tag,
+                developer and publisher (default: all)
+            limit (optional): Maximum number of completions per kind
+                (default: 10, max: 50)
+
+Returns:
+    Response object with:
+        - query: The text as typed
+        - corrected: Corrected text used for some completions, or null
+        - results: Completions of each requested kind, as {id, name} objects
+          in alphabetical order
+        - HTTP 200 if successful
+        - HTTP 400 if types names an unknown kind or limit is not a positive integer
+"""
+
+
+@autocomplete_schema()
+@api_view(["GET"])
+def autocomplete(request):
+    text = request.query_params.get("q", "")
+    kinds = [
+        kind.strip().lower()
+        for kind in request.query_params.get("types", "").split(",")
+        if kind.strip()
+    ] or list(AUTOCOMPLETE_MODELS)
+    unknown = [kind for kind in kinds if kind not in AUTOCOMPLETE_MODELS]
+    if unknown:
+        return Response(
+            {
+                "message": f"Unknown types: {', '.join(unknown)}. "
+                f"Valid types are {', '.join(AUTOCOMPLETE_MODELS)}"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        limit = int(request.query_params.get("limit", AUTOCOMPLETE_LIMIT))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response(
+            {"message": "limit must be a positive integer"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    completions, corrected = autocomplete_index.complete(
+        text, list(dict.fromkeys(kinds)), min(limit, MAX_AUTOCOMPLETE_LIMIT)
+    )
+    return Response(
+        {
+            "query": text,
+            "corrected": corrected,
+            "results": {
+                kind: [{"id": pk, "name": name} for pk, name in found]
+                for kind, found in completions.items()
+            },
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+"""
+Parse the scoring options shared by the recommendation endpoints.
+
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            mode (optional): 'exact' (default), 'approx' or 'text'
+            textWeight (optional): Share of text similarity in 'text' mode (0 to 1)
+            filterBy (optional): Constraints on the recommended games
+
+Returns:
+    dict with the mode, the text weight and the eligible game ids (see
+    eligible_game_ids(), None when unconstrained)
+
+Raises:
+    ValueError: If an option is invalid (FilterError is a subclass)
+"""
+
+
+def recommendation_options(request):
+    mode = request.query_params.get("mode", "exact").lower()
+    if mode not in RECOMMENDATION_MODES:
+        raise ValueError(f"mode must be one of {', '.join(RECOMMENDATION_MODES)}")
+
+    try:
+        text_weight = float(request.query_params.get("textWeight", 0.5))
+    except ValueError:
+        text_weight = -1
+    if not 0 <= text_weight <= 1:
+        raise ValueError("textWeight must be a number between 0 and 1")
+
+    return {
+        "mode": mode,
+        "text_weight": text_weight,
+        "eligible": eligible_game_ids(request.query_params.get("filterBy")),
+    }
+
+
+"""
+Rank the recommendations of several reference games.
+
+Returns:
+    dict mapping each reference game id to its list of (game_id, score) pairs
+"""
+
+
+def rank_recommendations(game_ids, options):
+    mode, eligible = options["mode"], options["eligible"]
+
+    if mode == "approx":
+        # Only score the games shortlisted by MinHash/LSH
+        return {pk: minhash_index.recommend(pk, eligible=eligible) for pk in game_ids}
+
+    if mode == "text":
+        # Blend description similarity with the attribute score
+        return {
+            pk: blended_recommendations(
+                pk, text_weight=options["text_weight"], eligible=eligible
+            )
+            for pk in game_ids
+        }
+
+    if eligible is not None:
+        # Stored lists ignore constraints, so rank the eligible games live
+        return {
+            pk: recommendation_index.recommend(pk, eligible=eligible) for pk in game_ids
+        }
+
+    # Read the precomputed neighbour lists, scoring through the in-memory index
+    # only the games that have not been materialized
+    return stored_recommendations_many(game_ids)
+
+
 """
 Get recommended games based on similarity to a reference game.
 
@@ -334,13 +827,24 @@ Parameters:
         Query Parameters:
             id (optional): The unique identifier of the reference game
             name (optional): The name of the reference game (case-insensitive partial match)
+            mode (optional): Scoring mode
+                - exact: Score every game sharing an attribute (default)
+                - approx: Only score games shortlisted by MinHash/LSH (see api.lsh)
+                - text: Blend attribute similarity with TF-IDF similarity of the
+                  name and description (see api.text_index)
+            textWeight (optional): Share of text similarity in text mode,
+                between 0 and 1 (default: 0.5)
+            filterBy (optional): Only recommend games matching these constraints,
+                using the same grammar as get_games, e.g. "platform(mac)&price(,9.99)"
+            fields (optional): Comma-separated fields to return, e.g. "id,name,price"
+            include (optional): Comma-separated relations to return, e.g. "genres,tags"
 
 Returns:
     Response object with:
         - reference_game: Name of the game used as reference
         - similar_games: List of up to 5 similar games, sorted by similarity score
         - HTTP 200 if successful
-        - HTTP 400 if neither id nor name provided
+        - HTTP 400 if neither id nor name provided, or mode, textWeight or filterBy is invalid
         - HTTP 404 if reference game not found
 
 Similarity scoring algorithm:
@@ -350,10 +854,19 @@ Similarity scoring algorithm:
     - Each matching category: 1 point
     
     Games are ranked by total score and only those with score > 0 are included.
-    The top 5 highest scoring games are returned as recommendations.
+    The top 5 highest scoring games are returned as recommendations, with ties
+    broken by ascending game id. They are read from the GameRecommendation
+    table built by `manage.py build_recommendations` and maintained on every
+    write; games without stored rows are scored through the in-memory index
+    (see api.recommendations).
+
+    With filterBy, the eligible games are matched by the in-memory catalog
+    first and the top 5 are ranked among them only, so constraints never leave
+    empty slots that a better eligible game could have filled.
 """
 
 
+@cached_response("get_recommended_games")
 @get_recommended_games_schema()
 @api_view(["GET"])
 def get_recommended_games(request):
@@ -366,62 +879,143 @@ def get_recommended_games(request):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    try:
+        options = recommendation_options(request)
+        fields = requested_fields(request)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Only the ids are loaded; the games are serialized from .values() rows,
+    # or assembled from their cached JSON (see api.fragments)
+    fragmented = fragments_requested(request)
+    games = Game.objects.only("id")
+
     try:
         # Get the reference game
         if pk:
-            reference_game = Game.objects.get(pk=pk)
+            reference_game = games.get(pk=pk)
         else:
-            reference_game = Game.objects.filter(name__icontains=name).first()
+            reference_game = find_by_name(games, name)
             if not reference_game:
                 raise Game.DoesNotExist
 
-        # Get reference game attributes
-        ref_genres = set(g.genre for g in reference_game.genres.all())
-        ref_tags = set(t.tag for t in reference_game.tags.all())
-        ref_categories = set(c.category for c in reference_game.categories.all())
+        ranked = rank_recommendations([reference_game.pk], options)[reference_game.pk]
+        serialized = serialized_games(
+            [reference_game.pk, *(game_id for game_id, _ in ranked)],
+            fields,
+            fragmented,
+        )
+        if reference_game.pk not in serialized:
+            # Deleted meanwhile
+            raise Game.DoesNotExist
+
+        data = {
+            "reference_game": serialized[reference_game.pk],
+            "recommended_games": [
+                serialized[game_id] for game_id, _ in ranked if game_id in serialized
+            ],
+        }
+        if fragmented:
+            return fragment_response(data)
+        return Response(data, status=status.HTTP_200_OK)
 
-        # Get all other games
-        all_other_games = Game.objects.exclude(pk=reference_game.pk)
+    except Game.DoesNotExist:
+        return Response(
+            {"message": "Game does not exist"}, status=status.HTTP_404_NOT_FOUND
+        )
 
-        # Score each game based on similarities
-        scored_games = []
-        for game in all_other_games:
-            score = 0
 
-            # Genre matching (weight: 3)
-            game_genres = set(g.genre for g in game.genres.all())
-            matching_genres = len(ref_genres & game_genres)
-            score += matching_genres * 3
+"""
+Get recommended games for several reference games in one request.
 
-            # Tag matching (weight: 2)
-            game_tags = set(t.tag for t in game.tags.all())
-            matching_tags = len(ref_tags & game_tags)
-            score += matching_tags * 2
+Parameters:
+    request: HTTP request object
+        Query Parameters:
+            ids: Comma-separated ids of the reference games (at most 50)
+            mode (optional): Scoring mode, 'exact' (default), 'approx' or 'text',
+                as for get_recommended_games
+            textWeight (optional): Share of text similarity in text mode
+            filterBy (optional): Constraints on the recommended games, as for
+                get_recommended_games
+            fields (optional): Fields to return for every game, as for get_games
+            include (optional): Relations to return for every game, as for get_games
 
-            # Category matching (weight: 1)
-            game_categories = set(c.category for c in game.categories.all())
-            matching_categories = len(ref_categories & game_categories)
-            score += matching_categories
+Returns:
+    Response object with:
+        - results: One entry per existing reference game, in the requested order, with
+            - reference_game: Full details of the reference game
+            - recommended_games: List of up to 5 similar games
+        - missing: Ids that do not match any game
+        - HTTP 200 if successful
+        - HTTP 400 if ids is missing, malformed or too long, or mode, textWeight
+          or filterBy is invalid
 
-            if score > 0:  # Only include games with some similarity
-                scored_games.append((score, game))
+Stored recommendations for all reference games are read in a single query and
+every game in the response is loaded with one bulk prefetch of its relations
+(see api.optimizer),
+so the number of queries does not grow with the number of reference games.
+"""
 
-        # Sort by score and get top 5
-        scored_games.sort(key=lambda x: x[0], reverse=True)
-        similar_games = [game for score, game in scored_games[:5]]
 
-        serializer_reference_game = GameSerializer(reference_game)
-        serializer_similar_games = GameSerializer(similar_games, many=True)
+@cached_response("get_recommended_games_batch")
+@get_recommended_games_batch_schema()
+@api_view(["GET"])
+def get_recommended_games_batch(request):
+    raw_ids = request.query_params.get("ids", "")
+    try:
+        ids = [int(pk) for pk in raw_ids.split(",") if pk.strip()]
+    except ValueError:
+        return Response(
+            {"message": "ids must be a comma-separated list of integers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
+    if not ids:
         return Response(
-            {
-                "reference_game": serializer_reference_game.data,
-                "recommended_games": serializer_similar_games.data,
-            },
-            status=status.HTTP_200_OK,
+            {"message": "Please provide the ids parameter"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
-    except Game.DoesNotExist:
+    if len(ids) > BATCH_RECOMMENDATION_LIMIT:
         return Response(
-            {"message": "Game does not exist"}, status=status.HTTP_404_NOT_FOUND
+            {"message": f"At most {BATCH_RECOMMENDATION_LIMIT} ids can be requested"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
+
+    try:
+        options = recommendation_options(request)
+        fields = requested_fields(request)
+    except ValueError as error:
+        return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    ids = list(dict.fromkeys(ids))
+    existing = set(Game.objects.filter(pk__in=ids).values_list("id", flat=True))
+    reference_ids = [pk for pk in ids if pk in existing]
+
+    ranked = rank_recommendations(reference_ids, options)
+
+    # Load and serialize every game appearing in the response exactly once
+    game_ids = set(reference_ids)
+    for recommendations in ranked.values():
+        game_ids.update(game_id for game_id, _ in recommendations)
+    fragmented = fragments_requested(request)
+    serialized = serialized_games(game_ids, fields, fragmented)
+
+    data = {
+        "results": [
+            {
+                "reference_game": serialized[pk],
+                "recommended_games": [
+                    serialized[game_id]
+                    for game_id, _ in ranked[pk]
+                    if game_id in serialized
+                ],
+            }
+            for pk in reference_ids
+            if pk in serialized
+        ],
+        "missing": [pk for pk in ids if pk not in existing],
+    }
+    if fragmented:
+        return fragment_response(data)
+    return Response(data, status=status.HTTP_200_OK)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # Register the signal receivers that keep in-memory indexes, attribute
+        # name lookups and game versions current
+        from . import catalog, conditional, lookups  # noqa: F401
@@ -0,0 +1,305 @@
+import bisect
+import math
+import re
+from array import array
+from collections import Counter, defaultdict
+from .catalog import CatalogIndex
+from .lookups import NAME_FIELDS, names_generation
+from .models import Developer, Game, Genre, Publisher, Tag
+
+"""
+In-memory autocompletion of game names and attribute values.
+
+Names are kept in sorted lists, one per kind of AUTOCOMPLETE_MODELS, ordered
+case-insensitively, so the names starting with a typed prefix are found by a
+binary search followed by a short forward scan.
+
+Typos are handled by a fallback on a vocabulary of the words used in those
+names: each word of the typed text that no name contains (or, for the last,
+partially typed word, that no word starts with) is replaced by the vocabulary
+word sharing the most trigrams with it, and the corrected text is completed
+the same way.
+
+Writes to games refresh only the changed names; attribute values are
+reloaded whenever their names generation changes (see lookups.py).
+"""
+
+"""Kinds of names completed, with the model holding them."""
+
+AUTOCOMPLETE_MODELS = {
+    "game": Game,
+    "genre": Genre,
+    "tag": Tag,
+    "developer": Developer,
+    "publisher": Publisher,
+}
+
+"""Words added to the vocabulary: letters only, at least three of them."""
+
+WORD_PATTERN = re.compile(r"[^\W\d_]{3,}")
+
+"""Minimum trigram similarity for a vocabulary word to replace a typed word."""
+
+MIN_SIMILARITY = 0.3
+
+"""Number of changed games refreshed in place before the index is rebuilt instead."""
+
+REFRESH_LIMIT = 1000
+
+
+"""
+Return the trigrams of a lowercase word, padded as in pg_trgm: two spaces
+before it and, unless `partial`, one after it.
+"""
+
+
+def trigrams(word, partial=False):
+    padded = f"  {word}" if partial else f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+"""
+Names of one kind, sorted case-insensitively.
+
+Attributes:
+    names: The names, ordered by their casefolded form
+    ids: Id of the object named by each entry of names
+"""
+
+
+class SortedNames:
+    def __init__(self, entries=()):
+        entries = sorted(entries, key=lambda entry: entry[1].casefold())
+        self.names = [name for _, name in entries]
+        self.ids = array("q", [pk for pk, _ in entries])
+
+    def __len__(self):
+        return len(self.names)
+
+    """Return up to `limit` (id, name) pairs whose name starts with a casefolded prefix."""
+
+    def starting_with(self, prefix, limit):
+        names = self.names
+        position = bisect.bisect_left(names, prefix, key=str.casefold)
+        matches = []
+        for position in range(position, min(position + limit, len(names))):
+            if not names[position].casefold().startswith(prefix):
+                break
+            matches.append((self.ids[position], names[position]))
+        return matches
+
+    def insert(self, pk, name):
+        position = bisect.bisect_right(self.names, name.casefold(), key=str.casefold)
+        self.names.insert(position, name)
+        self.ids.insert(position, pk)
+
+    """Remove the entries of `pks` and return their names, by id."""
+
+    def remove(self, pks):
+        # Scanning the packed ids is much faster than keeping a mapping of
+        # every id to its position up to date
+        data = self.ids.tobytes()
+        positions = []
+        for pk in pks:
+            needle = array("q", [pk]).tobytes()
+            offset = data.find(needle)
+            while offset != -1 and offset % self.ids.itemsize:
+                offset = data.find(needle, offset + 1)
+            if offset != -1:
+                positions.append(offset // self.ids.itemsize)
+
+        removed = {}
+        for position in sorted(positions, reverse=True):
+            removed[self.ids[position]] = self.names.pop(position)
+            del self.ids[position]
+        return removed
+
+
+"""
+Words of the indexed names, with how many names use each, and their trigrams.
+
+Attributes:
+    counts: Number of names containing each word
+    postings: Trigram to the set of words containing it
+"""
+
+
+class Vocabulary:
+    def __init__(self):
+        self.counts = Counter()
+        self.postings = defaultdict(set)
+
+    def add(self, name):
+        for word in set(WORD_PATTERN.findall(name.casefold())):
+            self.counts[word] += 1
+            if self.counts[word] == 1:
+                for trigram in trigrams(word):
+                    self.postings[trigram].add(word)
+
+    def discard(self, name):
+        for word in set(WORD_PATTERN.findall(name.casefold())):
+            self.counts[word] -= 1
+            if self.counts[word] <= 0:
+                del self.counts[word]
+                for trigram in trigrams(word):
+                    self.postings[trigram].discard(word)
+                    if not self.postings[trigram]:
+                        del self.postings[trigram]
+
+    """
+    Return the vocabulary word closest to `word`, or `word` itself if it is
+    known or nothing is similar enough.
+
+    A partially typed word is compared with the beginning of the vocabulary
+    words: it is kept when one of them starts with it, otherwise the score is
+    the share of its trigrams found in the candidate. Complete words are scored
+    by trigram Jaccard similarity. Ties go to the most used word.
+    """
+
+    def correct(self, word, partial=False):
+        if word in self.counts or len(word) < 3:
+            return word
+        wanted = trigrams(word, partial)
+        # A word similar enough shares at least `needed` of these trigrams, so
+        # it is in the posting of one of the len(wanted) - needed + 1 rarest
+        needed = math.ceil(MIN_SIMILARITY * len(wanted))
+        postings = sorted(
+            (self.postings.get(trigram, ()) for trigram in wanted), key=len
+        )
+        candidates = set().union(*postings[: len(wanted) - needed + 1])
+
+        best, best_key = word, (MIN_SIMILARITY, 0)
+        for candidate in candidates:
+            if partial and candidate.startswith(word):
+                return word
+            theirs = trigrams(candidate, partial)
+            common = len(wanted & theirs)
+            if partial:
+                similarity = common / len(wanted)
+            else:
+                similarity = common / len(wanted | theirs)
+            key = (similarity, self.counts[candidate])
+            if key >= best_key:
+                if key > best_key or candidate < best:
+                    best, best_key = candidate, key
+        return best
+
+    """Return `text` with its misspelled words corrected (see correct())."""
+
+    def correct_text(self, text):
+        words = list(WORD_PATTERN.finditer(text))
+        partial = not text[-1:].isspace()
+        corrected = []
+        last = 0
+        for number, match in enumerate(words):
+            is_last = number == len(words) - 1 and match.end() == len(text)
+            corrected.append(text[last : match.start()])
+            corrected.append(self.correct(match.group(), partial and is_last))
+            last = match.end()
+        corrected.append(text[last:])
+        return "".join(corrected)
+
+
+"""
+Sorted names of every kind of AUTOCOMPLETE_MODELS and their vocabulary.
+
+Attributes:
+    names: Kind to its SortedNames
+    vocabulary: Vocabulary of the words of every name
+"""
+
+
+class AutocompleteIndex(CatalogIndex):
+    def __init__(self, register=True):
+        super().__init__(register)
+        self.names = {kind: SortedNames() for kind in AUTOCOMPLETE_MODELS}
+        self.vocabulary = Vocabulary()
+        self._names_generation = None
+
+    def _load(self, kind):
+        model = AUTOCOMPLETE_MODELS[kind]
+        field = "name" if model is Game else NAME_FIELDS[model]
+        return SortedNames(
+            model.objects.values_list("id", field).iterator(chunk_size=10000)
+        )
+
+    def build(self):
+        self.names = {kind: self._load(kind) for kind in AUTOCOMPLETE_MODELS}
+        self.vocabulary = Vocabulary()
+        for names in self.names.values():
+            for name in names.names:
+                self.vocabulary.add(name)
+        self._names_generation = names_generation()
+
+    def refresh(self, game_ids):
+        if len(game_ids) > REFRESH_LIMIT:
+            self.build()
+            return
+
+        games = self.names["game"]
+        current = dict(Game.objects.filter(pk__in=game_ids).values_list("id", "name"))
+        for name in games.remove(game_ids).values():
+            self.vocabulary.discard(name)
+        for game_id, name in current.items():
+            games.insert(game_id, name)
+            self.vocabulary.add(name)
+
+    """Reload the attribute values if they changed since they were loaded."""
+
+    def _refresh_attributes(self):
+        generation = names_generation()
+        if generation == self._names_generation:
+            return
+        for kind in AUTOCOMPLETE_MODELS:
+            if kind == "game":
+                continue
+            for name in self.names[kind].names:
+                self.vocabulary.discard(name)
+            self.names[kind] = self._load(kind)
+            for name in self.names[kind].names:
+                self.vocabulary.add(name)
+        self._names_generation = generation
+
+    """
+    Complete a typed text.
+
+    Parameters:
+        text: Typed text; leading spaces and case are ignored
+        kinds: Kinds of AUTOCOMPLETE_MODELS to complete
+        limit: Maximum number of completions per kind
+
+    Returns:
+        ({kind: [(id, name), ...]}, corrected) where corrected is the
+        corrected text used to fill in the completions, or None if the text
+        was used as typed. Completions are in alphabetical order, those of the
+        text as typed first.
+    """
+
+    def complete(self, text, kinds, limit):
+        with self._lock:
+            self.ensure_current()
+            self._refresh_attributes()
+
+            prefix = text.lstrip().casefold()
+            completions = {
+                kind: self.names[kind].starting_with(prefix, limit) for kind in kinds
+            }
+            if not prefix or all(len(found) == limit for found in completions.values()):
+                return completions, None
+
+            corrected = self.vocabulary.correct_text(prefix)
+            if corrected == prefix:
+                return completions, None
+            used = False
+            for kind, found in completions.items():
+                seen = {pk for pk, _ in found}
+                for pk, name in self.names[kind].starting_with(corrected, limit):
+                    if len(found) == limit:
+                        break
+                    if pk not in seen:
+                        found.append((pk, name))
+                        used = True
+            return completions, corrected if used else None
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,191 @@
+from array import array
+from collections import deque
+from itertools import repeat
+from operator import itemgetter
+
+"""
+Helpers for sets of small non-negative integers encoded as Python int bitsets.
+
+Bit n of a bitset is set when n belongs to the set, so intersection, union and
+difference are the &, | and & ~ operators and the size of a set is its
+popcount. All of these run in C over machine words, without hashing or
+allocating one object per element, which makes bitsets a compact and fast
+representation for attribute overlap and for sets of game ids alike.
+"""
+
+
+"""Translations between bytes of 0/1 flags and the digits of a binary string."""
+
+DIGIT_TABLE = bytes.maketrans(b"\x00\x01", b"01")
+
+FLAG_TABLE = bytes.maketrans(b"01", b"\x00\x01")
+
+
+"""Return the bitset containing the given positions."""
+
+
+def to_bitset(positions):
+    bits = 0
+    for position in positions:
+        bits |= 1 << position
+    return bits
+
+
+"""Return the positions set in a bitset, in ascending order."""
+
+
+def from_bitset(bits):
+    positions = []
+    while bits:
+        low = bits & -bits
+        positions.append(low.bit_length() - 1)
+        bits ^= low
+    return positions
+
+
+"""
+Return the bitset containing the given positions, all lower than `size`.
+
+Unlike to_bitset(), which builds a new int for every position, this marks
+the positions in a buffer of one byte per position and converts the buffer
+to an int once, with every step running in C.
+"""
+
+
+def bitset_from_positions(positions, size):
+    flags = bytearray(size)
+    deque(map(flags.__setitem__, positions, repeat(1)), maxlen=0)
+    return int(flags.translate(DIGIT_TABLE)[::-1] or b"0", 2)
+
+
+"""Positions of the bits set in each byte value, e.g. BYTE_POSITIONS[5] == (0, 2)."""
+
+BYTE_POSITIONS = tuple(
+    tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)
+)
+
+"""Number of bytes whose set bits are counted at once when skipping ahead in select_bits()."""
+
+SELECT_BLOCK = 4096
+
+
+"""
+Return up to `count` positions of a bitset, skipping the `start` lowest ones.
+
+This is how a page of a bitset is read: blocks of bits lying entirely before
+the page are skipped with one popcount each, and only the bytes of the page
+itself are decoded.
+"""
+
+
+def select_bits(bits, start, count):
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    positions = []
+    for offset in range(0, len(data), SELECT_BLOCK):
+        block = data[offset : offset + SELECT_BLOCK]
+        if start:
+            ones = int.from_bytes(block, "little").bit_count()
+            if start >= ones:
+                start -= ones
+                continue
+        for index, byte in enumerate(block, offset):
+            if not byte:
+                continue
+            for bit in BYTE_POSITIONS[byte]:
+                if start:
+                    start -= 1
+                    continue
+                positions.append(index * 8 + bit)
+                if len(positions) == count:
+                    return positions
+    return positions
+
+
+"""
+Return a bytes object whose byte n is 1 if position n is set in a bitset, else 0.
+
+Membership of many positions in arbitrary order can then be tested with
+indexing, e.g. map(flags.__getitem__, positions), without shifting the bitset.
+"""
+
+
+def bitset_flags(bits, size):
+    return format(bits, f"0{size}b")[::-1].encode().translate(FLAG_TABLE)
+
+
+"""
+Return how many of `positions` are set in the flags of bitset_flags().
+
+itemgetter() gathers the flags in one call, which is faster than indexing
+them one by one.
+"""
+
+
+def count_flags(flags, positions):
+    if len(positions) < 2:
+        return sum(map(flags.__getitem__, positions))
+    return sum(itemgetter(*positions)(flags))
+
+
+"""Return the number of positions set in a bitset."""
+
+
+def popcount(bits):
+    return bits.bit_count()
+
+
+"""
+Assigns dense bit positions to the values of one dimension (e.g. tag ids).
+
+Positions are handed out in the order values are first seen, so a dimension
+with n distinct values needs n bits however large the value ids are.
+"""
+
+
+class BitsetEncoder:
+    def __init__(self):
+        self.positions = {}
+        self.values = []
+
+    def position(self, value):
+        position = self.positions.get(value)
+        if position is None:
+            position = self.positions[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+    def encode(self, values):
+        return to_bitset(self.position(value) for value in values)
+
+    def decode(self, bits):
+        return [self.values[position] for position in from_bitset(bits)]
+
+    """Number of 64-bit words a fixed-width encoding of this dimension needs."""
+
+    def words(self):
+        return max(1, (len(self.values) + 63) // 64)
+
+
+"""
+Pack bitsets into a fixed-width array of unsigned 64-bit words.
+
+Each bitset takes `words` consecutive words, least significant word first.
+This is the layout to use when bitsets are shared through files or mmap.
+"""
+
+
+def pack_bitsets(bitsets, words):
+    mask = (1 << 64) - 1
+    packed = array("Q")
+    for bits in bitsets:
+        packed.extend((bits >> (64 * word)) & mask for word in range(words))
+    return packed
+
+
+"""Return the bitset stored at `index` in an array built by pack_bitsets()."""
+
+
+def unpack_bitset(packed, words, index):
+    return int.from_bytes(
+        packed[index * words : (index + 1) * words].tobytes(), "little"
+    )
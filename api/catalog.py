@@ -0,0 +1,264 @@
+from threading import RLock, local
+from django.core.signals import request_finished, request_started
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import CatalogChange, CatalogCounter, Game
+
+"""
+Bookkeeping shared by the in-memory indexes derived from the Game catalog.
+
+Every write to a game (saving or deleting the row, or changing one of its
+ManyToMany relations) increments a catalog generation counter stored in the
+database (see CatalogCounter), logs the affected game ids under the new
+generation (see CatalogChange) and notifies each registered index of them. An
+index refreshes only those games on its next read. When it notices
+generations it did not see locally, i.e. writes made by another worker
+process, it reads their game ids from the log and refreshes those games too;
+it is rebuilt only when the log no longer covers them.
+
+The counter is incremented and the log written in the transaction of the
+write, so other workers see them together with the written rows, and a rolled
+back write leaves them unchanged. While a request is served, the counters are
+read once, in one query, and then kept for the rest of the request.
+"""
+
+GENERATION_KEY = "catalog:generation"
+
+"""Number of most recent generations whose changes are kept in the log."""
+
+CHANGE_LOG_GENERATIONS = 10000
+
+"""The log is pruned when the generation reaches a multiple of this."""
+
+CHANGE_LOG_PRUNE_EVERY = 1000
+
+_indexes = []
+
+# Whether the thread is serving a request, and the counters read during it
+# (None until the first read)
+_request = local()
+
+
+"""
+Return the current catalog generation, 0 before the first write.
+
+Other counters kept the same way can be read by passing their name.
+"""
+
+
+def get_generation(key=GENERATION_KEY):
+    if not getattr(_request, "active", False):
+        values = CatalogCounter.objects.filter(pk=key).values_list("value", flat=True)
+        return next(iter(values), 0)
+    if _request.counters is None:
+        _request.counters = dict(CatalogCounter.objects.values_list("name", "value"))
+    return _request.counters.get(key, 0)
+
+
+"""Increment the catalog generation (or the counter named `key`) and return the new value."""
+
+
+def bump_generation(key=GENERATION_KEY):
+    counters = CatalogCounter.objects.filter(pk=key)
+    with transaction.atomic():
+        if not counters.update(value=F("value") + 1):
+            try:
+                # First write: create the counter, unless another worker just did
+                with transaction.atomic():
+                    CatalogCounter.objects.create(pk=key, value=1)
+                generation = 1
+            except IntegrityError:
+                counters.update(value=F("value") + 1)
+                generation = counters.values_list("value", flat=True).get()
+        else:
+            generation = counters.values_list("value", flat=True).get()
+    if getattr(_request, "counters", None) is not None:
+        _request.counters[key] = generation
+    return generation
+
+
+"""
+Increment the catalog generation and log the written games under it.
+
+Parameters:
+    game_ids: Ids of the written games, or None if they are not known
+
+Returns:
+    The new catalog generation
+"""
+
+
+def record_catalog_change(game_ids):
+    with transaction.atomic():
+        generation = bump_generation()
+        CatalogChange.objects.bulk_create(
+            [
+                CatalogChange(generation=generation, game_id=game_id)
+                for game_id in (game_ids if game_ids is not None else [None])
+            ]
+        )
+        if generation % CHANGE_LOG_PRUNE_EVERY == 0:
+            CatalogChange.objects.filter(
+                generation__lte=generation - CHANGE_LOG_GENERATIONS
+            ).delete()
+    return generation
+
+
+"""
+Return the ids of the games written after generation `since` up to `until`,
+or None if the log does not cover every one of those generations or holds a
+write to unknown games.
+"""
+
+
+def changed_games(since, until):
+    changes = CatalogChange.objects.filter(
+        generation__gt=since, generation__lte=until
+    ).values_list("generation", "game_id")
+    generations, game_ids = set(), set()
+    for generation, game_id in changes:
+        if game_id is None:
+            return None
+        generations.add(generation)
+        game_ids.add(game_id)
+    if len(generations) != until - since:
+        return None
+    return game_ids
+
+
+"""
+Base class for process-local indexes built from the Game catalog.
+
+Subclasses implement build() to load the whole index and refresh(game_ids)
+to reload a set of games (ids that no longer exist must be dropped). Readers
+call ensure_current() before using the index. Short-lived indexes, e.g. ones
+built by a management command, can pass register=False to stay out of the
+write notifications.
+
+An index derived from data that game writes do not produce can set
+generation_key to a counter of its own: it is then rebuilt only when that
+counter is bumped, and refreshes the games written in its own process.
+"""
+
+
+class CatalogIndex:
+    generation_key = GENERATION_KEY
+
+    def __init__(self, register=True):
+        self._lock = RLock()
+        self._generation = None
+        self._dirty = set()
+        if register:
+            _indexes.append(self)
+
+    def build(self):
+        raise NotImplementedError
+
+    def refresh(self, game_ids):
+        raise NotImplementedError
+
+    def notify(self, game_ids, generation):
+        with self._lock:
+            if self._generation is None:
+                return
+            if game_ids is None:
+                if self.generation_key == GENERATION_KEY:
+                    self._generation = None
+                return
+            self._dirty.update(game_ids)
+            # After a gap, the writes of other workers are read from the log
+            # by ensure_current()
+            if self.generation_key == GENERATION_KEY and (
+                generation == self._generation + 1
+            ):
+                self._generation = generation
+
+    def reset(self):
+        with self._lock:
+            self._generation = None
+            self._dirty.clear()
+
+    def ensure_current(self):
+        with self._lock:
+            generation = get_generation(self.generation_key)
+            changed = None
+            if (
+                self.generation_key == GENERATION_KEY
+                and self._generation is not None
+                and self._generation < generation
+            ):
+                changed = changed_games(self._generation, generation)
+            if changed is not None:
+                self._dirty.update(changed)
+                self._generation = generation
+            if self._generation != generation:
+                self.build()
+                self._dirty.clear()
+                self._generation = generation
+            elif self._dirty:
+                self.refresh(self._dirty)
+                self._dirty.clear()
+
+
+@receiver(request_started)
+def _request_started(sender, **kwargs):
+    _request.active, _request.counters = True, None
+
+
+@receiver(request_finished)
+def _request_finished(sender, **kwargs):
+    _request.active, _request.counters = False, None
+
+
+"""Drop every in-memory index so that it is rebuilt on its next read."""
+
+
+def reset_indexes():
+    for index in _indexes:
+        index.reset()
+
+
+"""
+Build every registered index up front, e.g. when a worker process starts.
+
+Errors from a database that has not been migrated yet are ignored; the
+indexes are then built lazily on first use instead.
+"""
+
+
+def warm_indexes():
+    for index in _indexes:
+        try:
+            index.ensure_current()
+        except DatabaseError:
+            index.reset()
+
+
+def _catalog_changed(game_ids):
+    generation = record_catalog_change(game_ids)
+    for index in _indexes:
+        index.notify(game_ids, generation)
+
+
+@receiver(post_save, sender=Game)
+def _game_saved(sender, instance, **kwargs):
+    _catalog_changed({instance.pk})
+
+
+@receiver(post_delete, sender=Game)
+def _game_deleted(sender, instance, **kwargs):
+    _catalog_changed({instance.pk})
+
+
+@receiver(m2m_changed)
+def _game_relations_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse and isinstance(instance, Game):
+        _catalog_changed({instance.pk})
+    elif reverse and model is Game:
+        # Clearing from the related side does not report which games were affected
+        _catalog_changed(set(pk_set) if pk_set is not None else None)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from .catalog import get_generation
+from .lookups import names_generation
+from .models import Game
+from .response_cache import normalized_params, renders_json
+
+"""
+Validators of the read endpoints, for conditional GET.
+
+A game requested by id is versioned by its updated_at time, which is also its
+Last-Modified time. It is read alone by primary key, once per request for
+both validators, and straight from the database, so that a write made by any
+worker process changes the version every other worker answers with. Writes to
+the relations of a game touch its updated_at, so that they change its version
+too.
+
+Listings and lookups by name depend on many games and are versioned by the
+catalog generation (see api.catalog) instead. Both kinds of ETags also depend
+on the attribute names generation (see api.lookups), since responses hold the
+names of genres, tags, etc., and on the normalized query parameters.
+
+The validators are meant for django.views.decorators.http.condition(), applied
+above every other decorator of a view, so that a 304 is returned before the
+response cache, the database or a serializer are reached.
+"""
+
+"""Return the {id: updated_at} times of the existing games among game_ids, in one query."""
+
+
+def games_updated_at(game_ids):
+    return dict(Game.objects.filter(pk__in=game_ids).values_list("id", "updated_at"))
+
+
+"""Return the updated_at time of a game, or None if the game does not exist."""
+
+
+def game_updated_at(game_id):
+    return games_updated_at([game_id]).get(game_id)
+
+
+def _game_id(request):
+    pk = request.GET.get("id")
+    if pk is None or not pk.isdigit() or not renders_json(request):
+        return None
+    return int(pk)
+
+
+def _requested_updated_at(request):
+    # Both validators of a request need it, so it is read once
+    if not hasattr(request, "_game_updated_at"):
+        game_id = _game_id(request)
+        request._game_updated_at = None if game_id is None else game_updated_at(game_id)
+    return request._game_updated_at
+
+
+def _etag(*parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+"""
+Return the ETag of a response of get_game, or None if it cannot be known
+without computing the response (unknown game, invalid id, browsable API).
+"""
+
+
+def game_etag(request):
+    if not renders_json(request):
+        return None
+    game_id = _game_id(request)
+    if game_id is None:
+        if "name" not in request.GET:
+            return None
+        # The game found by a name may change with any write to the catalog
+        return catalog_etag("get_game", request)
+    updated_at = _requested_updated_at(request)
+    if updated_at is None:
+        return None
+    return _etag("get_game", updated_at, names_generation(), normalized_params(request))
+
+
+"""Return the Last-Modified time of a response of get_game, if requested by id."""
+
+
+def game_last_modified(request):
+    return _requested_updated_at(request)
+
+
+"""
+Return the ETag of a response computed from the whole catalog, such as a page
+of get_games, or None for the browsable API.
+
+The host is part of the ETag because paginated responses hold absolute links.
+"""
+
+
+def catalog_etag(name, request):
+    if not renders_json(request):
+        return None
+    return _etag(
+        name,
+        get_generation(),
+        names_generation(),
+        request.scheme,
+        request.get_host(),
+        normalized_params(request),
+    )
+
+
+"""Return the ETag of a response of get_games."""
+
+
+def games_etag(request):
+    return catalog_etag("get_games", request)
+
+
+def _touch(game_ids):
+    Game.objects.filter(pk__in=game_ids).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed)
+def _game_relations_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not reverse and isinstance(instance, Game):
+        if action in ("post_add", "post_remove", "post_clear"):
+            _touch([instance.pk])
+    elif reverse and model is Game:
+        if action == "pre_clear":
+            # Clearing from the related side does not report which games were
+            # affected, so collect them while they are still related
+            field = next(
+                field
+                for field in Game._meta.many_to_many
+                if field.remote_field.through is sender
+            )
+            instance._cleared_game_ids = list(
+                Game.objects.filter(**{field.name: instance}).values_list(
+                    "id", flat=True
+                )
+            )
+        elif action == "post_clear":
+            _touch(instance.__dict__.pop("_cleared_game_ids", []))
+        elif action in ("post_add", "post_remove"):
+            _touch(list(pk_set))
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from .serializers import GameSerializer, serialize_games
+
+"""
+Streaming exports of the game catalog as NDJSON or CSV.
+
+Games are read in chunks of EXPORT_CHUNK_SIZE in id order, each chunk with a
+keyset query (id > last id of the previous chunk) for its ids, then serialized
+by serialize_games() with one query for the columns and one per relation, and
+written out before the next one is read. A worker therefore holds one chunk at a time whatever the
+size of the catalog, and no database cursor or transaction stays open while a
+slow client reads the response.
+"""
+
+EXPORT_CHUNK_SIZE = 500
+
+"""Export formats and their content types."""
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+"""Separator of the values of a relation in a CSV cell."""
+
+CSV_LIST_SEPARATOR = "|"
+
+
+"""
+Yield the games of a queryset as lists of at most `chunk_size` games, in id order.
+
+The queryset's select_related and prefetch_related apply to each chunk.
+"""
+
+
+def game_chunks(games, chunk_size=None):
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    games = games.order_by("id")
+    last_id = None
+    while True:
+        page = games if last_id is None else games.filter(id__gt=last_id)
+        chunk = list(page[:chunk_size])
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].pk
+
+
+"""Yield the serialized games of chunks as UTF-8 encoded NDJSON, a chunk at a time."""
+
+
+def ndjson_stream(chunks, fields=None):
+    for chunk in chunks:
+        rows = serialize_games([game.pk for game in chunk], fields)
+        yield "".join(
+            json.dumps(
+                row, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")
+            )
+            + "\n"
+            for row in rows
+        ).encode()
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(map(str, value))
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else value
+
+
+"""
+Yield the serialized games of chunks as UTF-8 encoded CSV, a chunk at a time.
+
+The first row holds the field names, in GameSerializer order. Relations are
+written as their names joined by CSV_LIST_SEPARATOR, booleans as true/false
+and nulls as empty cells.
+"""
+
+
+def csv_stream(chunks, fields=None):
+    columns = [
+        name for name in GameSerializer.Meta.fields if fields is None or name in fields
+    ]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in chunks:
+        for row in serialize_games([game.pk for game in chunk], fields):
+            writer.writerow([_csv_value(row[name]) for name in columns])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # No game was exported: write the header alone
+        yield buffer.getvalue().encode()
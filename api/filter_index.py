@@ -0,0 +1,606 @@
+import bisect
+import math
+from contextlib import nullcontext
+from array import array
+from datetime import date
+from decimal import Decimal
+from itertools import chain, compress, islice
+from .bitsets import (
+    bitset_flags,
+    bitset_from_positions,
+    count_flags,
+    popcount,
+    select_bits,
+)
+from .catalog import CatalogIndex
+from .filters import (
+    PLATFORMS,
+    RELATION_CLAUSES,
+    FilterError,
+    parse_filter_by,
+    parse_range,
+    parse_years,
+    relation_values,
+)
+from .lookups import name_ids
+from .models import Game
+
+"""
+In-memory columnar catalog answering filterBy and sortBy without SQL.
+
+Games are numbered by rows in id order, and the index keeps one posting per
+(relation, value id) of RELATION_CLAUSES and per platform flag, holding the
+rows of the games that have it. Any AND/OR combination of categorical clauses
+is then evaluated with bitwise operations over whole postings instead of one
+subquery per clause, the number of matches is a popcount, and a page of
+matches is read straight from the resulting bitset.
+
+Postings are kept in one of two forms, chosen per posting when the index is
+built:
+
+    dense    an int bitset, for values held by at least 1 / SPARSE_RATIO of
+             the games (popular genres, platforms, common tags)
+    sparse   a sorted array of rows, for the long tail (most developers and
+             publishers), which would otherwise cost a bitset as wide as the
+             catalog each
+
+Sparse postings are turned into bitsets only while a query uses them.
+
+The numeric columns of COLUMNS are kept as arrays indexed by row, together
+with a sort permutation per column: the live rows ordered by (value, id).
+A range clause (price, year, requiredAge) is a contiguous slice of the
+permutation found by binary search, and a sorted page is read by walking the
+permutation and keeping the rows set in the match.
+
+Postings are also kept per release year, and the number of games in every
+posting is maintained as a counter as games are written, so the facet counts
+of the whole catalog are read as they are, and those of a match take one
+popcount per posting of FACETS.
+"""
+
+"""Postings with fewer than one row in SPARSE_RATIO are stored as row arrays."""
+
+SPARSE_RATIO = 32
+
+"""Number of changed games refreshed in place before the index is rebuilt instead."""
+
+REFRESH_LIMIT = 1000
+
+"""
+Numeric Game columns kept by the index, with the conversion of their values to
+the integers stored (prices in cents, dates as ordinals).
+"""
+
+COLUMNS = {
+    "price": lambda price: int(price * 100),
+    "metacritic_score": int,
+    "release_date": date.toordinal,
+    "required_age": int,
+}
+
+"""
+Stored in place of NULL. It sorts before every value in the permutations, but
+sorted pages place the games without a value last in both directions, as the
+SQL listings do (see MatchedGames).
+"""
+
+NULL_VALUE = -(2**63)
+
+
+"""
+Sorted pages of matches covering less than 1 / SORT_RATIO of the games are
+read by sorting the matches instead of walking the sort permutation.
+"""
+
+SORT_RATIO = 16
+
+"""Posting kinds counted by facets(): relations, plus the platform and year postings."""
+
+FACETS = ("genres", "tags", "categories", "platform", "year")
+
+"""Clauses of the filterBy grammar answered by the index."""
+
+FILTER_CLAUSES = ("platform", "year", "price", "requiredage", *RELATION_CLAUSES)
+
+
+def _stored(field, value):
+    return NULL_VALUE if value is None else COLUMNS[field](value)
+
+
+def _sort_key(values):
+    return lambda row: (values[row], row)
+
+
+def _posting_bits(posting, size):
+    if isinstance(posting, int):
+        return posting
+    return bitset_from_positions(posting, size)
+
+
+"""
+Bitmap postings of the categorical attributes of every game.
+
+Attributes:
+    game_ids: Ids of the indexed games, in ascending order; row n is game_ids[n]
+    live: Bitset of the rows of games that still exist
+    postings: Mapping of (relation, value id) and ("platform", name) to the
+        rows having it, as a dense bitset or a sparse row array
+    columns: Mapping of each field of COLUMNS to its stored values, by row
+    orders: Mapping of each field of COLUMNS to its sort permutation
+"""
+
+
+class FilterIndex(CatalogIndex):
+    def __init__(self, register=True):
+        super().__init__(register)
+        self.game_ids = array("q")
+        self.rows = {}
+        self.live = 0
+        self.postings = {}
+        self.counts = {}
+        self.columns = {field: array("q") for field in COLUMNS}
+        self.orders = {field: array("i") for field in COLUMNS}
+
+    """
+    Yield the (key, game id) pairs of the indexed attributes, ordered by game id
+    within each relation.
+    """
+
+    def _attributes(self, game_ids=None):
+        games = Game.objects.order_by("id")
+        if game_ids is not None:
+            games = games.filter(pk__in=game_ids)
+        for game_id, release_date, *flags in games.values_list(
+            "id", "release_date", *PLATFORMS
+        ).iterator(chunk_size=10000):
+            for platform, flag in zip(PLATFORMS, flags):
+                if flag:
+                    yield ("platform", platform), game_id
+            if release_date is not None:
+                yield ("year", release_date.year), game_id
+
+        for relation in RELATION_CLAUSES.values():
+            field = Game._meta.get_field(relation)
+            game_column = f"{field.m2m_field_name()}_id"
+            rows = field.remote_field.through.objects.order_by(game_column).values_list(
+                game_column, f"{field.m2m_reverse_field_name()}_id"
+            )
+            if game_ids is not None:
+                rows = rows.filter(**{f"{game_column}__in": game_ids})
+            for game_id, value_id in rows.iterator(chunk_size=10000):
+                yield (relation, value_id), game_id
+
+    def build(self):
+        game_ids = array("q")
+        columns = {field: array("q") for field in COLUMNS}
+        for game_id, *values in (
+            Game.objects.order_by("id")
+            .values_list("id", *COLUMNS)
+            .iterator(chunk_size=10000)
+        ):
+            game_ids.append(game_id)
+            for field, value in zip(COLUMNS, values):
+                columns[field].append(_stored(field, value))
+        rows = {game_id: row for row, game_id in enumerate(game_ids)}
+
+        # Games are read in id order, so every posting is filled in row order
+        postings = {}
+        for key, game_id in self._attributes():
+            posting = postings.get(key)
+            if posting is None:
+                posting = postings[key] = array("i")
+            posting.append(rows[game_id])
+
+        size = len(game_ids)
+        counts = {key: len(posting) for key, posting in postings.items()}
+        for key, posting in postings.items():
+            if len(posting) * SPARSE_RATIO >= size:
+                postings[key] = bitset_from_positions(posting, size)
+
+        # sorted() is stable, so rows with equal values stay in id order
+        orders = {
+            field: array("i", sorted(range(size), key=values.__getitem__))
+            for field, values in columns.items()
+        }
+
+        self.game_ids = game_ids
+        self.rows = rows
+        self.live = (1 << size) - 1
+        self.postings = postings
+        self.counts = counts
+        self.columns = columns
+        self.orders = orders
+
+    def _clear(self, row):
+        for key, posting in self.postings.items():
+            if isinstance(posting, int):
+                if posting >> row & 1:
+                    self.postings[key] = posting & ~(1 << row)
+                    self.counts[key] -= 1
+            else:
+                index = bisect.bisect_left(posting, row)
+                if index < len(posting) and posting[index] == row:
+                    del posting[index]
+                    self.counts[key] -= 1
+
+    def _set(self, row, key):
+        self.counts[key] = self.counts.get(key, 0) + 1
+        posting = self.postings.get(key)
+        if posting is None:
+            self.postings[key] = array("i", [row])
+        elif isinstance(posting, int):
+            self.postings[key] = posting | 1 << row
+        else:
+            bisect.insort(posting, row)
+
+    def refresh(self, game_ids):
+        game_ids = sorted(game_ids)
+        if len(game_ids) > REFRESH_LIMIT:
+            self.build()
+            return
+
+        existing = {
+            game_id: values
+            for game_id, *values in Game.objects.filter(pk__in=game_ids).values_list(
+                "id", *COLUMNS
+            )
+        }
+        # The columns and permutations are edited in place: pages are read
+        # from them under the lock (see MatchedGames)
+        columns, orders = self.columns, self.orders
+        for game_id in game_ids:
+            row = self.rows.get(game_id)
+            if row is not None:
+                self._clear(row)
+                if self.live >> row & 1:
+                    for field, order in orders.items():
+                        key = _sort_key(columns[field])
+                        del order[bisect.bisect_left(order, key(row), key=key)]
+                self.live &= ~(1 << row)
+            elif game_id in existing:
+                if self.game_ids and game_id < self.game_ids[-1]:
+                    # Rows must stay in id order
+                    self.build()
+                    return
+                row = self.rows[game_id] = len(self.game_ids)
+                self.game_ids.append(game_id)
+                for values in columns.values():
+                    values.append(NULL_VALUE)
+            if game_id in existing:
+                self.live |= 1 << row
+                for field, value in zip(COLUMNS, existing[game_id]):
+                    columns[field][row] = _stored(field, value)
+                for field, order in orders.items():
+                    bisect.insort(order, row, key=_sort_key(columns[field]))
+
+        for key, game_id in self._attributes(existing):
+            self._set(self.rows[game_id], key)
+
+    """Return the bitset of the live rows whose `field` is between low and high."""
+
+    def _range_bits(self, field, low, high):
+        order = self.orders[field]
+        key = self.columns[field].__getitem__
+        # NULL never matches a range, even an open one
+        start = bisect.bisect_left(
+            order, NULL_VALUE + 1 if low is None else low, key=key
+        )
+        stop = len(order) if high is None else bisect.bisect_right(order, high, key=key)
+
+        size = len(self.game_ids)
+        if (stop - start) * 2 <= len(order):
+            return bitset_from_positions(order[start:stop], size)
+        # Broad ranges are cheaper to build from the rows outside of them
+        return self.live & ~bitset_from_positions(
+            chain(order[:start], order[stop:]), size
+        )
+
+    def _clause_bits(self, name, values):
+        size = len(self.game_ids)
+        if name == "price":
+            low, high = parse_range(name, values, Decimal)
+            return self._range_bits(
+                "price",
+                None if low is None else math.ceil(low * 100),
+                None if high is None else math.floor(high * 100),
+            )
+        if name == "requiredage":
+            return self._range_bits(
+                "required_age", *parse_range("requiredAge", values, int)
+            )
+        if name == "year":
+            years = parse_years(values)
+            if not years:
+                return None
+            bits = 0
+            for year in years:
+                bits |= self._range_bits(
+                    "release_date",
+                    date(year, 1, 1).toordinal(),
+                    date(year, 12, 31).toordinal(),
+                )
+            return bits
+
+        if name == "platform":
+            values = [value for value in values if value]
+            unknown = [p for p in values if p.lower() not in PLATFORMS]
+            if unknown:
+                raise FilterError(f"Unknown platform: {', '.join(unknown)}")
+            if not values:
+                return None
+            keys = [[("platform", platform.lower()) for platform in values]]
+        else:
+            mode, names = relation_values(values)
+            if not names:
+                return None
+            relation = RELATION_CLAUSES[name]
+            ids = name_ids(Game._meta.get_field(relation).related_model, names)
+            keys = [[(relation, value_id) for value_id in ids[n]] for n in names]
+            if mode == "any":
+                keys = [[key for name_keys in keys for key in name_keys]]
+
+        # The clause is the AND of groups of keys, each group matching any of its keys
+        bits = self.live
+        for group in keys:
+            group_bits = 0
+            for key in group:
+                posting = self.postings.get(key)
+                if posting is not None:
+                    group_bits |= _posting_bits(posting, size)
+            bits &= group_bits
+        return bits
+
+    """
+    Return the bitset of the games matching parsed filterBy clauses, or None if
+    no clause restricts the match.
+    """
+
+    def _match_bits(self, clauses):
+        bits = None
+        for name, values in clauses:
+            if name not in FILTER_CLAUSES:
+                continue
+            clause_bits = self._clause_bits(name, values)
+            if clause_bits is not None:
+                bits = clause_bits if bits is None else bits & clause_bits
+        return bits
+
+    """
+    Return the games matching a filterBy expression.
+
+    Parameters:
+        filter_by: filterBy expression (see api.filters)
+        sort_field (optional): Field of COLUMNS to order the games by,
+            instead of id
+        descending (optional): Whether to sort in descending order
+        queryset (optional): Queryset loading the games of a slice
+
+    Returns:
+        MatchedGames
+
+    Raises:
+        FilterError: If a clause has malformed values
+    """
+
+    def match(self, filter_by, sort_field=None, descending=False, queryset=None):
+        clauses = parse_filter_by(filter_by)
+        with self._lock:
+            self.ensure_current()
+            bits = self._match_bits(clauses)
+            if bits is None:
+                bits = self.live
+            if not sort_field:
+                return MatchedGames(
+                    self.game_ids,
+                    bits,
+                    queryset=queryset,
+                    lock=self._lock,
+                    rows=self.rows,
+                )
+            return MatchedGames(
+                self.game_ids,
+                bits,
+                self.orders[sort_field],
+                self.columns[sort_field],
+                descending,
+                queryset,
+                self._lock,
+                self.rows,
+            )
+
+    """
+    Count the games matching a filterBy expression by facet value.
+
+    Without a restricting clause the maintained counters are returned as they
+    are; otherwise the match is computed once and intersected with every
+    posting of FACETS.
+
+    Returns:
+        (number of matching games, {(kind, value): number of matching games})
+        where kind is one of FACETS and value a related id, a platform name or
+        a year; values without matching games are left out
+
+    Raises:
+        FilterError: If a clause has malformed values
+    """
+
+    def facets(self, filter_by):
+        clauses = parse_filter_by(filter_by)
+        with self._lock:
+            self.ensure_current()
+            bits = self._match_bits(clauses)
+            postings = [
+                (key, posting)
+                for key, posting in self.postings.items()
+                if key[0] in FACETS
+            ]
+            if bits is None:
+                counts = {key: self.counts[key] for key, _ in postings}
+                total = popcount(self.live)
+            else:
+                flags = None
+                counts = {}
+                for key, posting in postings:
+                    if isinstance(posting, int):
+                        counts[key] = popcount(bits & posting)
+                    else:
+                        if flags is None:
+                            flags = bitset_flags(bits, len(self.game_ids))
+                        counts[key] = count_flags(flags, posting)
+                total = popcount(bits)
+        return total, {key: count for key, count in counts.items() if count}
+
+
+"""
+Games of a filter index match as a lazy sequence.
+
+Its length is the popcount of the match, and slicing it loads only the
+games of the slice, so it can be handed to Django's Paginator. Testing
+whether a game id is in it costs a row lookup and an index into flags. Games are in id
+order, or sorted by a column; games with equal values are then in id order,
+reversed along with the values when descending.
+
+Parameters:
+    game_ids: Ids of the indexed games, by row
+    bits: Bitset of the matching rows
+    order, values (optional): Sort permutation and values of the sort column
+    descending (optional): Whether to sort in descending order
+    queryset (optional): Queryset used to load the games of a slice; without
+        one, slices are the ids of the games
+    lock (optional): Lock of the index, held while ids are read, since the
+        index edits its arrays in place when games are written
+    rows (optional): Mapping of game ids to rows, for membership tests; they
+        search game_ids without it
+"""
+
+
+class MatchedGames:
+    def __init__(
+        self,
+        game_ids,
+        bits,
+        order=None,
+        values=None,
+        descending=False,
+        queryset=None,
+        lock=None,
+        rows=None,
+    ):
+        self.game_ids = game_ids
+        self.bits = bits
+        self.order = order
+        self.values = values
+        self.descending = descending
+        self.queryset = queryset
+        self.lock = nullcontext() if lock is None else lock
+        self.rows = rows
+        self.flags = None
+
+    def count(self):
+        return popcount(self.bits)
+
+    def __len__(self):
+        return self.count()
+
+    """
+    Return whether a game is among the matches.
+
+    The bitset is expanded into flags on the first test, so that every test
+    is a lookup of the game's row and an index into the flags, instead of a
+    shift of a bitset as wide as the catalog.
+    """
+
+    def __contains__(self, game_id):
+        flags = self._flags()
+        if self.rows is not None:
+            row = self.rows.get(game_id)
+        else:
+            row = bisect.bisect_left(self.game_ids, game_id)
+            if row == len(self.game_ids) or self.game_ids[row] != game_id:
+                row = None
+        # Games added since the match are past the flags
+        return row is not None and row < len(flags) and flags[row] == 1
+
+    def _flags(self):
+        if self.flags is None:
+            self.flags = bitset_flags(self.bits, len(self.game_ids))
+        return self.flags
+
+    """
+    Return the items of a {game_id: value} mapping whose games are among the
+    matches, testing them in one comprehension rather than one call each.
+    """
+
+    def restrict(self, mapping):
+        if self.rows is None:
+            return {key: value for key, value in mapping.items() if key in self}
+        # Games added since the match, and unknown ids, read the zeros past the
+        # flags of the matched rows
+        size = len(self.game_ids)
+        flags = self._flags() + bytes(size + 1 - len(self._flags()))
+        row_of = self.rows.get
+        return {
+            game_id: value
+            for game_id, value in mapping.items()
+            if flags[row_of(game_id, size)]
+        }
+
+    """
+    Iterate over the rows of the sort permutation in the sort direction, rows
+    without a value last.
+    """
+
+    def walk(self):
+        order = self.order
+        # Rows without a value start the permutation
+        nulls = bisect.bisect_right(order, NULL_VALUE, key=self.values.__getitem__)
+        if self.descending:
+            valued = len(order) - nulls
+            return chain(
+                islice(reversed(order), valued), islice(reversed(order), valued, None)
+            )
+        return chain(islice(order, nulls, None), islice(order, nulls))
+
+    """Return the ids of the games from position start up to stop."""
+
+    def ids(self, start, stop):
+        count = max(stop - start, 0)
+        matches = self.count()
+        with self.lock:
+            if self.order is None:
+                rows = select_bits(self.bits, start, count)
+            elif matches * SORT_RATIO < len(self.order):
+                values = self.values
+                rows = sorted(
+                    select_bits(self.bits, 0, matches),
+                    key=lambda row: (
+                        (values[row] == NULL_VALUE) != self.descending,
+                        values[row],
+                        row,
+                    ),
+                    reverse=self.descending,
+                )[start : start + count]
+            else:
+                # The permutation is walked twice in step: once for the rows,
+                # and once to look up whether each of them matches
+                flags = bitset_flags(self.bits, len(self.game_ids))
+                rows = islice(
+                    compress(self.walk(), map(flags.__getitem__, self.walk())),
+                    start,
+                    start + count,
+                )
+            return [self.game_ids[row] for row in rows]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index : index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        ids = self.ids(start, stop)
+        if self.queryset is None:
+            return ids
+        games = self.queryset.in_bulk(ids)
+        # Games deleted since the match was computed are skipped
+        return [games[game_id] for game_id in ids if game_id in games]
+
+
+filter_index = FilterIndex()
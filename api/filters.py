@@ -0,0 +1,235 @@
+import re
+from datetime import MAXYEAR, MINYEAR
+from decimal import Decimal, InvalidOperation
+from django.db.models import Q
+from .lookups import name_ids
+from .models import Game
+
+"""
+Parser for the filterBy grammar shared by the game listing and recommendation endpoints.
+
+A filterBy expression is a list of clauses joined by '&', each written as
+name(value,value,...):
+
+    genre(Action,RPG)         games having any of the genres
+    tag(all:Indie,Roguelike)  games having all of the tags
+    category(...)             likewise for categories
+    developer(...)            likewise for developers
+    publisher(...)            likewise for publishers
+    language(...)             likewise for supported interface languages
+    platform(windows,mac)     games available on any of the platforms
+    year(2021,2022)           games released in any of the years
+    price(min,max)            games priced between min and max, inclusive
+    requiredAge(min,max)      games whose required age is between min and max
+
+Relation clauses match names exactly, ignoring case, and select games having
+any of the values unless the first value is prefixed with 'all:' ('any:' is
+accepted too). Either bound of a range may be left empty, e.g. price(,9.99).
+Clauses are combined with AND.
+"""
+
+CLAUSE_PATTERN = re.compile(r"(\w+)\(([^)]*)\)")
+
+PLATFORMS = ("windows", "mac", "linux")
+
+"""Relation clauses and the Game ManyToMany field each one filters on."""
+
+RELATION_CLAUSES = {
+    "genre": "genres",
+    "tag": "tags",
+    "category": "categories",
+    "developer": "developers",
+    "publisher": "publishers",
+    "language": "supported_languages",
+}
+
+LIST_CLAUSES = ("platform", "year", *RELATION_CLAUSES)
+
+
+"""Exception raised for filterBy expressions that cannot be evaluated."""
+
+
+class FilterError(ValueError):
+    pass
+
+
+"""
+Split a filterBy expression into (name, values) clauses.
+
+Clause names are case-insensitive; empty values are dropped except in ranges,
+where they stand for an open bound.
+"""
+
+
+def parse_filter_by(filter_by):
+    clauses = []
+    for name, values in CLAUSE_PATTERN.findall(filter_by or ""):
+        clauses.append((name.lower(), [value.strip() for value in values.split(",")]))
+    return clauses
+
+
+"""
+Return a canonical string for a filterBy expression, e.g. to key cached results.
+
+Expressions selecting the same games through the same clauses get the same
+key whatever the order and case of their clauses and list values.
+"""
+
+
+def filter_key(filter_by):
+    clauses = []
+    for name, values in parse_filter_by(filter_by):
+        if name in RELATION_CLAUSES:
+            mode, values = relation_values(values)
+            values = [
+                f"{mode}:" + ",".join(sorted({value.lower() for value in values}))
+            ]
+        elif name in LIST_CLAUSES:
+            values = sorted({value.lower() for value in values if value})
+        elif name not in ("price", "requiredage"):
+            continue
+        clauses.append(f"{name}({','.join(values)})")
+    return "&".join(sorted(clauses))
+
+
+"""Split the values of a relation clause into its mode ('any' or 'all') and names."""
+
+
+def relation_values(values):
+    mode = "any"
+    if values and values[0][:4].lower() in ("all:", "any:"):
+        mode = values[0][:3].lower()
+        values = [values[0][4:].strip(), *values[1:]]
+    return mode, [value for value in values if value]
+
+
+"""
+Build the Q object selecting games by the names of related attributes.
+
+Names are resolved to ids through the cached lookups of api.lookups, and
+games are matched with `id IN (SELECT game_id FROM <relation table> WHERE
+<attribute>_id IN (...))`, which reads the relation table's index and never
+returns a game twice. In 'all' mode one such condition is added per name.
+"""
+
+
+def _relation_query(relation, values):
+    mode, names = relation_values(values)
+    if not names:
+        return None
+
+    field = Game._meta.get_field(relation)
+    through = field.remote_field.through
+    game_column = f"{field.m2m_field_name()}_id"
+    value_column = f"{field.m2m_reverse_field_name()}_id"
+
+    def having(ids):
+        rows = through.objects.filter(**{f"{value_column}__in": ids})
+        return Q(id__in=rows.values(game_column))
+
+    ids = name_ids(field.related_model, names)
+    if mode == "any":
+        return having(set().union(*ids.values()))
+    query = Q()
+    for name_ids_ in ids.values():
+        query &= having(name_ids_)
+    return query
+
+
+"""
+Parse the bounds of a range clause such as price(0,19.99).
+
+Returns:
+    (low, high), either of which is None when left empty
+
+Raises:
+    FilterError: If the clause does not have two valid bounds
+"""
+
+
+def parse_range(name, values, parse):
+    if len(values) != 2:
+        raise FilterError(f"{name}() expects two bounds, e.g. {name}(0,20)")
+    try:
+        low, high = (parse(value) if value else None for value in values)
+    except (ValueError, InvalidOperation):
+        raise FilterError(f"Invalid bound in {name}({','.join(values)})") from None
+    return low, high
+
+
+"""
+Return the years of a year() clause, ignoring empty values.
+
+Raises:
+    FilterError: If a value is not a year between MINYEAR and MAXYEAR
+"""
+
+
+def parse_years(values):
+    years = [value for value in values if value]
+    if not all(year.isdecimal() and MINYEAR <= int(year) <= MAXYEAR for year in years):
+        raise FilterError("year() expects a list of years, e.g. year(2021,2022)")
+    return [int(year) for year in years]
+
+
+def _range_query(field, low, high):
+    query = Q()
+    if low is not None:
+        query &= Q(**{f"{field}__gte": low})
+    if high is not None:
+        query &= Q(**{f"{field}__lte": high})
+    return query
+
+
+def _any(queries):
+    combined = None
+    for query in queries:
+        combined = query if combined is None else combined | query
+    return combined
+
+
+"""
+Build the Q object selecting the games that match a filterBy expression.
+
+Unknown clause names are ignored. Every condition is expressed on indexed
+Game columns or relation tables so that it can be evaluated by the database.
+
+Raises:
+    FilterError: If a clause has malformed values
+"""
+
+
+def build_filter_query(filter_by):
+    query = Q()
+    for name, values in parse_filter_by(filter_by):
+        if name == "platform":
+            values = [value for value in values if value]
+
+        if name in RELATION_CLAUSES:
+            clause = _relation_query(RELATION_CLAUSES[name], values)
+        elif name == "platform":
+            unknown = [p for p in values if p.lower() not in PLATFORMS]
+            if unknown:
+                raise FilterError(f"Unknown platform: {', '.join(unknown)}")
+            clause = _any(Q(**{platform.lower(): True}) for platform in values)
+        elif name == "year":
+            clause = _any(Q(release_date__year=year) for year in parse_years(values))
+        elif name == "price":
+            clause = _range_query("price", *parse_range(name, values, Decimal))
+        elif name == "requiredage":
+            clause = _range_query(
+                "required_age", *parse_range("requiredAge", values, int)
+            )
+        else:
+            continue
+
+        if clause is not None:
+            query &= clause
+    return query
+
+
+"""Apply a filterBy expression to a Game queryset."""
+
+
+def filter_games(queryset, filter_by):
+    return queryset.filter(build_filter_query(filter_by))
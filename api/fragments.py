@@ -0,0 +1,126 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from .conditional import games_updated_at
+from .lookups import names_generation
+from .response_cache import renders_json
+from .serializers import serialize_games
+
+"""
+Cache of the serialized JSON of each game, as rendered bytes (fragments).
+
+A fragment is stored per game and set of requested fields, together with the
+updated_at time of the game (see api.conditional) and the attribute names
+generation (see api.lookups) it was rendered at. Writes to a game or to its
+relations change its updated_at, and creating, renaming or deleting an
+attribute changes the names generation, so stale fragments are recognized
+without being enumerated.
+
+Listing and recommendation responses are then assembled from the fragments of
+their games, and only the games missing from the cache are read and
+serialized (see serialize_games()): the serializer cost depends on the cache
+misses, not on the number of games returned. The assembled bytes are those
+JSONRenderer would have rendered from the serialized games.
+
+Fragments are checked against the updated_at times read from the database and
+the attribute names generation kept there, so a write made by any worker makes
+them stale in every other one. The responses assembled from them are plain
+HttpResponses holding the rendered bytes, without the .data of a DRF Response.
+
+The cache used is settings.GAME_FRAGMENT_CACHE_ALIAS.
+"""
+
+"""Seconds a fragment stays cached."""
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+_renderer = JSONRenderer()
+
+
+def _fragment_key(game_id, fields):
+    if fields is None:
+        digest = "all"
+    else:
+        digest = hashlib.sha1(",".join(sorted(fields)).encode()).hexdigest()
+    return f"fragment:{game_id}:{digest}"
+
+
+"""Return whether the games of a response to this request are served from fragments."""
+
+
+def fragments_requested(request):
+    return settings.GAME_FRAGMENT_CACHE and renders_json(request)
+
+
+"""
+Return the {id: fragment} JSON bytes of the existing games among game_ids.
+
+Parameters:
+    game_ids: Ids of the games
+    fields (optional): Fields to serialize, as for GameSerializer; they must
+        include id
+"""
+
+
+def game_fragments(game_ids, fields=None):
+    # Read the versions first, so that a write made meanwhile leaves the
+    # fragments stored below stale
+    versions = games_updated_at(game_ids)
+    generation = names_generation()
+    cache = caches[settings.GAME_FRAGMENT_CACHE_ALIAS]
+    keys = {game_id: _fragment_key(game_id, fields) for game_id in versions}
+    entries = cache.get_many(keys.values())
+
+    fragments, missing = {}, []
+    for game_id, key in keys.items():
+        entry = entries.get(key)
+        if entry is not None and entry[0] == (versions[game_id], generation):
+            fragments[game_id] = entry[1]
+        else:
+            missing.append(game_id)
+
+    if missing:
+        rendered = {}
+        for data in serialize_games(missing, fields):
+            fragments[data["id"]] = _renderer.render(data)
+            rendered[keys[data["id"]]] = (
+                (versions[data["id"]], generation),
+                fragments[data["id"]],
+            )
+        cache.set_many(rendered, FRAGMENT_CACHE_TIMEOUT)
+    return fragments
+
+
+"""
+Render data as JSONRenderer does, copying bytes values in as rendered JSON.
+
+Dicts, lists and tuples are rendered member by member; other values are
+rendered by JSONRenderer itself.
+"""
+
+
+def render_json(data):
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, dict):
+        return (
+            b"{"
+            + b",".join(
+                render_json(str(key)) + b":" + render_json(value)
+                for key, value in data.items()
+            )
+            + b"}"
+        )
+    if isinstance(data, (list, tuple)):
+        return b"[" + b",".join(map(render_json, data)) + b"]"
+    # Rendered inside a list, since JSONRenderer renders None as no content
+    return _renderer.render([data])[1:-1]
+
+
+"""Return a JSON response of data holding fragments, see render_json()."""
+
+
+def fragment_response(data):
+    return HttpResponse(render_json(data), content_type="application/json")
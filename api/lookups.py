@@ -0,0 +1,98 @@
+from collections import defaultdict
+from threading import Lock
+from django.db.models.signals import post_save, post_delete
+from .catalog import bump_generation, get_generation
+from .models import (
+    SupportedLanguage,
+    FullAudioLanguage,
+    Developer,
+    Publisher,
+    Category,
+    Genre,
+    Tag,
+)
+
+"""
+Cached lookups of attribute names (genres, tags, developers, ...) to their ids, and back.
+
+Each worker loads the name table of a model once and keeps it in memory, so
+filters on names can be expressed on the indexed id columns of the relation
+tables. Creating, renaming or deleting an attribute increments a counter in
+the database (see api.catalog), which makes every worker reload its tables on
+the next lookup.
+"""
+
+NAMES_GENERATION_KEY = "catalog:names:generation"
+
+"""Name field of each attribute model."""
+
+NAME_FIELDS = {
+    SupportedLanguage: "supported_language",
+    FullAudioLanguage: "full_audio_language",
+    Developer: "developer",
+    Publisher: "publisher",
+    Category: "category",
+    Genre: "genre",
+    Tag: "tag",
+}
+
+_lock = Lock()
+
+# Model to (names generation, {lowercase name: [ids]}, {id: name})
+_tables = {}
+
+
+"""Return the generation of the attribute names, e.g. to key cached results."""
+
+
+def names_generation():
+    return get_generation(NAMES_GENERATION_KEY)
+
+
+"""Return the cached ({lowercase name: [ids]}, {id: name}) tables of a model."""
+
+
+def _tables_of(model):
+    generation = names_generation()
+    with _lock:
+        cached = _tables.get(model)
+        if cached is None or cached[0] != generation:
+            ids, names = defaultdict(list), {}
+            for pk, name in model.objects.values_list("id", NAME_FIELDS[model]):
+                ids[name.lower()].append(pk)
+                names[pk] = name
+            _tables[model] = cached = (generation, dict(ids), names)
+    return cached[1:]
+
+
+"""
+Resolve attribute names to ids, ignoring case.
+
+Parameters:
+    model: One of the attribute models of NAME_FIELDS
+    names: Iterable of names
+
+Returns:
+    dict mapping each name to the set of matching ids (empty if unknown)
+"""
+
+
+def name_ids(model, names):
+    table = _tables_of(model)[0]
+    return {name: set(table.get(name.lower(), ())) for name in names}
+
+
+"""Return the {id: name} mapping of every attribute of a model of NAME_FIELDS."""
+
+
+def id_names(model):
+    return _tables_of(model)[1]
+
+
+def _names_changed(sender, **kwargs):
+    bump_generation(NAMES_GENERATION_KEY)
+
+
+for _model in NAME_FIELDS:
+    post_save.connect(_names_changed, sender=_model)
+    post_delete.connect(_names_changed, sender=_model)
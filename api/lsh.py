@@ -0,0 +1,145 @@
+import heapq
+import random
+from collections import defaultdict
+from django.conf import settings
+from .catalog import CatalogIndex
+from .recommendations import (
+    SIMILARITY_WEIGHTS,
+    RECOMMENDATION_LIMIT,
+    load_features,
+    pair_score,
+    recommendation_index,
+)
+
+"""Mersenne prime used as the modulus of the MinHash permutations."""
+
+PRIME = (1 << 61) - 1
+
+RELATION_IDS = {relation: i for i, relation in enumerate(SIMILARITY_WEIGHTS)}
+
+
+"""
+Approximate nearest-neighbour index over game attributes using MinHash and LSH.
+
+Each game's set of genres, tags and categories is summarised by a MinHash
+signature of `bands * rows` values, where the probability that two games agree
+on one value equals the Jaccard similarity of their attribute sets. The
+signature is cut into `bands` bands of `rows` values and each band is hashed
+into a bucket; games sharing at least one bucket with the reference game are
+shortlisted and then scored exactly with the 3/2/1 weights.
+
+More bands (or fewer rows per band) shortlist more games, raising recall and
+latency; fewer bands lower both. A pair of games with Jaccard similarity s is
+shortlisted with probability 1 - (1 - s ** rows) ** bands.
+
+Attributes:
+    bands: Number of LSH bands
+    rows: Number of signature values per band
+    band_keys: Game id to the tuple of its bucket keys, one per band
+    buckets: One mapping per band of bucket key to the set of game ids in it
+"""
+
+
+class MinHashIndex(CatalogIndex):
+    def __init__(self, bands=None, rows=None, seed=0, register=True):
+        super().__init__(register)
+        self.bands = bands or getattr(settings, "RECOMMENDATION_LSH_BANDS", 16)
+        self.rows = rows or getattr(settings, "RECOMMENDATION_LSH_ROWS", 4)
+
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, PRIME), rng.randrange(PRIME))
+            for _ in range(self.bands * self.rows)
+        ]
+        self._feature_hashes = {}
+        self.band_keys = {}
+        self.buckets = [defaultdict(set) for _ in range(self.bands)]
+
+    def _hashes(self, feature):
+        # The hash vector of a feature across all permutations, computed once
+        hashes = self._feature_hashes.get(feature)
+        if hashes is None:
+            x = (RELATION_IDS[feature[0]] << 40) | feature[1]
+            hashes = [(a * x + b) % PRIME for a, b in self.permutations]
+            self._feature_hashes[feature] = hashes
+        return hashes
+
+    """Return the MinHash signature of a feature set, or None if it is empty."""
+
+    def signature(self, features):
+        if not features:
+            return None
+        return list(map(min, zip(*(self._hashes(feature) for feature in features))))
+
+    def _band_keys(self, features):
+        signature = self.signature(features)
+        if signature is None:
+            return ()
+        rows = self.rows
+        return tuple(
+            hash(tuple(signature[band * rows : (band + 1) * rows]))
+            for band in range(self.bands)
+        )
+
+    def _add(self, game_id, features):
+        keys = self._band_keys(features)
+        if keys:
+            self.band_keys[game_id] = keys
+            for band, key in enumerate(keys):
+                self.buckets[band][key].add(game_id)
+
+    def _remove(self, game_id):
+        for band, key in enumerate(self.band_keys.pop(game_id, ())):
+            bucket = self.buckets[band][key]
+            bucket.discard(game_id)
+            if not bucket:
+                del self.buckets[band][key]
+
+    def build(self):
+        self.band_keys = {}
+        self.buckets = [defaultdict(set) for _ in range(self.bands)]
+        for game_id, features in load_features().items():
+            self._add(game_id, features)
+
+    def refresh(self, game_ids):
+        game_features = load_features(list(game_ids))
+        for game_id in game_ids:
+            self._remove(game_id)
+            self._add(game_id, game_features.get(game_id, ()))
+
+    """Return the ids of the games sharing at least one LSH bucket with the game."""
+
+    def candidates(self, game_id):
+        self.ensure_current()
+        candidates = set()
+        for band, key in enumerate(self.band_keys.get(game_id, ())):
+            candidates |= self.buckets[band][key]
+        candidates.discard(game_id)
+        return candidates
+
+    """
+    Return up to `limit` (game_id, score) pairs approximately most similar to the game.
+
+    Shortlisted games are scored exactly and ranked like the exact recommender:
+    by score, highest first, with ties broken by ascending id. When `eligible`
+    is given, only the game ids it contains are shortlisted.
+    """
+
+    def recommend(self, game_id, limit=RECOMMENDATION_LIMIT, eligible=None):
+        candidates = self.candidates(game_id)
+        if eligible is not None:
+            candidates = {other_id for other_id in candidates if other_id in eligible}
+
+        recommendation_index.ensure_current()
+        bits = recommendation_index.bits_of(game_id)
+        scored = []
+        for other_id in candidates if bits else ():
+            other_bits = recommendation_index.bits_of(other_id)
+            score = pair_score(bits, other_bits) if other_bits else 0
+            if score:
+                scored.append((other_id, score))
+
+        return heapq.nsmallest(limit, scored, key=lambda item: (-item[1], item[0]))
+
+
+minhash_index = MinHashIndex()
@@ -0,0 +1,132 @@
+import random
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction
+from api.catalog import reset_indexes
+from api.models import (
+    SupportedLanguage,
+    FullAudioLanguage,
+    Developer,
+    Publisher,
+    Category,
+    Genre,
+    Tag,
+    Game,
+)
+
+"""
+Helpers shared by the benchmark commands to generate a synthetic catalog.
+
+The catalog is written inside a transaction that is always rolled back, so
+benchmarks can run against the real database without leaving rows behind.
+Attribute popularity follows a skewed distribution so that a few tags (like
+"Indie" or "Action" on Steam) are attached to a large share of the games.
+"""
+
+DIMENSIONS = {
+    "supported_languages": (SupportedLanguage, "supported_language", 30, 4),
+    "full_audio_languages": (FullAudioLanguage, "full_audio_language", 30, 1),
+    "developers": (Developer, "developer", 5000, 1),
+    "publishers": (Publisher, "publisher", 3000, 1),
+    "categories": (Category, "category", 40, 4),
+    "genres": (Genre, "genre", 30, 2),
+    "tags": (Tag, "tag", 450, 8),
+}
+
+WORDS = (
+    "space dungeon quest legend shadow puzzle racing farm city empire tactics "
+    "survival zombie pixel dragon kingdom star island ocean forest cyber neon "
+    "ancient mystery horror arena hero battle craft world night"
+).split()
+
+BATCH_SIZE = 5000
+
+
+def _pick(rng, values, count):
+    # Skewed sampling: low indexes (the "popular" values) are picked far more often
+    picked = set()
+    while len(picked) < min(count, len(values)):
+        picked.add(values[int(len(values) * rng.random() ** 3)])
+    return picked
+
+
+"""
+Create `size` synthetic games inside a transaction that is rolled back on exit.
+
+Parameters:
+    size: Number of games to create
+    seed (optional): Seed for the random generator, for reproducible catalogs
+    stdout (optional): Stream used to report progress
+
+Yields:
+    None once the catalog has been created
+"""
+
+
+@contextmanager
+def synthetic_catalog(size, seed=0, stdout=None):
+    rng = random.Random(seed)
+    with transaction.atomic():
+        try:
+            values = {}
+            for relation, (model, field, count, _) in DIMENSIONS.items():
+                model.objects.bulk_create(
+                    [model(**{field: f"{field} {i}"}) for i in range(count)],
+                    batch_size=BATCH_SIZE,
+                )
+                values[relation] = list(
+                    model.objects.order_by("id").values_list("id", flat=True)
+                )
+
+            first_date = date(2000, 1, 1)
+            for start in range(0, size, BATCH_SIZE):
+                games = Game.objects.bulk_create(
+                    [
+                        Game(
+                            name=" ".join(rng.sample(WORDS, 3)).title() + f" {i}",
+                            release_date=first_date
+                            + timedelta(days=rng.randrange(9000)),
+                            estimated_owners=rng.randrange(0, 20000000, 10000),
+                            peak_concurrent_users=rng.randrange(100000),
+                            required_age=rng.choice((0, 0, 0, 12, 16, 18)),
+                            price=Decimal(rng.choice((0, 499, 999, 1999, 5999))) / 100,
+                            about_the_game=" ".join(rng.choices(WORDS, k=60)),
+                            windows=rng.random() < 0.98,
+                            mac=rng.random() < 0.2,
+                            linux=rng.random() < 0.15,
+                            metacritic_score=(
+                                rng.randrange(20, 100) if rng.random() < 0.1 else None
+                            ),
+                            positive_ratings=rng.randrange(10000),
+                            negative_ratings=rng.randrange(2000),
+                        )
+                        for i in range(start, min(start + BATCH_SIZE, size))
+                    ]
+                )
+
+                for relation, (_, _, _, per_game) in DIMENSIONS.items():
+                    field = Game._meta.get_field(relation)
+                    through = field.remote_field.through
+                    game_column = f"{field.m2m_field_name()}_id"
+                    value_column = f"{field.m2m_reverse_field_name()}_id"
+                    through.objects.bulk_create(
+                        [
+                            through(**{game_column: game.pk, value_column: value_id})
+                            for game in games
+                            for value_id in _pick(
+                                rng, values[relation], rng.randint(1, per_game)
+                            )
+                        ],
+                        batch_size=BATCH_SIZE,
+                    )
+
+                if stdout:
+                    stdout.write(f"  created {min(start + BATCH_SIZE, size)} games")
+
+            # bulk_create sends no signals, so drop anything built before
+            reset_indexes()
+            yield
+        finally:
+            transaction.set_rollback(True)
+            reset_indexes()
@@ -0,0 +1,104 @@
+import random
+import sys
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from api.autocomplete import AUTOCOMPLETE_MODELS, AutocompleteIndex
+from api.models import Game
+from ._synthetic import synthetic_catalog
+
+LIMIT = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Time autocompletion of every keystroke of sampled game names, with and "
+        "without typos, against the name__icontains lookups it replaces"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=50,
+            help="Number of sampled names",
+        )
+
+    def timed(self, function, values):
+        times = []
+        for value in values:
+            started = perf_counter()
+            function(value)
+            times.append(perf_counter() - started)
+        return sorted(times)
+
+    def report(self, label, times):
+        percentile = lambda p: times[min(int(len(times) * p), len(times) - 1)]
+        self.stdout.write(
+            f"{label:<36} {len(times):>6} requests  "
+            f"p50 {percentile(0.5) * 1000:7.3f} ms  "
+            f"p99 {percentile(0.99) * 1000:7.3f} ms  "
+            f"max {times[-1] * 1000:7.3f} ms"
+        )
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        with context:
+            index = AutocompleteIndex(register=False)
+            started = perf_counter()
+            index.ensure_current()
+            elapsed = perf_counter() - started
+            names = index.names["game"].names
+            size = sum(map(sys.getsizeof, names)) + sys.getsizeof(names)
+            size += sys.getsizeof(index.names["game"].ids)
+            self.stdout.write(
+                f"Built the index of {len(names)} games in {elapsed:.2f} s: "
+                f"{size / (1024 * 1024):.1f} MiB of game names, "
+                f"{len(index.vocabulary.counts)} words"
+            )
+            if not names:
+                return
+
+            rng = random.Random(0)
+            sampled = rng.sample(names, min(options["lookups"], len(names)))
+            # Every keystroke of each name, then the same with one letter replaced
+            keystrokes = [
+                name[:end] for name in sampled for end in range(1, len(name) + 1)
+            ]
+            typos = []
+            for text in keystrokes:
+                if len(text) > 3:
+                    position = rng.randrange(1, len(text) - 1)
+                    typos.append(text[:position] + "x" + text[position + 1 :])
+
+            kinds = list(AUTOCOMPLETE_MODELS)
+            complete = lambda text: index.complete(text, kinds, LIMIT)
+            self.report("keystrokes", self.timed(complete, keystrokes))
+            self.report("keystrokes with a typo", self.timed(complete, typos))
+            self.report(
+                "name__icontains, first 200 keystrokes",
+                self.timed(
+                    lambda text: list(
+                        Game.objects.filter(name__icontains=text).values_list(
+                            "id", "name"
+                        )[:LIMIT]
+                    ),
+                    keystrokes[:200],
+                ),
+            )
+
+            game_ids = rng.sample(list(index.names["game"].ids), min(100, len(names)))
+            self.report(
+                "refresh of one game",
+                self.timed(lambda pk: index.refresh({pk}), game_ids),
+            )
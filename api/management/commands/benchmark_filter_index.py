@@ -0,0 +1,124 @@
+import sys
+from contextlib import nullcontext
+from itertools import product
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from api.filter_index import FilterIndex
+from api.filters import filter_games
+from api.models import Game
+from ._synthetic import synthetic_catalog
+
+"""filterBy expressions compared, from broad to selective."""
+
+FILTERS = (
+    "platform(windows)",
+    "genre(genre 1)",
+    "genre(genre 1,genre 2)&platform(mac)",
+    "tag(all:tag 1,tag 2)&category(category 3)",
+    "tag(tag 40,tag 41,tag 42)&language(supported_language 2)",
+    "platform(windows)&genre(genre 5)&tag(tag 8)",
+    "developer(developer 3)",
+    "publisher(publisher 10)&platform(linux)",
+    "price(,9.99)",
+    "year(2015,2016)&genre(genre 1)",
+    "requiredAge(,12)&price(20,)&tag(tag 1)",
+)
+
+"""sortBy fields (with descending order) each expression is listed by."""
+
+SORTS = (
+    ("id", False),
+    ("price", False),
+    ("metacritic_score", True),
+    ("release_date", True),
+)
+
+PAGE_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare counting and paging filtered and sorted game listings through "
+        "the in-memory catalog and through SQL"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed runs per expression",
+        )
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=10,
+            help="Page of PAGE_SIZE games read after counting",
+        )
+
+    def timed(self, function, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            result = function()
+        return result, (perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        offset = (options["page"] - 1) * PAGE_SIZE
+        repeat = options["repeat"]
+        with context:
+            index = FilterIndex(register=False)
+            _, elapsed = self.timed(index.ensure_current, 1)
+            dense = sum(isinstance(p, int) for p in index.postings.values())
+            size = sum(map(sys.getsizeof, index.postings.values()))
+            size += sys.getsizeof(index.game_ids) + sys.getsizeof(index.rows)
+            size += sum(map(sys.getsizeof, index.columns.values()))
+            size += sum(map(sys.getsizeof, index.orders.values()))
+            self.stdout.write(
+                f"Built the index of {len(index.game_ids)} games in {elapsed:.2f} s: "
+                f"{len(index.postings)} postings ({dense} dense), "
+                f"{size / (1024 * 1024):.1f} MiB"
+            )
+
+            def sql(filter_by, field, descending):
+                games = filter_games(Game.objects.all(), filter_by)
+                if field != "id":
+                    prefix = "-" if descending else ""
+                    games = games.order_by(f"{prefix}{field}", f"{prefix}id")
+                count = games.count()
+                page = list(
+                    games.values_list("id", flat=True)[offset : offset + PAGE_SIZE]
+                )
+                return count, page
+
+            def in_memory(filter_by, field, descending):
+                matched = index.match(
+                    filter_by, None if field == "id" else field, descending
+                )
+                return matched.count(), matched.ids(offset, offset + PAGE_SIZE)
+
+            self.stdout.write(
+                f"{'filterBy':<60} {'sortBy':<18} {'count':>8} {'sql':>10} "
+                f"{'in memory':>10}"
+            )
+            for filter_by, (field, descending) in product(FILTERS, SORTS):
+                args = (filter_by, field, descending)
+                expected, sql_time = self.timed(lambda: sql(*args), repeat)
+                result, index_time = self.timed(lambda: in_memory(*args), repeat)
+                if result != expected:
+                    self.stderr.write(f"{filter_by}: the index disagrees with SQL")
+                sort = f"{field} {'desc' if descending else 'asc'}"
+                self.stdout.write(
+                    f"{filter_by:<60} {sort:<18} {expected[0]:>8} "
+                    f"{sql_time * 1000:7.2f} ms {index_time * 1000:7.2f} ms"
+                )
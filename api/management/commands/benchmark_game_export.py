@@ -0,0 +1,96 @@
+import json
+import tracemalloc
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from api.api import export_games, get_games
+from ._synthetic import synthetic_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare exporting the whole catalog with export_games against walking "
+        "get_games page by page, in time and peak Python memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--filter-by",
+            default="",
+            help="filterBy expression of the exported games",
+        )
+        parser.add_argument(
+            "--memory",
+            action="store_true",
+            help="Trace the peak Python memory of each run, which slows it down",
+        )
+
+    def measured(self, function, memory):
+        if memory:
+            tracemalloc.start()
+        started = perf_counter()
+        result = function()
+        elapsed = perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        tracemalloc.stop()
+        return result, elapsed, peak
+
+    def report(self, label, games, size, elapsed, peak):
+        self.stdout.write(
+            f"{label:<24} {games:>8} games {size / (1024 * 1024):8.1f} MiB "
+            f"{elapsed:8.2f} s"
+            + ("" if peak is None else f"  peak {peak / (1024 * 1024):7.1f} MiB")
+        )
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        factory = RequestFactory()
+        params = {"filterBy": options["filter_by"]} if options["filter_by"] else {}
+        with context:
+            for output in ("ndjson", "csv"):
+
+                def export():
+                    request = factory.get(
+                        "/api/games/export/", {**params, "output": output}
+                    )
+                    lines = size = 0
+                    for part in export_games(request).streaming_content:
+                        lines += part.count(b"\n")
+                        size += len(part)
+                    return lines - (output == "csv"), size
+
+                (games, size), elapsed, peak = self.measured(export, options["memory"])
+                self.report(f"export_games {output}", games, size, elapsed, peak)
+
+            def pages():
+                games = size = 0
+                page = 1
+                while True:
+                    request = factory.get(
+                        "/api/games/",
+                        {**params, "page": page, "pageSize": 100},
+                        HTTP_HOST="localhost",
+                    )
+                    response = get_games(request)
+                    if hasattr(response, "render"):
+                        response.render()
+                    data = json.loads(response.content)
+                    games += len(data["results"])
+                    size += len(response.content)
+                    if not data["next"]:
+                        return games, size
+                    page += 1
+
+            (games, size), elapsed, peak = self.measured(pages, options["memory"])
+            self.report("get_games pages of 100", games, size, elapsed, peak)
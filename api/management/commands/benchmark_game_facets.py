@@ -0,0 +1,106 @@
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+from api.filter_index import FilterIndex
+from api.filters import PLATFORMS, filter_games
+from api.models import Game
+from ._synthetic import synthetic_catalog
+
+"""filterBy expressions whose facets are counted, from none to selective."""
+
+FILTERS = (
+    "",
+    "platform(windows)",
+    "genre(genre 1)",
+    "tag(all:tag 1,tag 2)&platform(mac)",
+    "price(,9.99)&year(2015,2016)",
+    "developer(developer 3)",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare counting games by genre, tag, category, platform and year "
+        "through the in-memory catalog and with one GROUP BY per dimension"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed runs per expression",
+        )
+
+    def timed(self, function, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            result = function()
+        return result, (perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        with context:
+            index = FilterIndex(register=False)
+            _, elapsed = self.timed(index.ensure_current, 1)
+            self.stdout.write(
+                f"Built the index of {len(index.game_ids)} games in {elapsed:.2f} s"
+            )
+
+            def sql(filter_by):
+                games = filter_games(Game.objects.all(), filter_by)
+                counts = {}
+                for relation in ("genres", "tags", "categories"):
+                    field = Game._meta.get_field(relation)
+                    game_column = f"{field.m2m_field_name()}_id"
+                    value_column = f"{field.m2m_reverse_field_name()}_id"
+                    rows = (
+                        field.remote_field.through.objects.filter(
+                            **{f"{game_column}__in": games.values("id")}
+                        )
+                        .values_list(value_column)
+                        .annotate(count=Count("id"))
+                        .order_by()
+                    )
+                    counts.update(((relation, value), count) for value, count in rows)
+                for platform in PLATFORMS:
+                    count = games.filter(**{platform: True}).count()
+                    if count:
+                        counts[("platform", platform)] = count
+                years = (
+                    games.annotate(year=ExtractYear("release_date"))
+                    .values_list("year")
+                    .annotate(count=Count("id"))
+                    .order_by()
+                )
+                counts.update((("year", year), count) for year, count in years if year)
+                return games.count(), counts
+
+            self.stdout.write(
+                f"{'filterBy':<45} {'count':>8} {'sql':>10} {'in memory':>10}"
+            )
+            for filter_by in FILTERS:
+                expected, sql_time = self.timed(
+                    lambda: sql(filter_by), options["repeat"]
+                )
+                result, index_time = self.timed(
+                    lambda: index.facets(filter_by), options["repeat"]
+                )
+                if result != expected:
+                    self.stderr.write(f"{filter_by}: the index disagrees with SQL")
+                self.stdout.write(
+                    f"{filter_by or '-':<45} {expected[0]:>8} "
+                    f"{sql_time * 1000:7.2f} ms {index_time * 1000:7.2f} ms"
+                )
@@ -0,0 +1,87 @@
+from contextlib import nullcontext
+from time import perf_counter
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from api.api import get_games, get_recommended_games_batch
+from api.models import Game
+from ._synthetic import synthetic_catalog
+
+"""Query parameters of the timed get_games requests."""
+
+LISTINGS = (
+    {"page": 10},
+    {"page": 3, "include": "genres,tags,categories"},
+    {"filterBy": "genre(genre 1)", "sortBy": "price"},
+    {"filterBy": "platform(mac)", "sortBy": "releaseDate", "pagination": "cursor"},
+    {"fields": "id,name,price", "sortBy": "metacriticScore"},
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time listings and batch recommendations serialized game by game and "
+        "assembled from cached game fragments"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of timed requests per listing",
+        )
+
+    def timed(self, view, request, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            response = view(request)
+            if hasattr(response, "render"):
+                response.render()
+        return response, (perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        factory = RequestFactory()
+        with context, override_settings(RESPONSE_CACHE=False):
+            ids = list(Game.objects.order_by("id").values_list("id", flat=True)[:20])
+            if not ids:
+                self.stdout.write("No games to request")
+                return
+            requests = [("get_games", get_games, params) for params in LISTINGS]
+            requests.append(
+                (
+                    "get_recommended_games_batch",
+                    get_recommended_games_batch,
+                    {"ids": ",".join(map(str, ids))},
+                )
+            )
+
+            self.stdout.write(
+                f"{'request':<72} {'serialized':>10} {'cold':>10} {'cached':>10}"
+            )
+            for name, view, params in requests:
+                request = factory.get("/", params, HTTP_HOST="localhost")
+                expected, serialized = self.timed(view, request, options["repeat"])
+                caches[settings.GAME_FRAGMENT_CACHE_ALIAS].clear()
+                with override_settings(GAME_FRAGMENT_CACHE=True):
+                    _, cold = self.timed(view, request, 1)
+                    response, cached = self.timed(view, request, options["repeat"])
+                if response.content != expected.content:
+                    self.stderr.write(f"{params}: the fragments differ")
+                label = f"{name} {params}"
+                self.stdout.write(
+                    f"{label[:72]:<72} {serialized * 1000:7.2f} ms "
+                    f"{cold * 1000:7.2f} ms {cached * 1000:7.2f} ms"
+                )
@@ -0,0 +1,152 @@
+from contextlib import nullcontext
+from itertools import product
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from api.api import get_games
+from ._synthetic import synthetic_catalog
+
+"""filterBy expressions exercised by the benchmark, covering every clause."""
+
+FILTERS = (
+    "",
+    "platform(mac)",
+    "platform(windows,linux)",
+    "year(2015)",
+    "price(,9.99)",
+    "requiredAge(,12)",
+    "genre(genre 1)",
+    "tag(tag 1,tag 2)",
+    "tag(all:tag 1,tag 2)",
+    "developer(developer 3)",
+    "platform(mac)&year(2015)&price(,9.99)",
+)
+
+SORTS = (
+    (),
+    ("price", "asc"),
+    ("price", "desc"),
+    ("metacriticScore", "asc"),
+    ("metacriticScore", "desc"),
+    ("releaseDate", "asc"),
+    ("releaseDate", "desc"),
+)
+
+PAGINATIONS = ("page", "cursor")
+
+"""SQLite plan steps showing that rows are sorted instead of read in index order."""
+
+SORT_MARKERS = ("USE TEMP B-TREE FOR ORDER BY", "USE TEMP B-TREE FOR DISTINCT")
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the query plans and timings of get_games for every supported "
+        "filter, sort and pagination combination"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of timed requests per combination",
+        )
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=10,
+            help="Page requested in page number pagination",
+        )
+        parser.add_argument(
+            "--fields",
+            default="id,name,price",
+            help="fields parameter sent with every request",
+        )
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Print every query with its plan",
+        )
+
+    def explain(self, sql):
+        prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    """
+    Classify the plan of a game query.
+
+    Returns:
+        'full sort' if the whole table is scanned and sorted, 'sort' if only
+        the rows found through an index are sorted, '' if rows are read in
+        index order
+    """
+
+    def classify(self, plan):
+        if not any(marker in step for step in plan for marker in SORT_MARKERS):
+            return ""
+        if any(step.startswith("SCAN api_game") for step in plan):
+            return "full sort"
+        return "sort"
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        factory = RequestFactory()
+        full_sorts = []
+        with context:
+            for filter_by, sort, pagination in product(FILTERS, SORTS, PAGINATIONS):
+                params = {"fields": options["fields"], "count": "none"}
+                if filter_by:
+                    params["filterBy"] = filter_by
+                if sort:
+                    params["sortBy"], params["sortOrder"] = sort
+                if pagination == "cursor":
+                    params["pagination"] = "cursor"
+                else:
+                    params["page"] = options["page"]
+                request = factory.get("/api/games/", params, HTTP_HOST="localhost")
+
+                with CaptureQueriesContext(connection) as queries:
+                    get_games(request)
+                started = perf_counter()
+                for _ in range(options["repeat"]):
+                    get_games(request)
+                elapsed = (perf_counter() - started) / options["repeat"]
+
+                label = f"{filter_by or '-'} {'/'.join(sort) or 'id'} {pagination}"
+                kinds = set()
+                for query in queries:
+                    if 'FROM "api_game"' not in query["sql"]:
+                        continue
+                    plan = self.explain(query["sql"])
+                    kinds.add(self.classify(plan))
+                    if options["plans"]:
+                        self.stdout.write(f"  {query['sql']}")
+                        for step in plan:
+                            self.stdout.write(f"      {step}")
+
+                kind = "full sort" if "full sort" in kinds else max(kinds, default="")
+                if kind == "full sort":
+                    full_sorts.append(label)
+                self.stdout.write(f"{label:<64} {elapsed * 1000:8.2f} ms  {kind}")
+
+        if full_sorts:
+            self.stdout.write(f"{len(full_sorts)} combinations sort the whole table:")
+            for label in full_sorts:
+                self.stdout.write(f"  {label}")
+        else:
+            self.stdout.write("No combination sorts the whole table")
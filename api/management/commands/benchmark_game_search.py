@@ -0,0 +1,103 @@
+import random
+from contextlib import nullcontext
+from functools import reduce
+from operator import and_
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from api.models import Game
+from api.search import SearchResults, find_by_name, search_query
+from ._synthetic import synthetic_catalog
+
+PAGE_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare name lookups and searches through the full-text index with "
+        "the LIKE scans they replace"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=20,
+            help="Number of sampled names and queries",
+        )
+
+    def timed(self, function, values):
+        started = perf_counter()
+        results = [function(value) for value in values]
+        return results, (perf_counter() - started) / len(values)
+
+    def report(self, label, like_time, index_time):
+        self.stdout.write(
+            f"{label:<40} LIKE {like_time * 1000:8.2f} ms  "
+            f"index {index_time * 1000:8.2f} ms"
+        )
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        with context:
+            rng = random.Random(0)
+            names = list(Game.objects.values_list("name", flat=True))
+            if not names:
+                self.stdout.write("No games to search")
+                return
+            names = rng.sample(names, min(options["lookups"], len(names)))
+            games = Game.objects.all()
+
+            # Full names, and words from the middle of names
+            for label, lookups in (
+                ("name lookup, full name", names),
+                ("name lookup, partial name", [n.split()[1] for n in names]),
+            ):
+                expected, like_time = self.timed(
+                    lambda name: games.filter(name__icontains=name).first(), lookups
+                )
+                found, index_time = self.timed(
+                    lambda name: find_by_name(games, name), lookups
+                )
+                if found != expected:
+                    self.stderr.write(f"{label}: the index disagrees with LIKE")
+                self.report(label, like_time, index_time)
+
+            # Every word in the name or the description: whole names, whose
+            # numbers are rare, and two words, which most games contain
+            searches = (
+                ("search, whole name", names),
+                ("search, two words", [" ".join(n.split()[:2]) for n in names]),
+            )
+
+            def like(text):
+                words = text.split()
+                matches = games.filter(
+                    reduce(
+                        and_,
+                        (
+                            Q(name__icontains=word) | Q(about_the_game__icontains=word)
+                            for word in words
+                        ),
+                    )
+                )
+                return matches.count(), list(matches[:PAGE_SIZE])
+
+            def search(text):
+                results = SearchResults(search_query(text), games)
+                return results.count(), results[:PAGE_SIZE]
+
+            for label, queries in searches:
+                _, like_time = self.timed(like, queries)
+                _, index_time = self.timed(search, queries)
+                self.report(label, like_time, index_time)
@@ -0,0 +1,92 @@
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from api.models import Game
+from api.optimizer import optimize_queryset
+from api.serializers import GameSerializer, serialize_games
+from ._synthetic import synthetic_catalog
+
+"""Fields serialized in each run, None for all of them."""
+
+FIELD_SETS = (
+    None,
+    frozenset({"id", "name", "price", "release_date"}),
+    frozenset({"id", "name", "genres", "tags"}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare serializing pages of games with GameSerializer and with "
+        "serialize_games"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=100,
+            help="Number of games serialized per run",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of timed runs per field set",
+        )
+
+    def timed(self, function, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            result = function()
+        return result, (perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        renderer = JSONRenderer()
+        with context:
+            ids = list(
+                Game.objects.order_by("?").values_list("id", flat=True)[
+                    : options["page_size"]
+                ]
+            )
+            if not ids:
+                self.stdout.write("No games to serialize")
+                return
+
+            self.stdout.write(
+                f"{'fields':<40} {'GameSerializer':>14} {'serialize_games':>15}"
+            )
+            for fields in FIELD_SETS:
+
+                def model_serializer():
+                    games = optimize_queryset(
+                        Game.objects.filter(pk__in=ids), GameSerializer, fields
+                    )
+                    by_id = {
+                        game["id"]: game
+                        for game in GameSerializer(games, many=True, fields=fields).data
+                    }
+                    return [by_id[game_id] for game_id in ids]
+
+                expected, slow = self.timed(model_serializer, options["repeat"])
+                result, fast = self.timed(
+                    lambda: serialize_games(ids, fields), options["repeat"]
+                )
+                if renderer.render(result) != renderer.render(expected):
+                    self.stderr.write(f"{fields}: the outputs differ")
+                label = "all" if fields is None else ",".join(sorted(fields))
+                self.stdout.write(
+                    f"{label:<40} {slow * 1000:11.2f} ms {fast * 1000:12.2f} ms"
+                )
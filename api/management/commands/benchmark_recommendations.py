@@ -0,0 +1,113 @@
+import random
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from api.filter_index import filter_index
+from api.models import Game
+from api.recommendations import eligible_game_ids, recommendation_index
+from ._synthetic import synthetic_catalog
+
+"""Constraints of the timed constrained recommendations."""
+
+CONSTRAINTS = "platform(windows)&price(,19.99)"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sparse-matrix recommendation engine against the original "
+        "per-game scoring loop on synthetic catalogs of several sizes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000, 100000],
+            help="Catalog sizes to benchmark",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=20,
+            help="Number of reference games to score per catalog size",
+        )
+        parser.add_argument(
+            "--legacy-limit",
+            type=int,
+            default=10000,
+            help="Skip the original loop for catalogs larger than this",
+        )
+
+    def legacy_recommend(self, reference_game):
+        # The scoring loop get_recommended_games used before the matrix engine
+        ref_genres = set(g.genre for g in reference_game.genres.all())
+        ref_tags = set(t.tag for t in reference_game.tags.all())
+        ref_categories = set(c.category for c in reference_game.categories.all())
+
+        scored_games = []
+        for game in Game.objects.exclude(pk=reference_game.pk):
+            score = len(ref_genres & set(g.genre for g in game.genres.all())) * 3
+            score += len(ref_tags & set(t.tag for t in game.tags.all())) * 2
+            score += len(
+                ref_categories & set(c.category for c in game.categories.all())
+            )
+            if score > 0:
+                scored_games.append((score, game))
+
+        scored_games.sort(key=lambda x: x[0], reverse=True)
+        return [game.id for score, game in scored_games[:5]]
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+
+        for size in options["sizes"]:
+            self.stdout.write(f"Catalog of {size} games")
+            with synthetic_catalog(size, stdout=self.stdout):
+                game_ids = list(Game.objects.values_list("id", flat=True))
+                reference_ids = rng.sample(game_ids, min(options["queries"], size))
+
+                started = perf_counter()
+                recommendation_index.ensure_current()
+                build_time = perf_counter() - started
+
+                started = perf_counter()
+                for game_id in reference_ids:
+                    recommendation_index.recommend(game_id)
+                matrix_time = (perf_counter() - started) / len(reference_ids)
+
+                self.stdout.write(
+                    f"  matrix: build {build_time * 1000:.1f} ms, "
+                    f"{matrix_time * 1000:.2f} ms per query"
+                )
+
+                # Constraints are matched once per request, then tested for
+                # every scored game
+                filter_index.ensure_current()
+                started = perf_counter()
+                for game_id in reference_ids:
+                    recommendation_index.recommend(
+                        game_id, eligible=eligible_game_ids(CONSTRAINTS)
+                    )
+                constrained_time = (perf_counter() - started) / len(reference_ids)
+                self.stdout.write(
+                    f"  matrix with filterBy={CONSTRAINTS}: "
+                    f"{constrained_time * 1000:.2f} ms per query"
+                )
+
+                if size > options["legacy_limit"]:
+                    self.stdout.write("  loop:   skipped (see --legacy-limit)")
+                    continue
+
+                # The loop is slow, so only time a few reference games
+                started = perf_counter()
+                for game_id in reference_ids[:3]:
+                    expected = self.legacy_recommend(Game.objects.get(pk=game_id))
+                    actual = [g for g, _ in recommendation_index.recommend(game_id)]
+                    if expected != actual:
+                        self.stderr.write(f"  mismatch for game {game_id}")
+                loop_time = (perf_counter() - started) / min(3, len(reference_ids))
+
+                self.stdout.write(
+                    f"  loop:   {loop_time * 1000:.2f} ms per query "
+                    f"({loop_time / matrix_time:.0f}x slower)"
+                )
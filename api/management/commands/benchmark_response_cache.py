@@ -0,0 +1,70 @@
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from api.api import get_game, get_games, get_recommended_games
+from api.models import Game
+from ._synthetic import synthetic_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the read endpoints with their responses computed and served from "
+        "the response cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of timed requests per endpoint",
+        )
+
+    def timed(self, view, request, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            response = view(request)
+            if hasattr(response, "render"):
+                response.render()
+        return response, (perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        factory = RequestFactory()
+        with context, override_settings(RESPONSE_CACHE=True):
+            game_id = Game.objects.order_by("id").values_list("id", flat=True).first()
+            if game_id is None:
+                self.stdout.write("No games to request")
+                return
+            requests = (
+                ("get_game", get_game, {"id": game_id}),
+                ("get_games", get_games, {"page": 10}),
+                (
+                    "get_games",
+                    get_games,
+                    {"filterBy": "genre(genre 1)&price(,9.99)", "sortBy": "price"},
+                ),
+                ("get_recommended_games", get_recommended_games, {"id": game_id}),
+            )
+            for name, view, params in requests:
+                request = factory.get("/", params, HTTP_HOST="localhost")
+                with override_settings(RESPONSE_CACHE=False):
+                    _, computed = self.timed(view, request, options["repeat"])
+                view(request)
+                response, cached = self.timed(view, request, options["repeat"])
+                label = f"{name} {params}"
+                self.stdout.write(
+                    f"{label[:72]:<72} computed {computed * 1000:8.2f} ms  "
+                    f"{response['X-Cache'].lower()} {cached * 1000:6.3f} ms"
+                )
@@ -0,0 +1,72 @@
+from array import array
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.catalog import get_generation
+from api.recommendations import (
+    RECOMMENDATION_LIMIT,
+    recommendation_index,
+    stored_recommendations_many,
+)
+from api.snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the recommendation snapshot that worker processes map into "
+        "shared memory, replacing the previous one atomically"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.RECOMMENDATION_SNAPSHOT_PATH,
+            help="Path of the snapshot file (default: RECOMMENDATION_SNAPSHOT_PATH)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of games whose neighbour lists are read per batch",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+
+        # Read the generation first: a write made while the snapshot is built
+        # leaves it older than the catalog, so workers will not use it
+        generation = get_generation()
+        recommendation_index.reset()
+        recommendation_index.ensure_current()
+        index = recommendation_index
+
+        neighbour_ids = array("q")
+        neighbour_scores = array("q")
+        game_ids = list(index.game_ids)
+        for start in range(0, len(game_ids), chunk_size):
+            chunk = game_ids[start : start + chunk_size]
+            recommendations = stored_recommendations_many(chunk)
+            for game_id in chunk:
+                ranked = recommendations[game_id][:RECOMMENDATION_LIMIT]
+                padding = [(0, 0)] * (RECOMMENDATION_LIMIT - len(ranked))
+                for neighbour_id, score in ranked + padding:
+                    neighbour_ids.append(neighbour_id)
+                    neighbour_scores.append(score)
+
+        write_snapshot(
+            options["output"],
+            generation,
+            RECOMMENDATION_LIMIT,
+            {
+                "game_ids": index.game_ids,
+                "row_indptr": index.row_indptr,
+                "row_indices": index.row_indices,
+                "col_indptr": index.col_indptr,
+                "col_indices": index.col_indices,
+                "column_keys": index.column_keys,
+                "neighbour_ids": neighbour_ids,
+                "neighbour_scores": neighbour_scores,
+            },
+        )
+        self.stdout.write(
+            f"Wrote a snapshot of {len(game_ids)} games to {options['output']}"
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Game, GameRecommendation
+from api.recommendations import recommendation_index
+
+
+class Command(BaseCommand):
+    help = "Precompute the top recommendations of every game"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of recommendation rows written per insert",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        recommendation_index.ensure_current()
+
+        with transaction.atomic():
+            GameRecommendation.objects.all().delete()
+
+            rows = []
+            total = 0
+            for game_id in Game.objects.values_list("id", flat=True).iterator(
+                chunk_size=10000
+            ):
+                for rank, (neighbour_id, score) in enumerate(
+                    recommendation_index.recommend(game_id), start=1
+                ):
+                    rows.append(
+                        GameRecommendation(
+                            game_id=game_id,
+                            neighbour_id=neighbour_id,
+                            score=score,
+                            rank=rank,
+                        )
+                    )
+
+                if len(rows) >= batch_size:
+                    GameRecommendation.objects.bulk_create(rows)
+                    total += len(rows)
+                    rows = []
+
+            GameRecommendation.objects.bulk_create(rows)
+            total += len(rows)
+
+        self.stdout.write(f"Stored {total} recommendations")
@@ -0,0 +1,74 @@
+import math
+from array import array
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.catalog import bump_generation
+from api.models import Game, GameTextVector
+from api.text_index import (
+    TERM_BUCKETS,
+    TEXT_GENERATION_KEY,
+    term_counts,
+    tfidf_vector,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the TF-IDF term vectors of every game's name and description, "
+        "streaming games in chunks so memory use does not grow with the catalog"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of games read and written per batch",
+        )
+
+    def games(self, chunk_size):
+        return Game.objects.values_list("id", "name", "about_the_game").iterator(
+            chunk_size=chunk_size
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+
+        # First pass: document frequency of every term bucket
+        document_frequency = array("l", bytes(TERM_BUCKETS * array("l").itemsize))
+        documents = 0
+        for _, name, about_the_game in self.games(chunk_size):
+            for term in term_counts(name, about_the_game):
+                document_frequency[term] += 1
+            documents += 1
+
+        idf = array(
+            "d", (math.log((1 + documents) / (1 + df)) + 1 for df in document_frequency)
+        )
+        del document_frequency
+
+        # Second pass: write the vectors chunk by chunk
+        with transaction.atomic():
+            GameTextVector.objects.all().delete()
+
+            vectors = []
+            for game_id, name, about_the_game in self.games(chunk_size):
+                terms, weights = tfidf_vector(term_counts(name, about_the_game), idf)
+                vectors.append(
+                    GameTextVector(
+                        game_id=game_id,
+                        terms=terms.tobytes(),
+                        weights=weights.tobytes(),
+                    )
+                )
+                if len(vectors) >= chunk_size:
+                    GameTextVector.objects.bulk_create(vectors)
+                    vectors = []
+            GameTextVector.objects.bulk_create(vectors)
+
+            # Bulk writes send no signals; bump the text index counter kept in
+            # the database, together with the vectors, so that every worker
+            # reloads its text index, and only it, on its next read
+            bump_generation(TEXT_GENERATION_KEY)
+
+        self.stdout.write(f"Indexed {documents} games")
@@ -0,0 +1,24 @@
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from api.search import NAME_TABLE, SEARCH_TABLE
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search tables from the game table, e.g. after "
+        "loading data with the triggers disabled, then merge their segments"
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table in (SEARCH_TABLE, NAME_TABLE):
+                started = perf_counter()
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+                cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+                cursor.execute(f"SELECT count(*) FROM {table}_docsize")
+                documents = cursor.fetchone()[0]
+                self.stdout.write(
+                    f"Rebuilt {table}: {documents} games in "
+                    f"{perf_counter() - started:.2f} s"
+                )
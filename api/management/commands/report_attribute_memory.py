@@ -0,0 +1,130 @@
+import random
+import sys
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from api.bitsets import pack_bitsets
+from api.models import Game
+from api.recommendations import (
+    RELATIONS,
+    SIMILARITY_WEIGHTS,
+    load_features,
+    pair_score,
+    recommendation_index,
+)
+from ._synthetic import synthetic_catalog
+
+PER_GAMES = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the memory footprint per 100k games of the attribute encodings "
+        "used for recommendation scoring, and the cost of scoring one pair"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+        parser.add_argument(
+            "--pairs",
+            type=int,
+            default=200000,
+            help="Number of random game pairs scored for the timing",
+        )
+
+    def report(self, label, total_bytes, games):
+        per_games = total_bytes / games * PER_GAMES / (1024 * 1024)
+        self.stdout.write(f"  {label:<40} {per_games:8.1f} MiB per 100k games")
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        with context:
+            game_ids = list(Game.objects.values_list("id", flat=True))
+            if not game_ids:
+                self.stdout.write("No games to report on")
+                return
+            games = len(game_ids)
+            features = load_features()
+            recommendation_index.ensure_current()
+
+            self.stdout.write(f"Attribute encodings for {games} games")
+
+            # Per-request string sets, as built by the original scoring loop
+            size = 0
+            for game_id in game_ids:
+                by_relation = {relation: set() for relation in RELATIONS}
+                for relation, value_id in features.get(game_id, ()):
+                    by_relation[relation].add(f"{relation}-{value_id}")
+                size += sum(
+                    sys.getsizeof(values) + sum(map(sys.getsizeof, values))
+                    for values in by_relation.values()
+                )
+            self.report("sets of name strings", size, games)
+
+            # Frozensets of (relation, id) tuples
+            size = sum(
+                sys.getsizeof(frozenset(game_features))
+                + sum(map(sys.getsizeof, game_features))
+                for game_features in features.values()
+            )
+            self.report("frozensets of (relation, id) tuples", size, games)
+
+            # Python int bitsets, one per relation, in a tuple per game
+            row_bits = [
+                recommendation_index.row_bits(row)
+                for row in range(len(recommendation_index.game_ids))
+            ]
+            size = sum(
+                sys.getsizeof(bits) + sum(map(sys.getsizeof, bits)) for bits in row_bits
+            )
+            self.report("int bitsets (as built by the index)", size, games)
+
+            # Fixed-width uint64 arrays
+            size = 0
+            for position, relation in enumerate(RELATIONS):
+                words = recommendation_index.encoders[relation].words()
+                packed = pack_bitsets((bits[position] for bits in row_bits), words)
+                size += packed.itemsize * len(packed)
+                self.stdout.write(
+                    f"    {relation}: "
+                    f"{len(recommendation_index.encoders[relation].values)} values, "
+                    f"{words} x uint64 per game"
+                )
+            self.report("fixed-width uint64 arrays", size, games)
+
+            # Cost of scoring one pair with each representation
+            rng = random.Random(0)
+            pairs = [
+                (rng.randrange(len(row_bits)), rng.randrange(len(row_bits)))
+                for _ in range(options["pairs"])
+            ]
+            game_features = [
+                frozenset(features.get(game_id, ())) for game_id in game_ids
+            ]
+
+            started = perf_counter()
+            for a, b in pairs:
+                sum(
+                    SIMILARITY_WEIGHTS[relation]
+                    for relation, _ in game_features[a] & game_features[b]
+                )
+            set_time = perf_counter() - started
+
+            started = perf_counter()
+            for a, b in pairs:
+                pair_score(row_bits[a], row_bits[b])
+            bits_time = perf_counter() - started
+
+            self.stdout.write(
+                f"Pair scoring: sets {set_time / len(pairs) * 1e9:.0f} ns, "
+                f"bitsets {bits_time / len(pairs) * 1e9:.0f} ns per pair"
+            )
@@ -0,0 +1,87 @@
+import random
+from collections import Counter
+from contextlib import nullcontext
+from time import perf_counter
+from django.core.management.base import BaseCommand
+from api.lsh import MinHashIndex
+from api.models import Game
+from api.recommendations import recommendation_index
+from ._synthetic import synthetic_catalog
+
+
+class Command(BaseCommand):
+    help = (
+        "Report recall and latency of approximate (MinHash/LSH) recommendations "
+        "against the exact recommender for several band configurations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--configs",
+            nargs="+",
+            default=["8x8", "16x4", "32x2", "64x1"],
+            help="LSH configurations to compare, as BANDSxROWS",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=200,
+            help="Number of reference games sampled for the report",
+        )
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            default=0,
+            help="Run against a rolled-back synthetic catalog of this many games",
+        )
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            context = synthetic_catalog(options["synthetic"], stdout=self.stdout)
+        else:
+            context = nullcontext()
+
+        with context:
+            game_ids = list(Game.objects.values_list("id", flat=True))
+            if not game_ids:
+                self.stdout.write("No games to report on")
+                return
+            reference_ids = random.Random(0).sample(
+                game_ids, min(options["queries"], len(game_ids))
+            )
+
+            started = perf_counter()
+            exact = {
+                game_id: Counter(s for _, s in recommendation_index.recommend(game_id))
+                for game_id in reference_ids
+            }
+            exact_time = (perf_counter() - started) / len(reference_ids)
+            self.stdout.write(f"exact:  {exact_time * 1000:.2f} ms per query")
+
+            for config in options["configs"]:
+                bands, rows = (int(value) for value in config.split("x"))
+                index = MinHashIndex(bands=bands, rows=rows, register=False)
+
+                started = perf_counter()
+                index.ensure_current()
+                build_time = perf_counter() - started
+
+                found = expected = shortlisted = 0
+                started = perf_counter()
+                for game_id in reference_ids:
+                    # Compare score multisets so that equally scored games are
+                    # interchangeable, as they are for the exact recommender
+                    approx = Counter(s for _, s in index.recommend(game_id))
+                    found += sum((approx & exact[game_id]).values())
+                    expected += sum(exact[game_id].values())
+                query_time = (perf_counter() - started) / len(reference_ids)
+
+                for game_id in reference_ids:
+                    shortlisted += len(index.candidates(game_id))
+
+                self.stdout.write(
+                    f"{config:>6}: recall@5 {found / max(expected, 1):.3f}, "
+                    f"{query_time * 1000:.2f} ms per query, "
+                    f"{shortlisted / len(reference_ids):.0f} games shortlisted, "
+                    f"build {build_time:.1f} s"
+                )
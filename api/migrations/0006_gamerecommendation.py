@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_game_options_alter_game_required_age'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveIntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='api.game')),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_by', to='api.game')),
+            ],
+            options={
+                'ordering': ['game', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('game', 'rank'), name='unique_game_recommendation_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_gamerecommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameTextVector',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='text_vector', serialize=False, to='api.game')),
+                ('terms', models.BinaryField()),
+                ('weights', models.BinaryField()),
+            ],
+        ),
+    ]
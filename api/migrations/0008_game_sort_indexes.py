@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-17 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_gametextvector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['price', 'id'], name='game_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['metacritic_score', 'id'], name='game_metacritic_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['release_date', 'id'], name='game_release_id_idx'),
+        ),
+    ]
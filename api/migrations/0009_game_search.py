@@ -0,0 +1,51 @@
+# Generated by Django 5.1.4 on 2026-10-17 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_game_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE api_game_search USING fts5("
+                "name, about_the_game, content='api_game', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')",
+                "CREATE VIRTUAL TABLE api_game_name USING fts5("
+                "name, content='api_game', content_rowid='id', tokenize='trigram')",
+                "INSERT INTO api_game_search(api_game_search) VALUES ('rebuild')",
+                "INSERT INTO api_game_name(api_game_name) VALUES ('rebuild')",
+                "CREATE TRIGGER api_game_search_insert AFTER INSERT ON api_game BEGIN "
+                "INSERT INTO api_game_search(rowid, name, about_the_game) "
+                "VALUES (new.id, new.name, new.about_the_game); "
+                "INSERT INTO api_game_name(rowid, name) VALUES (new.id, new.name); "
+                "END",
+                "CREATE TRIGGER api_game_search_delete AFTER DELETE ON api_game BEGIN "
+                "INSERT INTO api_game_search(api_game_search, rowid, name, about_the_game) "
+                "VALUES ('delete', old.id, old.name, old.about_the_game); "
+                "INSERT INTO api_game_name(api_game_name, rowid, name) "
+                "VALUES ('delete', old.id, old.name); "
+                "END",
+                "CREATE TRIGGER api_game_search_update AFTER UPDATE OF name, about_the_game ON api_game BEGIN "
+                "INSERT INTO api_game_search(api_game_search, rowid, name, about_the_game) "
+                "VALUES ('delete', old.id, old.name, old.about_the_game); "
+                "INSERT INTO api_game_name(api_game_name, rowid, name) "
+                "VALUES ('delete', old.id, old.name); "
+                "INSERT INTO api_game_search(rowid, name, about_the_game) "
+                "VALUES (new.id, new.name, new.about_the_game); "
+                "INSERT INTO api_game_name(rowid, name) VALUES (new.id, new.name); "
+                "END",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER api_game_search_update",
+                "DROP TRIGGER api_game_search_delete",
+                "DROP TRIGGER api_game_search_insert",
+                "DROP TABLE api_game_name",
+                "DROP TABLE api_game_search",
+            ],
+        ),
+    ]
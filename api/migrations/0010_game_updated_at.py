@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-17 10:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Adding a column rebuilds api_game on SQLite, which drops the triggers
+# keeping the search tables of 0009_game_search in sync: they are dropped
+# before and created again after, in both directions
+DROP_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS api_game_search_update",
+    "DROP TRIGGER IF EXISTS api_game_search_delete",
+    "DROP TRIGGER IF EXISTS api_game_search_insert",
+]
+
+CREATE_TRIGGERS = [
+    "CREATE TRIGGER api_game_search_insert AFTER INSERT ON api_game BEGIN "
+    "INSERT INTO api_game_search(rowid, name, about_the_game) "
+    "VALUES (new.id, new.name, new.about_the_game); "
+    "INSERT INTO api_game_name(rowid, name) VALUES (new.id, new.name); "
+    "END",
+    "CREATE TRIGGER api_game_search_delete AFTER DELETE ON api_game BEGIN "
+    "INSERT INTO api_game_search(api_game_search, rowid, name, about_the_game) "
+    "VALUES ('delete', old.id, old.name, old.about_the_game); "
+    "INSERT INTO api_game_name(api_game_name, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "END",
+    "CREATE TRIGGER api_game_search_update AFTER UPDATE OF name, about_the_game ON api_game BEGIN "
+    "INSERT INTO api_game_search(api_game_search, rowid, name, about_the_game) "
+    "VALUES ('delete', old.id, old.name, old.about_the_game); "
+    "INSERT INTO api_game_name(api_game_name, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "INSERT INTO api_game_search(rowid, name, about_the_game) "
+    "VALUES (new.id, new.name, new.about_the_game); "
+    "INSERT INTO api_game_name(rowid, name) VALUES (new.id, new.name); "
+    "END",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_game_search'),
+    ]
+
+    operations = [
+        migrations.RunSQL(sql=DROP_TRIGGERS, reverse_sql=CREATE_TRIGGERS),
+        migrations.AddField(
+            model_name='game',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunSQL(sql=CREATE_TRIGGERS, reverse_sql=DROP_TRIGGERS),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_game_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogCounter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_catalogcounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("generation", models.BigIntegerField(db_index=True)),
+                ("game_id", models.BigIntegerField(null=True)),
+            ],
+        ),
+    ]
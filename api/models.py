@@ -89,6 +89,20 @@ This model stores comprehensive information about a video game, including:
 class Game(models.Model):
     class Meta:
         ordering = ["id"]
+        # One index per sortBy key, ending with id so that ties (and cursor
+        # pagination, which orders by (key, id)) are read in index order too.
+        # Filters get no composite indexes: each platform flag matches a
+        # large share of the games, so a page is found after a short scan of
+        # the sort index, and year() is a range on release_date, which no
+        # index can combine with another sort key; at most a year of matching
+        # games is then sorted
+        indexes = [
+            models.Index(fields=["price", "id"], name="game_price_id_idx"),
+            models.Index(
+                fields=["metacritic_score", "id"], name="game_metacritic_id_idx"
+            ),
+            models.Index(fields=["release_date", "id"], name="game_release_id_idx"),
+        ]
 
     name = models.TextField(null=False)
     release_date = models.DateField(null=False)
@@ -130,3 +144,81 @@ class Game(models.Model):
     categories = models.ManyToManyField(Category, blank=True)
     genres = models.ManyToManyField(Genre, blank=True)
     tags = models.ManyToManyField(Tag, blank=True)
+    # Time of the last write to the game or to its relations, for conditional
+    # GET (see api/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+"""
+Model storing the precomputed top recommendations of a game.
+
+Each row links a game to one of its most similar games (its neighbour) with the
+similarity score and the neighbour's 1-based position in the recommendation list.
+Rows are created by the build_recommendations command and kept up to date
+incrementally when games are created, updated or deleted through the API.
+"""
+
+
+class GameRecommendation(models.Model):
+    class Meta:
+        ordering = ["game", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["game", "rank"], name="unique_game_recommendation_rank"
+            ),
+        ]
+
+    game = models.ForeignKey(
+        Game, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    neighbour = models.ForeignKey(
+        Game, on_delete=models.CASCADE, related_name="recommended_by"
+    )
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+
+"""
+Model storing the TF-IDF term vector of a game's name and description.
+
+The vector is built by the build_text_index command using the hashing trick:
+`terms` holds the hashed term ids (unsigned 32-bit integers) and `weights` the
+matching L2-normalised TF-IDF weights (32-bit floats), both as packed arrays.
+"""
+
+
+class GameTextVector(models.Model):
+    game = models.OneToOneField(
+        Game, on_delete=models.CASCADE, primary_key=True, related_name="text_vector"
+    )
+    terms = models.BinaryField()
+    weights = models.BinaryField()
+
+
+"""
+Model storing the named counters versioning the catalog (see api/catalog.py).
+
+The counters live in the database so that every worker process reads the same
+values: a write made by one worker increments them, and the others notice it
+on their next read.
+"""
+
+
+class CatalogCounter(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+
+"""
+Model logging the games written at each catalog generation (see api/catalog.py).
+
+A worker that notices writes made by another one reads the entries of the
+generations it missed and refreshes only those games, instead of rebuilding
+its indexes. game_id is NULL when the written games are not known, and has no
+foreign key since deleted games are logged too.
+"""
+
+
+class CatalogChange(models.Model):
+    generation = models.BigIntegerField(db_index=True)
+    game_id = models.BigIntegerField(null=True)
@@ -0,0 +1,111 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework.relations import ManyRelatedField, RelatedField, SlugRelatedField
+
+"""
+Queryset planning derived from serializer fields.
+
+Serializing a relation field reads the related rows of every instance, which
+costs one query per instance and relation unless the queryset loads them up
+front. optimize_queryset() inspects the fields a serializer will output and
+applies the matching loading strategy, so that the number of queries of a
+read endpoint does not depend on how many rows it returns:
+
+    many-to-many relations   prefetch_related, loading only the slug column,
+                             in related id order
+    foreign keys             select_related
+    model columns            only(), so unused columns are not transferred
+
+Fields that read arbitrary attributes (methods, properties or source='*')
+disable only(), since the columns they need cannot be known.
+"""
+
+
+"""
+Return the (only, select_related, prefetch) plan of a serializer, cached.
+
+Returns:
+    only: Tuple of column names to load, or None to load every column
+    select_related: Tuple of foreign key paths to join
+    prefetch: Tuple of (source, related model, slug field or None)
+"""
+
+
+@lru_cache(maxsize=256)
+def queryset_plan(serializer_class, fields=None):
+    model = serializer_class.Meta.model
+    only, select_related, prefetch = ["pk"], [], []
+
+    for name, field in serializer_class().fields.items():
+        if fields is not None and name not in fields:
+            continue
+        if field.source == "*" or len(field.source_attrs) != 1:
+            only = None
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            # A property or method of the model
+            only = None
+            continue
+
+        if isinstance(field, ManyRelatedField):
+            child = field.child_relation
+            slug_field = (
+                child.slug_field if isinstance(child, SlugRelatedField) else None
+            )
+            prefetch.append((field.source, model_field.related_model, slug_field))
+        elif isinstance(field, RelatedField):
+            select_related.append(field.source)
+            if only is not None:
+                only.append(field.source)
+        elif only is not None and model_field.concrete:
+            only.append(field.source)
+
+    return (
+        None if only is None else tuple(only),
+        tuple(select_related),
+        tuple(prefetch),
+    )
+
+
+"""
+Return `queryset` set up to serialize its rows with `serializer_class`.
+
+Parameters:
+    queryset: Queryset of the serializer's model
+    serializer_class: ModelSerializer subclass used to render the rows
+    fields (optional): Names of the serializer fields that will be output
+        (all fields by default)
+    columns (optional): Extra model columns to load, e.g. a sort key read back
+        by the paginator
+"""
+
+
+def optimize_queryset(queryset, serializer_class, fields=None, columns=()):
+    only, select_related, prefetch = queryset_plan(
+        serializer_class, None if fields is None else frozenset(fields)
+    )
+
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch:
+        queryset = queryset.prefetch_related(
+            *(
+                Prefetch(
+                    source,
+                    # In related id order, as read by serialize_games()
+                    queryset=(
+                        related_model.objects.only(slug_field)
+                        if slug_field
+                        else related_model.objects.all()
+                    ).order_by("pk"),
+                )
+                for source, related_model, slug_field in prefetch
+            )
+        )
+    if only is not None:
+        queryset = queryset.only(*only, *columns)
+    return queryset
@@ -0,0 +1,318 @@
+import base64
+import hashlib
+import json
+from functools import partial, reduce
+from operator import or_
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import F, Max, Min, Q
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .catalog import get_generation
+
+
+class CursorError(ValueError):
+    pass
+
+
+"""Ways of counting the rows of a paginated listing, selected with ?count=."""
+
+COUNT_MODES = ("exact", "estimate", "none")
+
+"""Seconds an exact count stays cached (writes invalidate it earlier)."""
+
+COUNT_CACHE_TIMEOUT = 60 * 60
+
+"""Number and width (in ids) of the id ranges sampled to estimate a count."""
+
+ESTIMATE_WINDOWS = 4
+
+ESTIMATE_WINDOW_SIZE = 2500
+
+
+def _count_cache_key(key, generation=None):
+    digest = hashlib.sha1(key.encode()).hexdigest()
+    if generation is None:
+        return f"count:last:{digest}"
+    return f"count:{generation}:{digest}"
+
+
+"""
+Return the exact number of rows of a queryset, cached under `key` unless it is None.
+
+Counts are cached per catalog generation (see api.catalog), so any write to a
+game invalidates every cached count at once. The latest count of each key is
+also kept without a generation, as a cheap estimate for later requests.
+"""
+
+
+def cached_count(queryset, key):
+    if key is None:
+        return queryset.count()
+    cache_key = _count_cache_key(key, get_generation())
+    count = cache.get(cache_key)
+    if count is None:
+        count = queryset.count()
+        cache.set(cache_key, count, COUNT_CACHE_TIMEOUT)
+        cache.set(_count_cache_key(key), count, None)
+    return count
+
+
+"""
+Return (count, exact) for a queryset without counting all of its rows.
+
+In order of preference this is the exact count cached for the current
+generation, the last exact count cached for the key (which may miss recent
+writes), or an extrapolation from ESTIMATE_WINDOWS id ranges spread over the
+table, each counted through the primary key index.
+"""
+
+
+def estimate_count(queryset, key):
+    if key is not None:
+        count = cache.get(_count_cache_key(key, get_generation()))
+        if count is not None:
+            return count, True
+        count = cache.get(_count_cache_key(key))
+        if count is not None:
+            return count, False
+
+    bounds = queryset.model.objects.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return 0, True
+    span = bounds["last"] - bounds["first"] + 1
+    if span <= ESTIMATE_WINDOWS * ESTIMATE_WINDOW_SIZE:
+        # Small tables are cheaper to count than to sample
+        return cached_count(queryset, key), True
+
+    step = span // ESTIMATE_WINDOWS
+    windows = reduce(
+        or_,
+        (
+            Q(
+                id__gte=bounds["first"] + window * step,
+                id__lt=bounds["first"] + window * step + ESTIMATE_WINDOW_SIZE,
+            )
+            for window in range(ESTIMATE_WINDOWS)
+        ),
+    )
+    sampled = queryset.filter(windows).count()
+    return round(sampled * span / (ESTIMATE_WINDOWS * ESTIMATE_WINDOW_SIZE)), False
+
+
+"""Django paginator whose count can be supplied instead of queried."""
+
+
+class CountedPaginator(Paginator):
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+
+"""
+Page number pagination used by default for lists of games.
+
+Parameters:
+    count_key (optional): Key identifying the queryset, e.g. its normalized
+        filters; exact counts are then cached (see cached_count())
+    count_mode (optional): One of COUNT_MODES
+        - exact: Report the exact count (default)
+        - estimate: Report an estimate (see estimate_count())
+        - none: Report no count; only the rows up to the end of the page are read
+
+The response has the usual count, next, previous and results fields, plus
+count_exact telling whether count is exact (count is null in 'none' mode).
+"""
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = "pageSize"
+    max_page_size = 100
+
+    def __init__(self, count_key=None, count_mode="exact"):
+        self.count_key = count_key
+        self.count_mode = count_mode
+
+    """Return a lower bound of the count that tells whether the page has a successor."""
+
+    def probe_count(self, queryset, request, page_size):
+        try:
+            number = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+        except ValueError:
+            number = 1
+        offset = (number - 1) * page_size
+        return offset + len(
+            queryset.order_by().values_list("pk")[offset : offset + page_size + 1]
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count, self.count_exact = None, False
+        if self.count_mode == "exact":
+            self.count, self.count_exact = cached_count(queryset, self.count_key), True
+        elif self.count_mode == "estimate":
+            self.count, self.count_exact = estimate_count(queryset, self.count_key)
+
+        if self.count_exact:
+            count = self.count
+        else:
+            # Only read as far as the first row of the next page
+            count = self.probe_count(queryset, request, self.get_page_size(request))
+
+        self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.count,
+                "count_exact": self.count_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+"""
+Keyset (cursor) pagination over (sort key, id).
+
+Rows are ordered by the sort field, then by id in the same direction, and each
+page is read with a WHERE clause that starts right after the last row of the
+previous page. Unlike OFFSET, the database never walks over the rows of the
+earlier pages, and no COUNT(*) is issued, so every page costs about the same
+however deep it is. Rows with a NULL sort key come after all other rows in
+both directions.
+
+The position is returned as an opaque cursor in the `next` link. It also
+records the sort field and direction, so it cannot be replayed against a
+different ordering.
+
+Opt in with ?pagination=cursor; requests carrying a cursor use it implicitly.
+"""
+
+
+class KeysetPagination(BasePagination):
+    page_size = 100
+    page_size_query_param = "pageSize"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+
+    """Return True if the request asks for cursor pagination."""
+
+    @classmethod
+    def requested(cls, request):
+        return (
+            request.query_params.get(cls.mode_query_param, "").lower() == "cursor"
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def encode_cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            field, descending, value, pk = values
+            if not (
+                isinstance(field, str)
+                and isinstance(descending, bool)
+                and isinstance(pk, int)
+            ):
+                raise TypeError
+        except (ValueError, TypeError):
+            raise CursorError("Invalid cursor")
+        if (field, descending) != (self.field, self.descending):
+            raise CursorError("The cursor was issued for a different sort order")
+        if value is not None and field != "id":
+            try:
+                value = self.model_field.to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise CursorError("Invalid cursor")
+        return value, pk
+
+    """
+    Return the queryset ordered for keyset pagination.
+
+    Parameters:
+        queryset: Queryset of the rows to paginate
+        field: Name of the model field to sort by ('id' to sort by id only)
+        descending: Whether to sort in descending order
+    """
+
+    def order_queryset(self, queryset, field, descending):
+        pk_order = "-id" if descending else "id"
+        if field == "id":
+            return queryset.order_by(pk_order)
+        key = F(field)
+        key = key.desc(nulls_last=True) if descending else key.asc(nulls_last=True)
+        return queryset.order_by(key, pk_order)
+
+    """Return the filter selecting the rows after (value, pk) in sort order."""
+
+    def after(self, value, pk):
+        after_pk = Q(id__lt=pk) if self.descending else Q(id__gt=pk)
+        if self.field == "id":
+            return after_pk
+        if value is None:
+            return Q(**{f"{self.field}__isnull": True}) & after_pk
+
+        lookup = "lt" if self.descending else "gt"
+        return (
+            Q(**{f"{self.field}__{lookup}": value})
+            | (Q(**{self.field: value}) & after_pk)
+            | Q(**{f"{self.field}__isnull": True})
+        )
+
+    """
+    Return the rows of the requested page.
+
+    Raises:
+        CursorError: If the cursor is malformed or was issued for another ordering
+    """
+
+    def paginate_queryset(self, queryset, request, field="id", descending=False):
+        self.request = request
+        self.field = field
+        self.descending = descending
+        self.model_field = queryset.model._meta.get_field(field)
+        page_size = self.get_page_size(request)
+
+        queryset = self.order_queryset(queryset, field, descending)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(*self.decode_cursor(cursor)))
+
+        # One extra row tells whether there is a next page
+        rows = list(queryset[: page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        value = None
+        if self.field != "id":
+            value = getattr(last, self.field)
+            if value is not None:
+                value = self.model_field.value_to_string(last)
+        cursor = self.encode_cursor([self.field, self.descending, value, last.pk])
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
@@ -0,0 +1,545 @@
+import bisect
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, Max
+from .bitsets import BitsetEncoder
+from .catalog import CatalogIndex, get_generation
+from .filter_index import filter_index
+from .models import Game, GameRecommendation
+from .snapshot import recommendation_snapshot
+
+"""Points awarded for each attribute two games have in common."""
+
+SIMILARITY_WEIGHTS = {"genres": 3, "tags": 2, "categories": 1}
+
+RELATIONS = tuple(SIMILARITY_WEIGHTS)
+
+GENRE_WEIGHT, TAG_WEIGHT, CATEGORY_WEIGHT = SIMILARITY_WEIGHTS.values()
+
+"""Number of recommendations returned for a reference game."""
+
+RECOMMENDATION_LIMIT = 5
+
+"""Number of changed games kept in the overlay before the matrix is rebuilt."""
+
+OVERLAY_LIMIT = 1000
+
+"""Bits of a column key holding the value id; the relation number is above them."""
+
+VALUE_BITS = 48
+
+
+"""Return the column key of a (relation, value_id) feature."""
+
+
+def feature_key(feature):
+    relation, value_id = feature
+    return RELATIONS.index(relation) << VALUE_BITS | value_id
+
+
+"""Return the (relation, value_id) feature of a column key."""
+
+
+def key_feature(key):
+    return RELATIONS[key >> VALUE_BITS], key & ((1 << VALUE_BITS) - 1)
+
+
+"""
+Load the (relation, value_id) features of games from the ManyToMany through tables.
+
+Parameters:
+    game_ids (optional): Restrict the lookup to these games
+
+Returns:
+    dict mapping game id to the set of its features
+"""
+
+
+def load_features(game_ids=None):
+    features = defaultdict(set)
+    for relation in SIMILARITY_WEIGHTS:
+        field = Game._meta.get_field(relation)
+        game_column = f"{field.m2m_field_name()}_id"
+        rows = field.remote_field.through.objects.values_list(
+            game_column, f"{field.m2m_reverse_field_name()}_id"
+        )
+        if game_ids is not None:
+            rows = rows.filter(**{f"{game_column}__in": game_ids})
+        for game_id, value_id in rows.iterator(chunk_size=10000):
+            features[game_id].add((relation, value_id))
+    return features
+
+
+"""
+Return the similarity score of two games from their per-relation bitsets.
+
+Each shared attribute is one bit set in both bitsets, so the score is the
+weighted popcount of the AND of the two games' bitsets.
+"""
+
+
+def pair_score(bits, other_bits):
+    return (
+        GENRE_WEIGHT * (bits[0] & other_bits[0]).bit_count()
+        + TAG_WEIGHT * (bits[1] & other_bits[1]).bit_count()
+        + CATEGORY_WEIGHT * (bits[2] & other_bits[2]).bit_count()
+    )
+
+
+"""
+Weighted sparse game x feature matrix used to score game similarity.
+
+Each game is a row and each (relation, value_id) feature is a column holding
+the relation's weight. The matrix is stored twice in compact arrays:
+
+    CSR (row_indptr, row_indices): the features of each game
+    CSC (col_indptr, col_indices): the games having each feature, i.e. the
+        inverted index used for candidate generation
+
+Scoring a reference game is the product of the matrix with the reference
+game's feature vector. For every weighted feature of the reference game its
+column slice is fed to a Counter, whose counting loop runs in C, so the whole
+product is a handful of batched calls instead of one Python step per game.
+
+Columns are numbered in ascending order of their feature keys (see
+feature_key()), so column_keys is sorted and maps columns to features and,
+by binary search, features to columns. game_ids is sorted too, so rows are
+found the same way, and no mapping is built per worker.
+
+A row's attributes are encoded as one bitset per relation (see api.bitsets)
+when they are first needed, so the score of any pair of games is a weighted
+popcount of the AND of their bitsets, with no set or string objects involved.
+
+Games changed since the matrix was built are held in a small overlay that
+masks their stale rows; the matrix is rebuilt once the overlay grows past
+OVERLAY_LIMIT games.
+
+When a current snapshot file is published (see api.snapshot), the matrix
+arrays are read in place from its shared memory mapping instead of being
+built from the database by every worker.
+
+Attributes:
+    game_ids: Row number to game id, in ascending order
+    column_keys: Column number to feature key, in ascending order
+    encoders: Relation to the BitsetEncoder of its value ids
+    overlay: Game id to its current bitsets, or None if the game was deleted
+    snapshot: Snapshot the arrays are mapped from, or None if built from the database
+"""
+
+
+class RecommendationIndex(CatalogIndex):
+    def __init__(self):
+        super().__init__()
+        self._load(
+            array("q"),
+            array("q"),
+            array("q", [0]),
+            array("l"),
+            array("q", [0]),
+            array("l"),
+        )
+
+    def _load(
+        self, game_ids, column_keys, row_indptr, row_indices, col_indptr, col_indices
+    ):
+        self.game_ids = game_ids
+        self.column_keys = column_keys
+        self.row_indptr = row_indptr
+        self.row_indices = row_indices
+        self.col_indptr = col_indptr
+        self.col_indices = col_indices
+        self.encoders = {relation: BitsetEncoder() for relation in RELATIONS}
+        self.overlay = {}
+        self.snapshot = None
+
+    """Return the row of a game, or None if it is not in the matrix."""
+
+    def row_of(self, game_id):
+        row = bisect.bisect_left(self.game_ids, game_id)
+        if row < len(self.game_ids) and self.game_ids[row] == game_id:
+            return row
+        return None
+
+    """Return the column of a feature, or None if no game of the matrix has it."""
+
+    def column_of(self, feature):
+        key = feature_key(feature)
+        column = bisect.bisect_left(self.column_keys, key)
+        if column < len(self.column_keys) and self.column_keys[column] == key:
+            return column
+        return None
+
+    """Return the features of a row of the matrix."""
+
+    def row_features(self, row):
+        return frozenset(
+            key_feature(self.column_keys[column])
+            for column in self.row_indices[
+                self.row_indptr[row] : self.row_indptr[row + 1]
+            ]
+        )
+
+    """Return the tuple of per-relation bitsets of a row of the matrix."""
+
+    def row_bits(self, row):
+        return self.encode(self.row_features(row))
+
+    """Return the tuple of per-relation bitsets encoding a set of features."""
+
+    def encode(self, features):
+        values = {relation: [] for relation in RELATIONS}
+        for relation, value_id in features:
+            values[relation].append(value_id)
+        return tuple(
+            self.encoders[relation].encode(values[relation]) for relation in RELATIONS
+        )
+
+    def decode(self, bits):
+        return frozenset(
+            (relation, value_id)
+            for relation, relation_bits in zip(RELATIONS, bits)
+            for value_id in self.encoders[relation].decode(relation_bits)
+        )
+
+    def ensure_current(self):
+        with self._lock:
+            if recommendation_snapshot.reload():
+                # A new snapshot file was published; map it on the next build
+                self._generation = None
+            super().ensure_current()
+
+    """
+    Use the arrays of a snapshot file in place, if it matches the catalog.
+
+    The snapshot must have been taken at the current catalog generation, which
+    is kept in the database and so read alike by the command and every worker,
+    and hold the same games as the database, so a snapshot left behind by
+    another database or an older catalog is ignored.
+    """
+
+    def _attach(self, snapshot):
+        if snapshot.generation != get_generation():
+            return False
+        catalog = Game.objects.aggregate(count=Count("id"), last=Max("id"))
+        game_ids = snapshot.game_ids
+        if (catalog["count"], catalog["last"]) != (
+            len(game_ids),
+            game_ids[-1] if len(game_ids) else None,
+        ):
+            return False
+
+        self._load(
+            game_ids,
+            snapshot.column_keys,
+            snapshot.row_indptr,
+            snapshot.row_indices,
+            snapshot.col_indptr,
+            snapshot.col_indices,
+        )
+        self.snapshot = snapshot
+        return True
+
+    def build(self):
+        snapshot = recommendation_snapshot.current()
+        if snapshot is not None and self._attach(snapshot):
+            return
+
+        game_features = load_features()
+        game_ids = array(
+            "q",
+            Game.objects.order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=10000),
+        )
+
+        postings = defaultdict(list)
+        for row, game_id in enumerate(game_ids):
+            for feature in game_features.get(game_id, ()):
+                postings[feature_key(feature)].append(row)
+        column_keys = array("q", sorted(postings))
+        columns = {key: column for column, key in enumerate(column_keys)}
+
+        row_indptr = array("q", [0])
+        row_indices = array("l")
+        for game_id in game_ids:
+            row_indices.extend(
+                sorted(
+                    columns[feature_key(feature)]
+                    for feature in game_features.get(game_id, ())
+                )
+            )
+            row_indptr.append(len(row_indices))
+
+        col_indptr = array("q", [0])
+        col_indices = array("l")
+        for key in column_keys:
+            col_indices.extend(postings[key])
+            col_indptr.append(len(col_indices))
+
+        self._load(
+            game_ids, column_keys, row_indptr, row_indices, col_indptr, col_indices
+        )
+
+    """
+    Return the snapshot the index was loaded from, if no game changed since.
+
+    Its neighbour lists are then exactly the stored recommendations.
+    """
+
+    def current_snapshot(self):
+        with self._lock:
+            snapshot = self.snapshot
+            if snapshot is not None and self._generation == snapshot.generation:
+                return snapshot
+            return None
+
+    def refresh(self, game_ids):
+        game_ids = list(game_ids)
+        if len(self.overlay) + len(game_ids) > OVERLAY_LIMIT:
+            self.build()
+            return
+
+        game_features = load_features(game_ids)
+        existing = set(
+            Game.objects.filter(pk__in=game_ids).values_list("id", flat=True)
+        )
+        for game_id in game_ids:
+            if game_id in existing:
+                self.overlay[game_id] = self.encode(game_features.get(game_id, ()))
+            else:
+                self.overlay[game_id] = None
+
+    """Return the current bitsets of a game, or None if it is not indexed."""
+
+    def bits_of(self, game_id):
+        if game_id in self.overlay:
+            return self.overlay[game_id]
+        row = self.row_of(game_id)
+        return None if row is None else self.row_bits(row)
+
+    """Return the current features of a game, or None if it is not indexed."""
+
+    def features_of(self, game_id):
+        if game_id in self.overlay:
+            bits = self.overlay[game_id]
+            return None if bits is None else self.decode(bits)
+        row = self.row_of(game_id)
+        return None if row is None else self.row_features(row)
+
+    """Return a {game_id: score} mapping for every game sharing a feature with `features`."""
+
+    def score(self, features):
+        counts = Counter()
+        for feature in features:
+            column = self.column_of(feature)
+            if column is None:
+                continue
+            postings = self.col_indices[
+                self.col_indptr[column] : self.col_indptr[column + 1]
+            ]
+            for _ in range(SIMILARITY_WEIGHTS[feature[0]]):
+                counts.update(postings)
+
+        game_ids = self.game_ids
+        scores = {game_ids[row]: score for row, score in counts.items()}
+
+        # Rows of changed games are stale; score their current bitsets instead
+        bits = self.encode(features)
+        for game_id, game_bits in self.overlay.items():
+            scores.pop(game_id, None)
+            if game_bits:
+                score = pair_score(bits, game_bits)
+                if score:
+                    scores[game_id] = score
+        return scores
+
+    """
+    Return up to `limit` (game_id, score) pairs most similar to the given game.
+
+    Games are ranked by score, highest first, with ties broken by ascending id.
+    Games that share no attribute with the reference game are never returned.
+    When `eligible` is given (see eligible_game_ids()), only the game ids it
+    contains are ranked.
+    """
+
+    def recommend(self, game_id, limit=RECOMMENDATION_LIMIT, eligible=None):
+        self.ensure_current()
+
+        features = self.features_of(game_id)
+        if not features:
+            return []
+        scores = self.score(features)
+        scores.pop(game_id, None)
+        if eligible is not None:
+            scores = eligible.restrict(scores)
+
+        return heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+
+
+recommendation_index = RecommendationIndex()
+
+
+"""
+Return the materialized recommendations of several games in one query.
+
+Neighbour lists are read from the shared snapshot while no game has changed
+since it was taken, and from the GameRecommendation table otherwise. Games
+without stored rows, e.g. before build_recommendations has been run, are
+scored through the in-memory index instead.
+
+Returns:
+    dict mapping each game id to its list of (game_id, score) pairs
+"""
+
+
+def stored_recommendations_many(game_ids):
+    recommendations = {game_id: [] for game_id in game_ids}
+    pending = list(recommendations)
+
+    recommendation_index.ensure_current()
+    snapshot = recommendation_index.current_snapshot()
+    if snapshot is not None:
+        pending = []
+        for game_id in recommendations:
+            ranked = snapshot.recommendations(game_id)
+            if ranked is None:
+                pending.append(game_id)
+            else:
+                recommendations[game_id] = ranked
+        if not pending:
+            return recommendations
+
+    for game_id, neighbour_id, score in (
+        GameRecommendation.objects.filter(game_id__in=pending)
+        .order_by("game_id", "rank")
+        .values_list("game_id", "neighbour_id", "score")
+    ):
+        recommendations[game_id].append((neighbour_id, score))
+
+    for game_id in pending:
+        if not recommendations[game_id]:
+            recommendations[game_id] = recommendation_index.recommend(game_id)
+    return recommendations
+
+
+"""Return the materialized recommendations of a game as (game_id, score) pairs."""
+
+
+def stored_recommendations(game_id):
+    return stored_recommendations_many([game_id])[game_id]
+
+
+"""
+Replace the stored recommendation rows of the given games, in one transaction
+so that readers never see the lists deleted but not yet recreated.
+"""
+
+
+def _store(recommendations):
+    with transaction.atomic():
+        GameRecommendation.objects.filter(game_id__in=list(recommendations)).delete()
+        GameRecommendation.objects.bulk_create(
+            [
+                GameRecommendation(
+                    game_id=game_id, neighbour_id=neighbour_id, score=score, rank=rank
+                )
+                for game_id, ranked in recommendations.items()
+                for rank, (neighbour_id, score) in enumerate(ranked, start=1)
+            ],
+            batch_size=5000,
+        )
+
+
+"""Return the ids of games whose stored recommendations include the given game."""
+
+
+def recommendation_holders(game_id):
+    return set(
+        GameRecommendation.objects.filter(neighbour_id=game_id).values_list(
+            "game_id", flat=True
+        )
+    )
+
+
+"""
+Bring the stored recommendations up to date after a game has been written.
+
+Only neighbour lists that can have changed are touched:
+    - the written game's own list is recomputed
+    - lists that contained the game (its holders) are recomputed, since the
+      game's score against them may have dropped or the game may be gone
+    - every other game sharing an attribute with the written game gets the
+      game inserted into its list if it now outranks the list's last entry
+
+Parameters:
+    game_id: Id of the created, updated or deleted game
+    holders (optional): Result of recommendation_holders(game_id), which must be
+        collected before the game is deleted since the rows cascade with it
+"""
+
+
+def update_recommendations(game_id, holders=None):
+    if not GameRecommendation.objects.exists():
+        # Nothing has been materialized yet; build_recommendations does it all
+        return
+
+    if holders is None:
+        holders = recommendation_holders(game_id)
+
+    recommendation_index.ensure_current()
+    features = recommendation_index.features_of(game_id)
+
+    recompute = set(holders)
+    if features is not None:
+        recompute.add(game_id)
+    changed = {
+        other_id: recommendation_index.recommend(other_id) for other_id in recompute
+    }
+
+    scores = recommendation_index.score(features) if features else {}
+    candidates = [other_id for other_id in scores if other_id not in recompute]
+    # The lists are read and replaced in one transaction, so that they change
+    # all at once and a failure leaves them as they were
+    with transaction.atomic():
+        for start in range(0, len(candidates), 5000):
+            chunk = candidates[start : start + 5000]
+            current = defaultdict(list)
+            for other_id, neighbour_id, score in (
+                GameRecommendation.objects.filter(game_id__in=chunk)
+                .order_by("game_id", "rank")
+                .values_list("game_id", "neighbour_id", "score")
+            ):
+                current[other_id].append((neighbour_id, score))
+
+            for other_id in chunk:
+                ranked = current[other_id] + [(game_id, scores[other_id])]
+                ranked.sort(key=lambda item: (-item[1], item[0]))
+                if ranked[-1][0] != game_id or len(ranked) <= RECOMMENDATION_LIMIT:
+                    changed[other_id] = ranked[:RECOMMENDATION_LIMIT]
+
+        _store(changed)
+
+
+"""
+Return the game ids matching a filterBy expression, or None without one.
+
+The constraints are evaluated as a bitset by the in-memory catalog (see
+api.filter_index), without reading or materializing the ids of the matching
+games; the recommenders then test only the games they score for membership.
+
+Returns:
+    MatchedGames supporting `game_id in eligible`, or None
+
+Raises:
+    FilterError: If the expression is malformed
+"""
+
+
+def eligible_game_ids(filter_by):
+    if not filter_by:
+        return None
+    return filter_index.match(filter_by)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from .catalog import get_generation
+from .filters import filter_key
+from .lookups import names_generation
+
+"""
+Cache of the rendered responses of read endpoints.
+
+Responses are stored as rendered bytes under the endpoint name and the
+normalized query string, together with the catalog and attribute names
+generations they were computed at (see api.catalog and api.lookups). Any write
+to a game or an attribute therefore makes every cached response stale at once,
+without enumerating them. The generations are kept in the database, so this
+holds for every worker sharing the cache, whichever of them made the write.
+
+Stale responses are revalidated by one request at a time: the first request
+to find an entry stale recomputes it, and the requests arriving meanwhile are
+served the stale bytes instead of recomputing it too (stale-while-revalidate).
+Responses carry an X-Cache header telling whether they were a HIT, served
+STALE or a MISS.
+
+The cache used is settings.RESPONSE_CACHE_ALIAS, so responses can be kept in
+local memory or in a file or database cache backend.
+"""
+
+"""Seconds a response stays cached, a safety net for changes made outside the models."""
+
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+"""Seconds a request has to revalidate a stale response before another one may."""
+
+REVALIDATE_TIMEOUT = 30
+
+
+"""
+Return the query parameters of a request sorted by name, with filterBy
+expressions normalized by filter_key(), so that equivalent query strings give
+the same list.
+"""
+
+
+def normalized_params(request):
+    params = []
+    for param in sorted(request.GET):
+        values = request.GET.getlist(param)
+        if param == "filterBy":
+            values = [filter_key(value) for value in values]
+        params.append([param, values])
+    return params
+
+
+"""
+Return the cache key of a response, from the endpoint name, host and
+normalized query parameters. The host is part of the key because paginated
+responses hold absolute links.
+"""
+
+
+def response_cache_key(name, request):
+    digest = hashlib.sha1(
+        json.dumps(
+            [request.scheme, request.get_host(), normalized_params(request)]
+        ).encode()
+    ).hexdigest()
+    return f"response:{name}:{digest}"
+
+
+"""Return whether a request is a GET rendered as JSON, not by the browsable API."""
+
+
+def renders_json(request):
+    return (
+        request.method == "GET"
+        and "format" not in request.GET
+        and "text/html" not in request.META.get("HTTP_ACCEPT", "")
+    )
+
+
+def _cached_response(entry, state):
+    _, status, content_type, content = entry
+    response = HttpResponse(content, status=status, content_type=content_type)
+    response["X-Cache"] = state
+    return response
+
+
+"""
+Decorate a read view so that its successful JSON responses are cached.
+
+Apply it above @api_view, so that the responses it stores are rendered.
+Cached responses are plain HttpResponses holding the rendered bytes, without
+the .data of a DRF Response.
+"""
+
+
+def cached_response(name):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE or not renders_json(request):
+                return view(request, *args, **kwargs)
+
+            cache = caches[settings.RESPONSE_CACHE_ALIAS]
+            key = response_cache_key(name, request)
+            # Read before computing, so that a write made meanwhile leaves the
+            # stored response stale
+            version = (get_generation(), names_generation())
+            entry = cache.get(key)
+            revalidating = None
+            if entry is not None:
+                if entry[0] == version:
+                    return _cached_response(entry, "HIT")
+                revalidating = f"{key}:revalidating"
+                if not cache.add(revalidating, 1, REVALIDATE_TIMEOUT):
+                    return _cached_response(entry, "STALE")
+
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, "render"):
+                    # The content type is only known once rendered
+                    response.render()
+                content_type = response.get("Content-Type", "")
+                if response.status_code == 200 and content_type.startswith(
+                    "application/json"
+                ):
+                    cache.set(
+                        key,
+                        (version, response.status_code, content_type, response.content),
+                        RESPONSE_CACHE_TIMEOUT,
+                    )
+            finally:
+                if revalidating is not None:
+                    cache.delete(revalidating)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
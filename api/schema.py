@@ -49,6 +49,20 @@ def get_game_schema():
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. 'id,name,price,header_image' (default: every field; only the listed fields and included relations when given)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "include",
+                openapi.IN_QUERY,
+                description="Comma-separated relations to return, e.g. 'genres,tags'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -812,8 +826,13 @@ with support for filtering and sorting options.
 Query Parameters:
     filterBy (str, optional): Filter games by:
         - genre: Comma-separated list of genres (e.g. Action,RPG)
+        - tag, category, developer, publisher, language: Likewise for the other
+          attributes; 'all:' before the first value requires all of them
+          (e.g. tag(all:Indie,Roguelike))
         - platform: Comma-separated list of platforms (e.g. windows,mac,linux)
         - year: Comma-separated list of years (e.g. 2021,2022,2023)
+        - price: Inclusive price range, either bound may be empty (e.g. 0,19.99)
+        - requiredAge: Inclusive required age range (e.g. 0,16)
     sortBy (str, optional): Sort results by one of:
         - metacriticScore: Sort by Metacritic review score
         - price: Sort by game price
@@ -844,7 +863,7 @@ def get_games_schema():
             openapi.Parameter(
                 "filterBy",
                 openapi.IN_QUERY,
-                description="Filter games by 'genre(Action,RPG)', 'platform(windows,mac,linux)', or 'year(2021,2022,2023)'",
+                description="Filter games by 'genre(Action,RPG)', 'tag(all:Indie,Roguelike)', 'category(...)', 'developer(...)', 'publisher(...)', 'language(...)', 'platform(windows,mac,linux)', 'year(2021,2022,2023)', 'price(0,19.99)' or 'requiredAge(0,16)', combined with '&'",
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
@@ -878,6 +897,42 @@ def get_games_schema():
                 required=False,
                 default=100,
             ),
+            openapi.Parameter(
+                "count",
+                openapi.IN_QUERY,
+                description="'exact' (cached until the next write), 'estimate' or 'none'; count_exact in the response tells whether count is exact",
+                type=openapi.TYPE_STRING,
+                required=False,
+                default="exact",
+            ),
+            openapi.Parameter(
+                "pagination",
+                openapi.IN_QUERY,
+                description="'cursor' to page by (sort key, id) with an opaque cursor instead of page numbers; the response then has no count or previous link",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "cursor",
+                openapi.IN_QUERY,
+                description="Cursor taken from the 'next' link of the previous page in cursor pagination",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. 'id,name,price,header_image' (default: every field; only the listed fields and included relations when given)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "include",
+                openapi.IN_QUERY,
+                description="Comma-separated relations to return, e.g. 'genres,tags'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -886,6 +941,7 @@ def get_games_schema():
                     "application/json": [
                         {
                             "count": 10,
+                            "count_exact": True,
                             "next": None,
                             "previous": None,
                             "results": [
@@ -1114,6 +1170,12 @@ game attributes.
 Parameters:
     - id (int, optional): The unique identifier of the reference game
     - name (str, optional): The name of the reference game to search for
+    - mode (str, optional): 'exact' (default), 'approx' to score only the games
+      shortlisted by MinHash/LSH, or 'text' to blend in TF-IDF similarity of the
+      game names and descriptions
+    - textWeight (float, optional): Share of text similarity in 'text' mode
+    - filterBy (str, optional): Constraints on the recommended games, using the
+      get_games filterBy grammar plus price and requiredAge ranges
 
 Returns:
     swagger_auto_schema: A decorated schema containing:
@@ -1124,7 +1186,7 @@ Returns:
             - 200: Successful response with:
                 - reference_game: Full details of the requested game
                 - recommended_games: Array of up to 5 similar games with their details
-            - 400: Bad request when neither id nor name is provided
+            - 400: Bad request when neither id nor name is provided, or mode is invalid
             - 404: Game not found error
 
 Note:
@@ -1153,6 +1215,43 @@ def get_recommended_games_schema():
                 type=openapi.TYPE_STRING,
                 required=False,
             ),
+            openapi.Parameter(
+                "mode",
+                openapi.IN_QUERY,
+                description="Scoring mode: 'exact', 'approx' (MinHash/LSH shortlist) or 'text' (blend with description similarity)",
+                type=openapi.TYPE_STRING,
+                required=False,
+                default="exact",
+            ),
+            openapi.Parameter(
+                "textWeight",
+                openapi.IN_QUERY,
+                description="Share of description similarity in 'text' mode, between 0 and 1",
+                type=openapi.TYPE_NUMBER,
+                required=False,
+                default=0.5,
+            ),
+            openapi.Parameter(
+                "filterBy",
+                openapi.IN_QUERY,
+                description="Only recommend games matching these constraints, using the get_games filterBy grammar, e.g. 'platform(mac)&price(,9.99)'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. 'id,name,price,header_image' (default: every field; only the listed fields and included relations when given)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "include",
+                openapi.IN_QUERY,
+                description="Comma-separated relations to return, e.g. 'genres,tags'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -1493,3 +1592,456 @@ def get_recommended_games_schema():
             ),
         },
     )
+
+
+"""
+Swagger schema for the get_recommended_games_batch endpoint.
+
+This endpoint returns recommendations for several reference games at once, using
+the same scoring as get_recommended_games.
+
+Parameters:
+    - ids (str): Comma-separated ids of the reference games (at most 50)
+    - mode (str, optional): 'exact' (default), 'approx' or 'text'
+    - textWeight (float, optional): Share of text similarity in 'text' mode
+    - filterBy (str, optional): Constraints on the recommended games
+
+Returns:
+    swagger_auto_schema: A decorated schema containing:
+        - GET method specification
+        - Operation description
+        - Query parameters (ids, mode)
+        - Response schemas:
+            - 200: Successful response with:
+                - results: One entry per reference game with reference_game and
+                  recommended_games, in the requested order
+                - missing: Requested ids that do not match any game
+            - 400: Bad request when ids is missing, malformed or too long
+"""
+
+
+def get_recommended_games_batch_schema():
+    return swagger_auto_schema(
+        method="get",
+        operation_description="Get up to 5 recommended games for each of several reference games.",
+        manual_parameters=[
+            openapi.Parameter(
+                "ids",
+                openapi.IN_QUERY,
+                description="Comma-separated ids of the reference games (max 50)",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "mode",
+                openapi.IN_QUERY,
+                description="Scoring mode: 'exact', 'approx' (MinHash/LSH shortlist) or 'text' (blend with description similarity)",
+                type=openapi.TYPE_STRING,
+                required=False,
+                default="exact",
+            ),
+            openapi.Parameter(
+                "textWeight",
+                openapi.IN_QUERY,
+                description="Share of description similarity in 'text' mode, between 0 and 1",
+                type=openapi.TYPE_NUMBER,
+                required=False,
+                default=0.5,
+            ),
+            openapi.Parameter(
+                "filterBy",
+                openapi.IN_QUERY,
+                description="Only recommend games matching these constraints, using the get_games filterBy grammar, e.g. 'platform(mac)&price(,9.99)'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. 'id,name,price,header_image' (default: every field; only the listed fields and included relations when given)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "include",
+                openapi.IN_QUERY,
+                description="Comma-separated relations to return, e.g. 'genres,tags'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Successful response",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {
+                                "reference_game": {"id": 5504, "name": "ELDEN RING"},
+                                "recommended_games": [
+                                    {"id": 3162, "name": "DARK SOULS III"},
+                                ],
+                            }
+                        ],
+                        "missing": [999999],
+                    }
+                },
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "results": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    "reference_game": openapi.Schema(
+                                        type=openapi.TYPE_OBJECT
+                                    ),
+                                    "recommended_games": openapi.Schema(
+                                        type=openapi.TYPE_ARRAY,
+                                        items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                                    ),
+                                },
+                            ),
+                        ),
+                        "missing": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                        ),
+                    },
+                ),
+            ),
+            400: openapi.Response(
+                description="Bad Request - ids missing, malformed or too long",
+            ),
+        },
+    )
+
+
+"""
+Swagger schema for the search_games endpoint.
+
+This endpoint returns the games whose name or description contain every word
+of a query, best matches first.
+
+Parameters:
+    - q (str): Words to search for; the last one also matches as a prefix
+    - page (int, optional): Page number
+    - pageSize (int, optional): Number of results per page (default: 100, max: 100)
+    - fields, include (str, optional): As for get_games
+
+Returns:
+    swagger_auto_schema: A decorated schema containing:
+        - GET method specification
+        - Operation description
+        - Query parameters (q, page, pageSize, fields, include)
+        - Response schemas:
+            - 200: Successful response with count, next, previous and results
+            - 400: Bad request when q has no words or fields is invalid
+"""
+
+
+def search_games_schema():
+    return swagger_auto_schema(
+        method="get",
+        operation_description="Search games by name and description, best matches first.",
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Words to search for, e.g. 'elden ring'; matches in the name rank above matches in the description, and the last word also matches as a prefix",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "page",
+                openapi.IN_QUERY,
+                description="Page number",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+            ),
+            openapi.Parameter(
+                "pageSize",
+                openapi.IN_QUERY,
+                description="Number of results per page (max 100)",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                default=100,
+            ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. 'id,name,price,header_image' (default: every field; only the listed fields and included relations when given)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "include",
+                openapi.IN_QUERY,
+                description="Comma-separated relations to return, e.g. 'genres,tags'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Successful response",
+                examples={
+                    "application/json": {
+                        "count": 2,
+                        "count_exact": True,
+                        "next": None,
+                        "previous": None,
+                        "results": [
+                            {"id": 5504, "name": "ELDEN RING"},
+                            {"id": 3162, "name": "DARK SOULS III"},
+                        ],
+                    }
+                },
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "count": openapi.Schema(type=openapi.TYPE_INTEGER),
+                        "count_exact": openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        "next": openapi.Schema(type=openapi.TYPE_STRING),
+                        "previous": openapi.Schema(type=openapi.TYPE_STRING),
+                        "results": openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_OBJECT),
+                        ),
+                    },
+                ),
+            ),
+            400: openapi.Response(
+                description="Bad Request - q has no words or fields is invalid",
+            ),
+        },
+    )
+
+
+"""
+Swagger/OpenAPI schema definition for the autocomplete endpoint.
+
+This schema documents the API endpoint that completes a typed prefix into game
+names and genre, tag, developer and publisher values, correcting typos when
+the prefix as typed has too few completions.
+
+Parameters:
+    - q (str): Typed text
+    - types (str, optional): Comma-separated kinds of names to complete
+    - limit (int, optional): Maximum number of completions per kind (default: 10, max: 50)
+
+Returns:
+    swagger_auto_schema: A decorated schema containing:
+        - GET method specification
+        - Operation description
+        - Query parameters (q, types, limit)
+        - Response schemas:
+            - 200: Successful response with the completions of each kind
+            - 400: Bad request when types or limit is invalid
+"""
+
+
+def autocomplete_schema():
+    return swagger_auto_schema(
+        method="get",
+        operation_description="Complete a typed prefix into game names and genre, tag, developer and publisher values, tolerating typos.",
+        manual_parameters=[
+            openapi.Parameter(
+                "q",
+                openapi.IN_QUERY,
+                description="Typed text, e.g. 'dark so'; case is ignored",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+            openapi.Parameter(
+                "types",
+                openapi.IN_QUERY,
+                description="Comma-separated kinds of names to complete among game, genre, tag, developer and publisher (default: all)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Maximum number of completions per kind (max 50)",
+                type=openapi.TYPE_INTEGER,
+                required=False,
+                default=10,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Successful response; corrected is the corrected text used when the text as typed had too few completions",
+                examples={
+                    "application/json": {
+                        "query": "dark sous",
+                        "corrected": "dark souls",
+                        "results": {
+                            "game": [
+                                {"id": 3162, "name": "DARK SOULS III"},
+                                {"id": 4712, "name": "DARK SOULS: REMASTERED"},
+                            ],
+                            "tag": [],
+                        },
+                    }
+                },
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "query": openapi.Schema(type=openapi.TYPE_STRING),
+                        "corrected": openapi.Schema(type=openapi.TYPE_STRING),
+                        "results": openapi.Schema(type=openapi.TYPE_OBJECT),
+                    },
+                ),
+            ),
+            400: openapi.Response(
+                description="Bad Request - types or limit is invalid",
+            ),
+        },
+    )
+
+
+"""
+Swagger/OpenAPI schema definition for the get_game_facets endpoint.
+
+This schema documents the API endpoint that counts the games matching a
+filterBy expression by genre, tag, category, platform and release year.
+
+Parameters:
+    - filterBy (str, optional): Filter expression, as for get_games
+
+Returns:
+    swagger_auto_schema: A decorated schema containing:
+        - GET method specification
+        - Operation description
+        - Query parameters (filterBy)
+        - Response schemas:
+            - 200: Successful response with the count and facets
+            - 400: Bad request when filterBy is malformed
+"""
+
+
+def get_game_facets_schema():
+    return swagger_auto_schema(
+        method="get",
+        operation_description="Count the games matching a filter by genre, tag, category, platform and release year.",
+        manual_parameters=[
+            openapi.Parameter(
+                "filterBy",
+                openapi.IN_QUERY,
+                description="Filter games by 'genre(Action,RPG)', 'tag(all:Indie,Roguelike)', 'category(...)', 'developer(...)', 'publisher(...)', 'language(...)', 'platform(windows,mac,linux)', 'year(2021,2022,2023)', 'price(0,19.99)' or 'requiredAge(0,16)', combined with '&' (default: every game)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Successful response; values no matching game has are left out",
+                examples={
+                    "application/json": {
+                        "count": 16583,
+                        "facets": {
+                            "genres": [
+                                {"id": 1, "name": "Action", "count": 12341},
+                                {"id": 4, "name": "RPG", "count": 4210},
+                            ],
+                            "tags": [{"id": 2, "name": "Indie", "count": 9120}],
+                            "categories": [
+                                {"id": 3, "name": "Single-player", "count": 15022}
+                            ],
+                            "platforms": [
+                                {"name": "windows", "count": 16580},
+                                {"name": "mac", "count": 3121},
+                            ],
+                            "years": [
+                                {"year": 2022, "count": 7311},
+                                {"year": 2023, "count": 9272},
+                            ],
+                        },
+                    }
+                },
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        "count": openapi.Schema(type=openapi.TYPE_INTEGER),
+                        "facets": openapi.Schema(type=openapi.TYPE_OBJECT),
+                    },
+                ),
+            ),
+            400: openapi.Response(
+                description="Bad Request - filterBy is malformed",
+            ),
+        },
+    )
+
+
+"""
+Swagger/OpenAPI schema definition for the export_games endpoint.
+
+This schema documents the API endpoint that streams every game matching a
+filterBy expression as NDJSON or CSV, for clients mirroring the catalog.
+
+Parameters:
+    - filterBy (str, optional): Filter expression, as for get_games
+    - output (str, optional): 'ndjson' (default) or 'csv'
+    - fields, include (str, optional): As for get_games
+
+Returns:
+    swagger_auto_schema: A decorated schema containing:
+        - GET method specification
+        - Operation description
+        - Query parameters (filterBy, output, fields, include)
+        - Response schemas:
+            - 200: Streamed NDJSON or CSV attachment
+            - 400: Bad request when output, filterBy, fields or include is invalid
+"""
+
+
+def export_games_schema():
+    return swagger_auto_schema(
+        method="get",
+        operation_description="Stream every game matching a filter, in id order, as NDJSON (one game per line) or CSV.",
+        manual_parameters=[
+            openapi.Parameter(
+                "filterBy",
+                openapi.IN_QUERY,
+                description="Filter games by 'genre(Action,RPG)', 'tag(all:Indie,Roguelike)', 'category(...)', 'developer(...)', 'publisher(...)', 'language(...)', 'platform(windows,mac,linux)', 'year(2021,2022,2023)', 'price(0,19.99)' or 'requiredAge(0,16)', combined with '&' (default: every game)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "output",
+                openapi.IN_QUERY,
+                description="Export format: 'ndjson' or 'csv' (relations are joined by '|')",
+                type=openapi.TYPE_STRING,
+                enum=["ndjson", "csv"],
+                required=False,
+                default="ndjson",
+            ),
+            openapi.Parameter(
+                "fields",
+                openapi.IN_QUERY,
+                description="Comma-separated fields to return, e.g. 'id,name,price,header_image' (default: every field; only the listed fields and included relations when given)",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+            openapi.Parameter(
+                "include",
+                openapi.IN_QUERY,
+                description="Comma-separated relations to return, e.g. 'genres,tags'",
+                type=openapi.TYPE_STRING,
+                required=False,
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Streamed attachment, e.g. one JSON object per line:\n\n"
+                '{"id":5504,"name":"ELDEN RING","price":"59.99"}\n'
+                '{"id":5505,"name":"Hades","price":"24.99"}',
+            ),
+            400: openapi.Response(
+                description="Bad Request - output, filterBy, fields or include is invalid",
+            ),
+        },
+    )
@@ -0,0 +1,124 @@
+import re
+from django.db import connection
+
+"""
+Full-text search over game names and descriptions, backed by SQLite FTS5.
+
+Two external-content FTS5 tables index the api_game table without copying it
+(see migration 0009). Triggers on api_game keep them in sync, so every write
+path stays indexed, bulk_create and queryset.update() included:
+
+    api_game_search  name and about_the_game split into words, for ranked
+                     search (bm25)
+    api_game_name    name split into trigrams, for case-insensitive substring
+                     lookups by name, as with name__icontains but without
+                     scanning the table
+
+Use `manage.py rebuild_search_index` to rebuild both tables from api_game.
+"""
+
+SEARCH_TABLE = "api_game_search"
+
+NAME_TABLE = "api_game_name"
+
+"""bm25 weights of the name and about_the_game columns of SEARCH_TABLE."""
+
+SEARCH_WEIGHTS = (10.0, 1.0)
+
+"""Trigram lookups need at least this many characters; shorter names are scanned."""
+
+MIN_NAME_LENGTH = 3
+
+TERM_PATTERN = re.compile(r"\w+")
+
+
+"""
+Return the FTS5 query matching games containing every word of `text`, the
+last one as a prefix so that partially typed words match, or None if `text`
+has no words.
+"""
+
+
+def search_query(text):
+    terms = [f'"{term}"' for term in TERM_PATTERN.findall(text or "")]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+"""
+Return the game with the lowest id whose name contains `name`, ignoring case,
+or None; the game is loaded with `queryset`.
+
+Names of at least MIN_NAME_LENGTH characters are found through the trigram
+index, which yields matches in id order, so only the first one is read.
+Shorter ones, and databases other than SQLite, fall back to a
+name__icontains scan.
+"""
+
+
+def find_by_name(queryset, name):
+    if connection.vendor != "sqlite" or len(name) < MIN_NAME_LENGTH:
+        return queryset.filter(name__icontains=name).first()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {NAME_TABLE} WHERE {NAME_TABLE} MATCH %s "
+            "ORDER BY rowid LIMIT 1",
+            ['"' + name.replace('"', '""') + '"'],
+        )
+        row = cursor.fetchone()
+    return None if row is None else queryset.filter(pk=row[0]).first()
+
+
+"""
+Games matching a search, best first, as a lazy sequence.
+
+Its length is the number of matches, and slicing it reads the ids of the
+slice from the FTS5 index and loads only those games, so it can be handed to
+Django's Paginator. Games with equal scores are in id order.
+
+Parameters:
+    query: FTS5 query, as returned by search_query()
+    queryset: Queryset used to load the games of a slice
+"""
+
+
+class SearchResults:
+    def __init__(self, query, queryset):
+        self.query = query
+        self.queryset = queryset
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+                    [self.query],
+                )
+                self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    """Return the ids of the games from position start up to stop."""
+
+    def ids(self, start, stop):
+        weights = ", ".join(map(str, SEARCH_WEIGHTS))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s OFFSET %s",
+                [self.query, max(stop - start, 0), start],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index : index + 1][0]
+        start, stop, _ = index.indices(self.count())
+        ids = self.ids(start, stop)
+        games = self.queryset.in_bulk(ids)
+        return [games[game_id] for game_id in ids if game_id in games]
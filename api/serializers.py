@@ -1,3 +1,5 @@
+from collections import defaultdict
+from functools import lru_cache
 from rest_framework import serializers
 from .models import (
     SupportedLanguage,
@@ -24,6 +26,9 @@ Attributes:
     categories: Steam categories (e.g., Single-player, Multi-player)
     genres: Game genres (e.g., Action, RPG)
     tags: User-defined tags describing the game
+
+Pass fields=[...] to output only a subset of the fields, e.g. for sparse
+fieldsets requested by API clients.
 """
 
 
@@ -54,6 +59,12 @@ class GameSerializer(serializers.ModelSerializer):
         many=True, slug_field="tag", queryset=Tag.objects.all()
     )
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     """Meta class defining the model and fields for serialization."""
 
     class Meta:
@@ -90,3 +101,117 @@ class GameSerializer(serializers.ModelSerializer):
             "genres",
             "tags",
         ]
+
+
+"""
+Read-only serialization of games, with the output of GameSerializer.
+
+Columns are read with .values() and every many-to-many relation with one
+query of (game id, slug) pairs in related id order, the order in which
+optimize_queryset() prefetches them, so no model instance is created and no
+serializer is bound per game. Values are converted by the serializer fields
+of GameSerializer, except for the fields whose to_representation() returns
+database values unchanged.
+
+GameSerializer stays in use for writes and single games.
+"""
+
+# Serializer fields whose to_representation() returns database values as they are
+_UNCONVERTED_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+)
+
+
+"""
+Return the (columns, relations, outputs) plan of serialize_games(), cached.
+
+Returns:
+    columns: Tuple of the game columns to read
+    relations: Tuple of (name, through model, game column, slug path, related
+        column) of the many-to-many fields
+    outputs: Tuple of (name, column or None for a relation, converter or None)
+        in GameSerializer order
+"""
+
+
+@lru_cache(maxsize=256)
+def _read_plan(fields=None):
+    columns, relations, outputs = ["id"], [], []
+    for name, field in GameSerializer(fields=fields).fields.items():
+        if isinstance(field, serializers.ManyRelatedField):
+            model_field = Game._meta.get_field(field.source)
+            game_column = f"{model_field.m2m_field_name()}_id"
+            related = model_field.m2m_reverse_field_name()
+            relations.append(
+                (
+                    name,
+                    model_field.remote_field.through,
+                    game_column,
+                    f"{related}__{field.child_relation.slug_field}",
+                    f"{related}_id",
+                )
+            )
+            outputs.append((name, None, None))
+        else:
+            if field.source not in columns:
+                columns.append(field.source)
+            convert = (
+                None
+                if isinstance(field, _UNCONVERTED_FIELDS)
+                else field.to_representation
+            )
+            outputs.append((name, field.source, convert))
+    return tuple(columns), tuple(relations), tuple(outputs)
+
+
+"""
+Serialize games as GameSerializer would, without instantiating them.
+
+Parameters:
+    game_ids: Ids of the games
+    fields (optional): Fields to output, as for GameSerializer
+
+Returns:
+    List of the serialized existing games among game_ids, in the same order
+"""
+
+
+def serialize_games(game_ids, fields=None):
+    columns, relations, outputs = _read_plan(
+        None if fields is None else frozenset(fields)
+    )
+    game_ids = list(game_ids)
+    rows = {
+        row["id"]: row
+        for row in Game.objects.filter(pk__in=game_ids).order_by().values(*columns)
+    }
+
+    slugs = {}
+    for name, through, game_column, slug_path, related_column in relations:
+        slugs[name] = grouped = defaultdict(list)
+        pairs = (
+            through.objects.filter(**{f"{game_column}__in": list(rows)})
+            .order_by(related_column)
+            .values_list(game_column, slug_path)
+        )
+        for game_id, slug in pairs:
+            grouped[game_id].append(slug)
+
+    games = []
+    for game_id in game_ids:
+        row = rows.get(game_id)
+        if row is None:
+            continue
+        game = {}
+        for name, column, convert in outputs:
+            if column is None:
+                game[name] = slugs[name].get(game_id, [])
+            else:
+                value = row[column]
+                game[name] = (
+                    value if convert is None or value is None else convert(value)
+                )
+        games.append(game)
+    return games
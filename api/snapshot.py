@@ -0,0 +1,202 @@
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from threading import Lock
+from django.conf import settings
+
+"""
+Read-only recommendation snapshots shared between worker processes.
+
+A snapshot is a single file holding the sparse feature matrix of the
+recommendation index (see api.recommendations.RecommendationIndex) and the
+top neighbour list of every game, as flat arrays of fixed-width integers.
+Workers map the file with mmap and read the arrays in place through
+memoryviews, so every worker on a machine shares the same physical pages
+instead of keeping its own copy.
+
+Snapshots are written to a temporary file that replaces the previous one with
+os.replace(), so a reader either sees the old file or the complete new one.
+Readers stat the path before using the snapshot and map the new file when it
+changed; mappings still referenced by in-flight requests stay valid until the
+last reference to them is dropped.
+
+File layout (little-endian):
+    header: HEADER, with the number of items in each section
+    sections: the arrays of SECTIONS in order, each padded to 8 bytes
+"""
+
+MAGIC = b"GAMEREC\x00"
+
+FORMAT_VERSION = 2
+
+"""Arrays stored in a snapshot, in file order, with their typecodes."""
+
+SECTIONS = (
+    ("game_ids", "q"),
+    ("row_indptr", "q"),
+    ("row_indices", "q"),
+    ("col_indptr", "q"),
+    ("col_indices", "q"),
+    ("column_keys", "q"),
+    ("neighbour_ids", "q"),
+    ("neighbour_scores", "q"),
+)
+
+"""Magic, format version, neighbours per game, catalog generation, section lengths."""
+
+HEADER = struct.Struct("<8sIIq" + "q" * len(SECTIONS))
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+"""
+Atomically write a snapshot file.
+
+Parameters:
+    path: Destination of the snapshot
+    generation: Catalog generation the arrays were built at
+    limit: Number of neighbour slots per game in neighbour_ids/neighbour_scores
+    arrays: Mapping of every section name in SECTIONS to its values
+"""
+
+
+def write_snapshot(path, generation, limit, arrays):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(
+                HEADER.pack(
+                    MAGIC,
+                    FORMAT_VERSION,
+                    limit,
+                    generation,
+                    *(len(arrays[name]) for name, _ in SECTIONS),
+                )
+            )
+            for name, typecode in SECTIONS:
+                values = arrays[name]
+                if not isinstance(values, array) or values.typecode != typecode:
+                    values = array(typecode, values)
+                file.write(values.tobytes())
+                file.write(bytes(-file.tell() % 8))
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+"""
+A snapshot file mapped in memory.
+
+Every section of SECTIONS is available as a read-only memoryview attribute of
+the same name. game_ids and column_keys are sorted, so games and features are
+found by binary search.
+
+Attributes:
+    key: (inode, mtime, size) of the mapped file, used to detect replacements
+    limit: Number of neighbour slots per game
+    generation: Catalog generation the snapshot was built at
+"""
+
+
+class Snapshot:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_size < HEADER.size:
+                raise SnapshotError(f"{path} is not a recommendation snapshot")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        magic, version, self.limit, self.generation, *lengths = HEADER.unpack_from(
+            self._map
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} snapshot")
+
+        view = memoryview(self._map)
+        offset = HEADER.size
+        for (name, typecode), length in zip(SECTIONS, lengths):
+            size = length * array(typecode).itemsize
+            if offset + size > len(self._map):
+                raise SnapshotError(f"{path} is truncated")
+            setattr(self, name, view[offset : offset + size].cast(typecode))
+            offset += size + (-size % 8)
+
+    """Return the row of a game, or None if it is not in the snapshot."""
+
+    def row_of(self, game_id):
+        row = bisect.bisect_left(self.game_ids, game_id)
+        if row < len(self.game_ids) and self.game_ids[row] == game_id:
+            return row
+        return None
+
+    """Return the (game_id, score) neighbours of a game, or None if it is not in the snapshot."""
+
+    def recommendations(self, game_id):
+        row = self.row_of(game_id)
+        if row is None:
+            return None
+        start = row * self.limit
+        return [
+            (neighbour_id, score)
+            for neighbour_id, score in zip(
+                self.neighbour_ids[start : start + self.limit],
+                self.neighbour_scores[start : start + self.limit],
+            )
+            if neighbour_id
+        ]
+
+
+"""
+The snapshot currently published at settings.RECOMMENDATION_SNAPSHOT_PATH.
+
+reload() compares the file on disk with the mapped one and swaps in the new
+file when it was replaced. A missing or unreadable file means no snapshot,
+and callers fall back to building from the database.
+"""
+
+
+class SnapshotFile:
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot = None
+
+    def path(self):
+        return getattr(settings, "RECOMMENDATION_SNAPSHOT_PATH", None)
+
+    def current(self):
+        return self._snapshot
+
+    """Map the snapshot file again if it changed; return True if it did."""
+
+    def reload(self):
+        path = self.path()
+        try:
+            stat = os.stat(path) if path else None
+        except OSError:
+            stat = None
+        key = stat and (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            current = self._snapshot
+            if (current.key if current else None) == key:
+                return False
+            try:
+                self._snapshot = Snapshot(path) if key else None
+            except (OSError, SnapshotError):
+                self._snapshot = None
+            return self._snapshot is not current
+
+
+recommendation_snapshot = SnapshotFile()
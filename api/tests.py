@@ -1,6 +1,13 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db.models import F
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from .models import (
     SupportedLanguage,
@@ -11,8 +18,50 @@ from .models import (
     Genre,
     Tag,
     Game,
+    GameRecommendation,
 )
-from datetime import datetime
+from .catalog import (
+    bump_generation,
+    get_generation,
+    record_catalog_change,
+    reset_indexes,
+)
+from .lsh import MinHashIndex
+from .text_index import TEXT_GENERATION_KEY
+from .filter_index import NULL_VALUE, MatchedGames, filter_index
+from .filters import filter_games
+from .api import GAME_RELATIONS
+from .export import game_chunks
+from .pagination import KeysetPagination
+from .response_cache import response_cache_key
+from .optimizer import optimize_queryset
+from .serializers import GameSerializer, serialize_games
+from .bitsets import (
+    BitsetEncoder,
+    bitset_from_positions,
+    from_bitset,
+    pack_bitsets,
+    popcount,
+    select_bits,
+    unpack_bitset,
+)
+from .recommendations import (
+    SIMILARITY_WEIGHTS,
+    eligible_game_ids,
+    pair_score,
+    recommendation_index,
+    stored_recommendations,
+    stored_recommendations_many,
+)
+from array import array
+from datetime import datetime, timedelta
+from io import StringIO
+import csv
+import json
+from itertools import product
+import os
+import tempfile
+from unittest import mock
 from decimal import Decimal
 
 
@@ -21,6 +70,7 @@ class GameAPITests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
+        reset_indexes()
 
         # Create test instances of related models
         self.language = SupportedLanguage.objects.create(supported_language="English")
@@ -67,6 +117,108 @@ class GameAPITests(TestCase):
         response = self.client.get(reverse("get_game"))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    """Test name lookups and ranked search through the full-text index."""
+
+    def test_search(self):
+        self.game1.about_the_game = "A quiet farming story with dragons"
+        self.game1.save()
+        Game.objects.create(
+            name="Dragon Quest",
+            release_date=datetime(2022, 1, 1),
+            price=Decimal("9.99"),
+            about_the_game="Slay the dragon",
+        )
+
+        # Substring lookups by name, as with icontains, kept in sync on writes
+        for name, expected in (("game 2", "Test Game 2"), ("ON QU", "Dragon Quest")):
+            response = self.client.get(reverse("get_game"), {"name": name})
+            self.assertEqual(response.data["name"], expected)
+        self.game2.name = "Renamed"
+        self.game2.save()
+        response = self.client.get(reverse("get_game"), {"name": "game 2"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("get_game"), {"name": "me"})
+        self.assertEqual(response.data["name"], "Test Game 1")
+
+        url = reverse("search_games")
+        response = self.client.get(url, {"q": "dragon", "fields": "id,name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        # Name matches rank first
+        self.assertEqual(
+            [g["name"] for g in response.data["results"]],
+            ["Dragon Quest", "Test Game 1"],
+        )
+        response = self.client.get(url, {"q": "farm"})
+        self.assertEqual([g["name"] for g in response.data["results"]], ["Test Game 1"])
+        response = self.client.get(url, {"q": "dragon slay", "pageSize": 1})
+        self.assertEqual(response.data["count"], 1)
+        self.assertIsNone(response.data["next"])
+        response = self.client.get(url, {"q": " ,. "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test completing game names and attribute values, with typos."""
+
+    def test_autocomplete(self):
+        url = reverse("autocomplete")
+        Genre.objects.create(genre="Strategy")
+        dragon = Game.objects.create(
+            name="Dragon Quest",
+            release_date=datetime(2022, 1, 1),
+            price=Decimal("9.99"),
+        )
+
+        def complete(q, **params):
+            response = self.client.get(url, {"q": q, **params})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return response.data
+
+        data = complete("  TEST g", types="game")
+        self.assertIsNone(data["corrected"])
+        self.assertEqual(
+            data["results"],
+            {
+                "game": [
+                    {"id": self.game1.id, "name": "Test Game 1"},
+                    {"id": self.game2.id, "name": "Test Game 2"},
+                ]
+            },
+        )
+        self.assertEqual(
+            complete("test", types="game", limit=1)["results"]["game"],
+            [{"id": self.game1.id, "name": "Test Game 1"}],
+        )
+        self.assertEqual(
+            complete("strat")["results"]["genre"],
+            [{"id": Genre.objects.get(genre="Strategy").id, "name": "Strategy"}],
+        )
+
+        # Misspelled words, complete or partially typed, are corrected
+        data = complete("dragn", types="game")
+        self.assertEqual(data["corrected"], "dragon")
+        self.assertEqual(
+            data["results"]["game"], [{"id": dragon.id, "name": "Dragon Quest"}]
+        )
+        self.assertEqual(complete("drsgon qu", types="game")["corrected"], "dragon qu")
+        self.assertEqual(complete("xyz", types="game")["results"]["game"], [])
+
+        # Writes are picked up without a rebuild
+        dragon.name = "Wyvern Quest"
+        dragon.save()
+        self.assertEqual(complete("dragn", types="game")["results"]["game"], [])
+        self.assertEqual(
+            complete("wyvren", types="game")["results"]["game"],
+            [{"id": dragon.id, "name": "Wyvern Quest"}],
+        )
+        Tag.objects.create(tag="Wyverns")
+        self.assertEqual(len(complete("wyv", types="tag")["results"]["tag"]), 1)
+        self.game1.delete()
+        self.assertEqual(len(complete("test")["results"]["game"]), 1)
+
+        for params in ({"types": "game,studio"}, {"limit": "0"}, {"limit": "x"}):
+            response = self.client.get(url, {"q": "t", **params})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     """Test creating a new game with valid data."""
 
     def test_create_game(self):
@@ -173,6 +325,122 @@ class GameAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 2)
 
+    """Test cached, estimated and omitted counts of the game listing."""
+
+    @override_settings(GAME_LISTING_INDEX=False)
+    def test_listing_counts(self):
+        url = reverse("get_games")
+
+        def counts(params):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            counted = any("COUNT(" in query["sql"] for query in queries)
+            return response.data, counted
+
+        data, counted = counts({"filterBy": "year(2021,2020)&price(,50)"})
+        self.assertEqual((data["count"], data["count_exact"], counted), (2, True, True))
+
+        # Same filters in another order: served from the cache
+        data, counted = counts({"filterBy": "price(,50)&year(2020,2021)"})
+        self.assertEqual(
+            (data["count"], data["count_exact"], counted), (2, True, False)
+        )
+        data, counted = counts(
+            {"filterBy": "price(,50)&year(2020,2021)", "count": "estimate"}
+        )
+        self.assertEqual(
+            (data["count"], data["count_exact"], counted), (2, True, False)
+        )
+
+        # A write invalidates the cached count
+        Game.objects.create(
+            name="Test Game 3", release_date=datetime(2020, 6, 1), price=Decimal("5")
+        )
+        data, counted = counts({"filterBy": "year(2021,2020)&price(,50)"})
+        self.assertEqual((data["count"], counted), (3, True))
+
+        data, counted = counts({"count": "none", "pageSize": 2})
+        self.assertEqual(
+            (data["count"], data["count_exact"], counted), (None, False, False)
+        )
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIsNotNone(data["next"])
+        data, counted = counts({"count": "none", "pageSize": 2, "page": 2})
+        self.assertEqual(len(data["results"]), 1)
+        self.assertIsNone(data["next"])
+
+        response = self.client.get(url, {"count": "approximately"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test narrowing the output and the SQL with fields and include."""
+
+    def test_sparse_fieldsets(self):
+        self.game1.genres.add(self.genre)
+        self.game1.tags.add(self.tag)
+        url = reverse("get_games")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"fields": "name,price"})
+        self.assertEqual(set(response.data["results"][0]), {"id", "name", "price"})
+        self.assertFalse(any("about_the_game" in q["sql"] for q in queries))
+        self.assertFalse(any("api_genre" in q["sql"] for q in queries))
+
+        response = self.client.get(url, {"include": "genres"})
+        game = response.data["results"][0]
+        self.assertIn("about_the_game", game)
+        self.assertEqual(game["genres"], ["Genre"])
+        self.assertNotIn("tags", game)
+
+        response = self.client.get(
+            reverse("get_game"),
+            {"id": self.game1.id, "fields": "name", "include": "tags"},
+        )
+        self.assertEqual(
+            response.data, {"id": self.game1.id, "name": "Test Game 1", "tags": ["Tag"]}
+        )
+
+        for params in ({"fields": "name,secret"}, {"include": "name"}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test that serialize_games() renders games exactly as GameSerializer."""
+
+    def test_serialize_games(self):
+        Game.objects.filter(pk=self.game2.pk).update(
+            about_the_game="Über ✓",
+            price=Decimal("0"),
+            metacritic_score=None,
+            support_email="support@example.com",
+            website="https://example.com/",
+            mac=True,
+        )
+        tags = [Tag.objects.create(tag=f"Tag {i}") for i in range(3)]
+        # Added out of id order, which serializers output in id order
+        self.game1.tags.add(tags[2])
+        self.game1.tags.add(tags[0], self.tag)
+        self.game1.genres.add(self.genre)
+        self.game1.supported_languages.add(self.language)
+        self.game2.developers.add(self.developer)
+        self.game2.publishers.add(self.publisher)
+        self.game2.categories.add(self.category)
+        self.game2.full_audio_languages.add(self.audio_language)
+
+        renderer = JSONRenderer()
+        ids = [self.game2.id, self.game1.id, 999]
+        for fields in (None, {"id", "name", "price"}, {"id", "tags", "release_date"}):
+            games = optimize_queryset(
+                Game.objects.filter(pk__in=ids).order_by("-id"), GameSerializer, fields
+            )
+            expected = GameSerializer(games, many=True, fields=fields).data
+            with self.assertNumQueries(
+                1 + len(set(fields or GAME_RELATIONS) & set(GAME_RELATIONS))
+            ):
+                serialized = serialize_games(ids, fields)
+            self.assertEqual(renderer.render(serialized), renderer.render(expected))
+        self.assertEqual(serialized[1]["tags"], ["Tag", "Tag 0", "Tag 2"])
+        self.assertEqual(serialize_games([]), [])
+
     """Test filtering games by specific criteria."""
 
     def test_filtered_games(self):
@@ -181,6 +449,472 @@ class GameAPITests(TestCase):
         self.assertEqual(len(response.data["results"]), 1)
         self.assertEqual(response.data["results"][0]["name"], "Test Game 1")
 
+    """Test combining filter clauses, including price and required age ranges."""
+
+    def test_filter_grammar(self):
+        self.game1.genres.add(self.genre)
+        self.game2.required_age = 18
+        self.game2.mac = True
+        self.game2.save()
+        indie = Tag.objects.create(tag="Indie")
+        self.game1.tags.add(self.tag, indie)
+        self.game2.tags.add(indie)
+        self.game2.developers.add(self.developer)
+
+        cases = {
+            "genre(Genre)": ["Test Game 1"],
+            "genre(genre,Unknown)": ["Test Game 1"],
+            "genre(Gen)": [],
+            "tag(indie)": ["Test Game 1", "Test Game 2"],
+            "tag(any:Tag,Indie)": ["Test Game 1", "Test Game 2"],
+            "tag(all:Tag,Indie)": ["Test Game 1"],
+            "tag(all:Indie,Unknown)": [],
+            "developer(Developer)&tag(Indie)": ["Test Game 2"],
+            "platform(linux)": [],
+            "platform(windows,mac)": ["Test Game 2"],
+            "price(30,)": ["Test Game 2"],
+            "price(,30)&year(2020,2021)": ["Test Game 1"],
+            "requiredAge(0,16)": ["Test Game 1"],
+            "requiredAge(18,21)&platform(mac)": ["Test Game 2"],
+        }
+        for filter_by, names in cases.items():
+            response = self.client.get(reverse("get_games"), {"filterBy": filter_by})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([g["name"] for g in response.data["results"]], names)
+
+        # Renaming an attribute reloads the cached name lookups
+        indie.tag = "Independent"
+        indie.save()
+        response = self.client.get(reverse("get_games"), {"filterBy": "tag(indie)"})
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(
+            reverse("get_games"), {"filterBy": "tag(independent)"}
+        )
+        self.assertEqual(len(response.data["results"]), 2)
+
+        for filter_by, pagination in product(
+            (
+                "price(abc,)",
+                "requiredAge(1)",
+                "platform(amiga)",
+                "year(99999)",
+                "year(0)",
+            ),
+            ("page", "cursor"),
+        ):
+            response = self.client.get(
+                reverse("get_games"), {"filterBy": filter_by, "pagination": pagination}
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test that writes made by another worker process reach the in-memory indexes."""
+
+    def test_writes_from_other_workers(self):
+        url = reverse("get_games")
+        params = {"filterBy": "price(70,80)"}
+        self.assertEqual(self.client.get(url, params).data["count"], 0)
+
+        # Another worker updates the row, the shared counter and the change
+        # log, without the signals and the cache of this process: the written
+        # game is refreshed without rebuilding the index
+        Game.objects.filter(pk=self.game1.pk).update(price=Decimal("77.00"))
+        record_catalog_change({self.game1.pk})
+        caches["default"].clear()
+        with mock.patch.object(filter_index, "build", side_effect=AssertionError):
+            response = self.client.get(url, params)
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["price"], "77.00")
+
+        # Without a log entry for every missed generation, it is rebuilt
+        Game.objects.filter(pk=self.game2.pk).update(price=Decimal("75.00"))
+        bump_generation()
+        caches["default"].clear()
+        self.assertEqual(self.client.get(url, params).data["count"], 2)
+
+    """Test that the in-memory catalog matches the SQL filters and sorts, also after writes."""
+
+    def test_filter_index(self):
+        bits = bitset_from_positions([3, 9, 64, 65, 40000], 40001)
+        self.assertEqual(from_bitset(bits), [3, 9, 64, 65, 40000])
+        self.assertEqual(select_bits(bits, 2, 2), [64, 65])
+        self.assertEqual(select_bits(bits, 4, 10), [40000])
+
+        self.game1.genres.add(self.genre)
+        self.game1.tags.add(self.tag)
+        self.game1.metacritic_score = 80
+        self.game1.save()
+        self.game2.tags.add(self.tag)
+        self.game2.developers.add(self.developer)
+        self.game2.mac = True
+        self.game2.save()
+        filters = (
+            "",
+            "genre(Genre)",
+            "tag(Tag)&platform(mac)",
+            "tag(all:Tag,Unknown)",
+            "developer(Developer,Unknown)",
+            "platform(windows,mac)&genre(genre)",
+            "price(,30)",
+            "price(5,39.99)&tag(Tag)",
+            "year(2021,2022)",
+            "requiredAge(0,16)&year(2020)",
+        )
+        sorts = (None, "price", "metacritic_score", "release_date")
+
+        def check():
+            for filter_by, sort_field, descending in product(
+                filters, sorts, (False, True)
+            ):
+                games = filter_games(Game.objects.all(), filter_by)
+                if sort_field:
+                    key = F(sort_field)
+                    games = games.order_by(
+                        (
+                            key.desc(nulls_last=True)
+                            if descending
+                            else key.asc(nulls_last=True)
+                        ),
+                        "-id" if descending else "id",
+                    )
+                expected = list(games.values_list("id", flat=True))
+                matched = filter_index.match(filter_by, sort_field, descending)
+                self.assertEqual(len(matched), len(expected))
+                self.assertEqual(
+                    matched.ids(0, 10), expected, (filter_by, sort_field, descending)
+                )
+                self.assertEqual(matched.ids(1, 2), expected[1:2])
+
+        check()
+
+        # Writes are applied to the index in place
+        price_order = filter_index.orders["price"]
+        game3 = Game.objects.create(
+            name="Test Game 3",
+            release_date=datetime(2022, 1, 1),
+            price=Decimal("5"),
+            metacritic_score=80,
+            mac=True,
+        )
+        game3.genres.add(self.genre)
+        self.game2.tags.remove(self.tag)
+        self.game2.price = Decimal("4.99")
+        self.game2.save()
+        check()
+        self.game1.delete()
+        check()
+        self.assertIs(filter_index.orders["price"], price_order)
+
+        # Pages place games without a value last in both directions, whether
+        # the permutation is walked or, past SORT_RATIO, the matches are sorted
+        for size in (64, 200):
+            values = array(
+                "q", [NULL_VALUE if row % 3 == 0 else row % 5 for row in range(size)]
+            )
+            order = array("i", sorted(range(size), key=lambda row: (values[row], row)))
+            bits = bitset_from_positions([0, 1, 3, 4, 6, 10], size)
+            for descending, expected in (
+                (False, [10, 1, 4, 0, 3, 6]),
+                (True, [4, 1, 10, 6, 3, 0]),
+            ):
+                matched = MatchedGames(range(size), bits, order, values, descending)
+                self.assertEqual(matched.ids(0, 6), expected, (size, descending))
+
+        response = self.client.get(
+            reverse("get_games"), {"filterBy": "platform(mac)", "pageSize": 1}
+        )
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([g["name"] for g in response.data["results"]], ["Test Game 2"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([g["name"] for g in response.data["results"]], ["Test Game 3"])
+        self.assertIsNone(response.data["next"])
+
+    """Test facet counts against counting the filtered games, across writes."""
+
+    def test_facets(self):
+        self.game1.genres.add(self.genre)
+        self.game1.tags.add(self.tag)
+        self.game2.tags.add(self.tag)
+        self.game2.categories.add(self.category)
+        self.game2.mac = True
+        self.game2.save()
+        filters = ("", "tag(Tag)", "platform(mac)", "year(2020)&tag(tag)", "genre(x)")
+
+        def expected(filter_by):
+            counts = {}
+            games = filter_games(Game.objects.all(), filter_by)
+            for game in games.prefetch_related("genres", "tags", "categories"):
+                values = [
+                    *(("genres", g.genre) for g in game.genres.all()),
+                    *(("tags", t.tag) for t in game.tags.all()),
+                    *(("categories", c.category) for c in game.categories.all()),
+                    *(
+                        ("platforms", p)
+                        for p in ("windows", "mac", "linux")
+                        if getattr(game, p)
+                    ),
+                    ("years", game.release_date.year),
+                ]
+                for value in values:
+                    counts[value] = counts.get(value, 0) + 1
+            return games.count(), counts
+
+        def check():
+            for filter_by in filters:
+                response = self.client.get(
+                    reverse("get_game_facets"), {"filterBy": filter_by}
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                counts = {
+                    (kind, value.get("name", value.get("year"))): value["count"]
+                    for kind, values in response.data["facets"].items()
+                    for value in values
+                }
+                self.assertEqual(
+                    (response.data["count"], counts), expected(filter_by), filter_by
+                )
+
+        check()
+        response = self.client.get(reverse("get_game_facets"))
+        self.assertEqual(
+            response.data["facets"]["tags"],
+            [{"id": self.tag.id, "name": "Tag", "count": 2}],
+        )
+
+        # Counters follow the create, update and delete endpoints
+        payload = {
+            "name": "Test Game 3",
+            "release_date": "2020-06-01",
+            "price": "5.00",
+            "mac": True,
+            "supported_languages": ["English"],
+            "full_audio_languages": ["English"],
+            "developers": ["Developer"],
+            "publishers": ["Publisher"],
+            "categories": ["Category"],
+            "genres": ["Genre"],
+            "tags": ["Tag"],
+        }
+        response = self.client.post(reverse("create_game"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        check()
+        response = self.client.patch(
+            f"{reverse('update_game')}?id={self.game2.id}",
+            {"release_date": "2020-02-02", "mac": False},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        check()
+        self.client.delete(f"{reverse('delete_game')}?id={self.game1.id}")
+        check()
+
+        response = self.client.get(
+            reverse("get_game_facets"), {"filterBy": "price(x,)"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test streaming exports against the serializer, in both formats."""
+
+    def test_export_games(self):
+        self.game1.tags.add(self.tag)
+        self.game2.tags.add(self.tag)
+        self.game2.genres.add(self.genre)
+        url = reverse("export_games")
+
+        response = self.client.get(url, {"filterBy": "tag(Tag)"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        expected = GameSerializer(Game.objects.order_by("id"), many=True).data
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+        response = self.client.get(
+            url, {"output": "csv", "fields": "id,name,mac", "include": "genres"}
+        )
+        rows = list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(
+            rows,
+            [
+                ["id", "name", "mac", "genres"],
+                [str(self.game1.id), "Test Game 1", "false", ""],
+                [str(self.game2.id), "Test Game 2", "false", "Genre"],
+            ],
+        )
+        response = self.client.get(url, {"output": "csv", "filterBy": "genre(x)"})
+        self.assertEqual(b"".join(response.streaming_content).count(b"\n"), 1)
+
+        # Chunks are read with a constant number of queries each
+        games = optimize_queryset(Game.objects.all(), GameSerializer)
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(game_chunks(games, chunk_size=1))
+        self.assertEqual(
+            [[g.id for g in chunk] for chunk in chunks],
+            [[self.game1.id], [self.game2.id]],
+        )
+        # Two chunks, then an empty one ending the export
+        self.assertEqual(len(queries), 2 * (1 + len(GAME_RELATIONS)) + 1)
+
+        # Invalid requests are answered with a 400 before streaming starts
+        for params in (
+            {"output": "xml"},
+            {"filterBy": "price(x,)"},
+            {"filterBy": "year(99999)"},
+            {"fields": "x"},
+        ):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertFalse(response.streaming)
+
+    """Test caching rendered responses until the next write."""
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_response_cache(self):
+        url = reverse("get_games")
+        params = {"filterBy": "year(2020,2021)&price(,50)", "fields": "id,name"}
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        first = response.content
+
+        # The same query, with reordered parameters and clauses, is served as
+        # is; only the shared catalog counters are read
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, {"fields": "id,name", "filterBy": "price(,50)&YEAR(2021,2020)"}
+            )
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.content, first)
+        self.assertIn(b"Test Game 1", first)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        # A write makes it stale: one request recomputes it, and the others are
+        # served the stale response meanwhile
+        self.client.patch(
+            f"{reverse('update_game')}?id={self.game1.id}",
+            {"name": "Renamed"},
+            format="json",
+        )
+        key = response_cache_key("get_games", response.wsgi_request)
+        cache = caches[settings.RESPONSE_CACHE_ALIAS]
+        cache.add(f"{key}:revalidating", 1)
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(response.content, first)
+        cache.delete(f"{key}:revalidating")
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn(b"Renamed", response.content)
+        self.assertEqual(self.client.get(url, params)["X-Cache"], "HIT")
+
+        # Errors and the browsable API are not cached
+        response = self.client.get(url, {"filterBy": "price(x,)"})
+        self.assertEqual(
+            self.client.get(url, {"filterBy": "price(x,)"})["X-Cache"], "MISS"
+        )
+        response = self.client.get(url, params, HTTP_ACCEPT="text/html")
+        self.assertFalse(response.has_header("X-Cache"))
+
+    """Test conditional GET of a game and of a page of games."""
+
+    @override_settings(RESPONSE_CACHE=True)
+    def test_conditional_get(self):
+        url = reverse("get_game")
+        params = {"id": self.game1.id, "include": "genres"}
+        response = self.client.get(url, params)
+        etag = response["ETag"]
+        last_modified = response["Last-Modified"]
+
+        # A matching validator is answered from the version of the game and
+        # the shared catalog counters alone
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        response = self.client.get(url, params, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The ETag depends on the representation and on the game only
+        other = self.client.get(url, {"id": self.game1.id})["ETag"]
+        self.assertNotEqual(other, etag)
+        self.game2.save()
+        self.assertEqual(self.client.get(url, params)["ETag"], etag)
+
+        # Writes to the game or to its relations change its version
+        self.game1.genres.add(self.genre)
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["genres"], ["Genre"])
+        etag = response["ETag"]
+        self.genre.game_set.clear()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["genres"], [])
+
+        # The version is read from the database, so a write made by another
+        # worker, without the signals of this process, changes it too
+        etag = response["ETag"]
+        Game.objects.filter(pk=self.game1.pk).update(
+            updated_at=F("updated_at") + timedelta(seconds=1)
+        )
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(self.client.get(url, {"id": 0}).has_header("ETag"))
+
+        # Pages of games change with any write to the catalog
+        url = reverse("get_games")
+        params = {"filterBy": "year(2020)"}
+        etag = self.client.get(url, params)["ETag"]
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.game2.save()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    """Test assembling listings and recommendations from cached game fragments."""
+
+    def test_fragment_cache(self):
+        self.game1.genres.add(self.genre)
+        self.game1.tags.add(self.tag)
+        self.game2.genres.add(self.genre)
+        requests = [
+            ("get_games", {}),
+            ("get_games", {"sortBy": "price", "include": "genres,tags"}),
+            ("get_games", {"pagination": "cursor", "pageSize": 1, "sortBy": "price"}),
+            ("get_games", {"filterBy": "genre(Genre)", "count": "none"}),
+            ("get_recommended_games", {"id": self.game1.id, "include": "tags"}),
+            ("get_recommended_games_batch", {"ids": f"{self.game2.id},999"}),
+        ]
+
+        def assert_same_content():
+            for listing_index, (name, params) in product((True, False), requests):
+                with override_settings(GAME_LISTING_INDEX=listing_index):
+                    expected = self.client.get(reverse(name), params)
+                    with override_settings(GAME_FRAGMENT_CACHE=True):
+                        response = self.client.get(reverse(name), params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response["Content-Type"], "application/json")
+                self.assertEqual(response.content, expected.content)
+
+        assert_same_content()
+
+        # Cached fragments are served without loading or serializing games;
+        # only the shared catalog counters and the game versions are read
+        url = reverse("get_games")
+        with override_settings(GAME_FRAGMENT_CACHE=True), self.assertNumQueries(2):
+            response = self.client.get(url, {"include": "genres,tags"})
+        self.assertEqual(json.loads(response.content)["results"][0]["tags"], ["Tag"])
+
+        # Writes to a game, its relations or an attribute make its fragments stale
+        self.tag.tag = "Renamed Tag"
+        self.tag.save()
+        self.game2.genres.remove(self.genre)
+        self.game1.price = Decimal("9.99")
+        self.game1.save()
+        assert_same_content()
+        with override_settings(GAME_FRAGMENT_CACHE=True):
+            response = self.client.get(url, {"include": "genres,tags"})
+        results = json.loads(response.content)["results"]
+        self.assertEqual(results[0]["tags"], ["Renamed Tag"])
+        self.assertEqual(results[1]["genres"], [])
+
     """Test sorting games by specific fields."""
 
     def test_sorted_games(self):
@@ -190,6 +924,62 @@ class GameAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["results"][0]["name"], "Test Game 2")
 
+    """Test walking every sort order with cursor pagination."""
+
+    def test_cursor_pagination(self):
+        for i in range(9):
+            Game.objects.create(
+                name=f"Paged Game {i}",
+                release_date=datetime(2020 + i % 2, 1, 1),
+                price=Decimal(i % 3),
+                metacritic_score=None if i % 4 == 0 else 50 + i % 3,
+            )
+
+        def walk(params):
+            ids, url = [], reverse("get_games")
+            params = {"pagination": "cursor", "pageSize": 2, **params}
+            while url:
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotIn("count", response.data)
+                ids += [game["id"] for game in response.data["results"]]
+                url, params = response.data["next"], {}
+            return ids
+
+        self.assertEqual(
+            walk({}), list(Game.objects.order_by("id").values_list("id", flat=True))
+        )
+        for sort_by, field in (
+            ("metacriticScore", "metacritic_score"),
+            ("price", "price"),
+            ("releaseDate", "release_date"),
+        ):
+            for sort_order in ("asc", "desc"):
+                key = F(field).asc(nulls_last=True)
+                pk = "id"
+                if sort_order == "desc":
+                    key, pk = F(field).desc(nulls_last=True), "-id"
+                self.assertEqual(
+                    walk({"sortBy": sort_by, "sortOrder": sort_order}),
+                    list(Game.objects.order_by(key, pk).values_list("id", flat=True)),
+                )
+
+        # Malformed cursors, including sort values of the wrong type, are rejected
+        for cursor, sort_by in (
+            ("garbage", None),
+            (["release_date", True, [1], 3], "releaseDate"),
+            (["price", True, {"a": 1}, 3], "price"),
+            (["metacritic_score", True, "high", 3], "metacriticScore"),
+        ):
+            if not isinstance(cursor, str):
+                cursor = KeysetPagination().encode_cursor(cursor)
+            params = (
+                {"cursor": cursor, "sortBy": sort_by} if sort_by else {"cursor": cursor}
+            )
+            response = self.client.get(reverse("get_games"), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data["message"], "Invalid cursor")
+
     """Test retrieving recommended games based on a reference game."""
 
     def test_get_recommended_games(self):
@@ -214,3 +1004,381 @@ class GameAPITests(TestCase):
         # Test missing parameters
         response = self.client.get(reverse("get_recommended_games"))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecommendationIndexTests(TestCase):
+    """Set up a small catalog with overlapping genres, tags and categories."""
+
+    def setUp(self):
+        self.client = APIClient()
+        reset_indexes()
+
+        genres = [Genre.objects.create(genre=f"Genre {i}") for i in range(3)]
+        tags = [Tag.objects.create(tag=f"Tag {i}") for i in range(4)]
+        categories = [
+            Category.objects.create(category=f"Category {i}") for i in range(3)
+        ]
+
+        self.games = []
+        for i in range(12):
+            game = Game.objects.create(
+                name=f"Game {i}",
+                release_date=datetime(2020, 1, 1),
+                price=Decimal("9.99"),
+            )
+            game.genres.set(genres[: i % 3 + 1])
+            game.tags.set(tags[i % 4 : i % 4 + 2])
+            game.categories.set(categories[i % 2 :: 2])
+            self.games.append(game)
+
+        # A game sharing nothing with the rest of the catalog
+        Game.objects.create(
+            name="Loner", release_date=datetime(2020, 1, 1), price=Decimal("0.00")
+        )
+
+    """Reference implementation of the original full-scan scoring loop."""
+
+    def full_scan(self, reference_game, limit=5):
+        ref_genres = set(g.genre for g in reference_game.genres.all())
+        ref_tags = set(t.tag for t in reference_game.tags.all())
+        ref_categories = set(c.category for c in reference_game.categories.all())
+
+        scored_games = []
+        for game in Game.objects.exclude(pk=reference_game.pk):
+            score = len(ref_genres & set(g.genre for g in game.genres.all())) * 3
+            score += len(ref_tags & set(t.tag for t in game.tags.all())) * 2
+            score += len(
+                ref_categories & set(c.category for c in game.categories.all())
+            )
+            if score > 0:
+                scored_games.append((score, game))
+
+        scored_games.sort(key=lambda x: x[0], reverse=True)
+        return [game.id for score, game in scored_games[:limit]]
+
+    """Test that the index returns exactly what the full scan returned."""
+
+    def test_matches_full_scan(self):
+        for game in Game.objects.all():
+            url = f"{reverse('get_recommended_games')}?id={game.id}"
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [g["id"] for g in response.data["recommended_games"]],
+                self.full_scan(game),
+            )
+
+    """Test that writes are picked up without a full rebuild."""
+
+    def test_incremental_refresh(self):
+        reference_game = self.games[0]
+        recommendation_index.recommend(reference_game.id)
+
+        loner = Game.objects.get(name="Loner")
+        loner.genres.set(reference_game.genres.all())
+        loner.tags.set(reference_game.tags.all())
+        loner.categories.set(reference_game.categories.all())
+        self.games[1].delete()
+
+        self.assertEqual(
+            [
+                game_id
+                for game_id, _ in recommendation_index.recommend(reference_game.id)
+            ],
+            self.full_scan(reference_game),
+        )
+        self.assertIn(
+            loner.id,
+            [
+                game_id
+                for game_id, _ in recommendation_index.recommend(reference_game.id)
+            ],
+        )
+
+    """Test that stored recommendations stay exact across API writes."""
+
+    def test_materialized_recommendations(self):
+        call_command("build_recommendations", stdout=StringIO())
+
+        def assert_stored_matches_live():
+            for game in Game.objects.all():
+                stored = list(
+                    GameRecommendation.objects.filter(game=game).values_list(
+                        "neighbour_id", "score"
+                    )
+                )
+                self.assertEqual(stored, recommendation_index.recommend(game.id))
+
+        assert_stored_matches_live()
+
+        payload = {
+            "name": "Newcomer",
+            "release_date": "2024-01-01",
+            "price": "4.99",
+            "supported_languages": [],
+            "full_audio_languages": [],
+            "developers": [],
+            "publishers": [],
+            "genres": ["Genre 0", "Genre 1", "Genre 2"],
+            "categories": ["Category 0", "Category 1"],
+            "tags": ["Tag 0", "Tag 1", "Tag 2"],
+        }
+        response = self.client.post(reverse("create_game"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        assert_stored_matches_live()
+
+        url = f"{reverse('update_game')}?id={self.games[2].id}"
+        response = self.client.patch(url, {"tags": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        assert_stored_matches_live()
+
+        url = f"{reverse('delete_game')}?id={response.data['game']['id']}"
+        self.client.delete(url)
+        url = f"{reverse('delete_game')}?name=Newcomer"
+        self.client.delete(url)
+        assert_stored_matches_live()
+
+    """Test approximate recommendations against the exact recommender."""
+
+    def test_approximate_mode(self):
+        reference_game = self.games[0]
+        url = f"{reverse('get_recommended_games')}?id={reference_game.id}&mode=approx"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Shortlisted games are scored exactly, so results are a subset ranked the same way
+        exact = recommendation_index.score(
+            recommendation_index.features_of(reference_game.id)
+        )
+        scores = [exact[g["id"]] for g in response.data["recommended_games"]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+        # With single-row bands every game sharing an attribute is shortlisted
+        index = MinHashIndex(bands=64, rows=1, register=False)
+        self.assertEqual(
+            index.recommend(reference_game.id),
+            recommendation_index.recommend(reference_game.id),
+        )
+
+        url = f"{reverse('get_recommended_games')}?id={reference_game.id}&mode=fast"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test batch recommendations against the single-game endpoint."""
+
+    def test_batch_recommendations(self):
+        ids = [self.games[0].id, 999, self.games[5].id]
+        url = reverse("get_recommended_games_batch")
+        recommendation_index.ensure_current()
+        with self.assertNumQueries(11):
+            response = self.client.get(url, {"ids": ",".join(map(str, ids))})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["missing"], [999])
+
+        for pk, result in zip([ids[0], ids[2]], response.data["results"]):
+            single = self.client.get(reverse("get_recommended_games"), {"id": pk})
+            self.assertEqual(result["reference_game"], single.data["reference_game"])
+            self.assertEqual(
+                result["recommended_games"], single.data["recommended_games"]
+            )
+
+        response = self.client.get(url, {"ids": "1,abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test that constraints are applied before ranking recommendations."""
+
+    def test_constrained_recommendations(self):
+        reference_game = self.games[0]
+        eligible = {game.id for game in self.games[6:]}
+        Game.objects.filter(pk__in=eligible).update(price=Decimal("2.99"), mac=True)
+        expected = [
+            game_id
+            for game_id in self.full_scan(reference_game, limit=None)
+            if game_id in eligible
+        ][:5]
+
+        # The constraints are a bitset of the in-memory catalog, tested by id
+        matched = eligible_game_ids("platform(mac)&price(,5)")
+        self.assertEqual(
+            {game.id for game in self.games if game.id in matched}, eligible
+        )
+        self.assertNotIn(0, matched)
+        self.assertEqual(
+            matched.restrict({game.id: 1 for game in self.games}),
+            dict.fromkeys(eligible, 1),
+        )
+
+        for mode in ("exact", "approx"):
+            response = self.client.get(
+                reverse("get_recommended_games"),
+                {
+                    "id": reference_game.id,
+                    "mode": mode,
+                    "filterBy": "platform(mac)&price(,5)",
+                },
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids = [g["id"] for g in response.data["recommended_games"]]
+            self.assertTrue(set(ids) <= eligible)
+            if mode == "exact":
+                self.assertEqual(ids, expected)
+
+    """Test blending description similarity into recommendations."""
+
+    def test_text_mode(self):
+        reference_game = self.games[0]
+        Game.objects.filter(pk=reference_game.pk).update(
+            about_the_game="Tame dragons and duel wizards across floating islands."
+        )
+        loner = Game.objects.get(name="Loner")
+        Game.objects.filter(pk=loner.pk).update(
+            about_the_game="Wizards ride dragons between floating islands."
+        )
+        # Rebuilding the text index leaves the catalog generation alone
+        generation = get_generation()
+        call_command("build_text_index", stdout=StringIO())
+        self.assertEqual(get_generation(), generation)
+        self.assertEqual(get_generation(TEXT_GENERATION_KEY), 1)
+
+        url = reverse("get_recommended_games")
+        response = self.client.get(
+            url, {"id": reference_game.id, "mode": "text", "textWeight": "1"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["recommended_games"][0]["id"], loner.id)
+
+        # Without text the blend ranks like the exact recommender
+        response = self.client.get(
+            url, {"id": reference_game.id, "mode": "text", "textWeight": "0"}
+        )
+        self.assertEqual(
+            [g["id"] for g in response.data["recommended_games"]],
+            self.full_scan(reference_game),
+        )
+
+        response = self.client.get(
+            url, {"id": reference_game.id, "mode": "text", "textWeight": "2"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    """Test that bitset encodings round-trip and score pairs like the feature sets."""
+
+    def test_bitset_scoring(self):
+        encoder = BitsetEncoder()
+        bits = encoder.encode([40, 7, 1000])
+        self.assertEqual(popcount(bits), 3)
+        self.assertEqual(sorted(encoder.decode(bits)), [7, 40, 1000])
+        packed = pack_bitsets([bits, 0, bits], encoder.words())
+        self.assertEqual(unpack_bitset(packed, encoder.words(), 2), bits)
+
+        recommendation_index.ensure_current()
+        for game in self.games[:3]:
+            features = recommendation_index.features_of(game.id)
+            self.assertEqual(
+                recommendation_index.decode(recommendation_index.bits_of(game.id)),
+                features,
+            )
+            for other in self.games:
+                expected = sum(
+                    SIMILARITY_WEIGHTS[relation]
+                    for relation, _ in features
+                    & recommendation_index.features_of(other.id)
+                )
+                self.assertEqual(
+                    pair_score(
+                        recommendation_index.bits_of(game.id),
+                        recommendation_index.bits_of(other.id),
+                    ),
+                    expected,
+                )
+
+    """Test that workers map the snapshot file and swap to a new one when it is replaced."""
+
+    def test_recommendation_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            RECOMMENDATION_SNAPSHOT_PATH=os.path.join(directory, "snapshot")
+        ):
+            call_command("build_recommendation_snapshot", stdout=StringIO())
+            recommendation_index.reset()
+            recommendation_index.ensure_current()
+            snapshot = recommendation_index.current_snapshot()
+            self.assertIsNotNone(snapshot)
+            self.assertIsInstance(recommendation_index.col_indices, memoryview)
+            self.assertIsInstance(recommendation_index.column_keys, memoryview)
+
+            # Rows and columns are looked up in the mapped arrays themselves
+            for game in self.games:
+                self.assertEqual(
+                    [pk for pk, _ in recommendation_index.recommend(game.id)],
+                    self.full_scan(game),
+                )
+
+            # Served from the snapshot once the catalog generation is checked
+            reference_game = self.games[0]
+            with self.assertNumQueries(1):
+                recommendations = stored_recommendations_many([reference_game.id])
+            self.assertEqual(
+                [pk for pk, _ in recommendations[reference_game.id]],
+                self.full_scan(reference_game),
+            )
+
+            # A write makes the snapshot stale without rebuilding the index
+            self.games[1].tags.clear()
+            recommendation_index.ensure_current()
+            self.assertIsNone(recommendation_index.current_snapshot())
+            self.assertEqual(
+                [pk for pk, _ in recommendation_index.recommend(reference_game.id)],
+                self.full_scan(reference_game),
+            )
+
+            # A new snapshot file is picked up on the next read
+            call_command("build_recommendation_snapshot", stdout=StringIO())
+            recommendation_index.ensure_current()
+            self.assertIsNotNone(recommendation_index.current_snapshot())
+            self.assertNotEqual(recommendation_index.snapshot.key, snapshot.key)
+            self.assertEqual(
+                [pk for pk, _ in stored_recommendations(reference_game.id)],
+                self.full_scan(reference_game),
+            )
+
+            # Another worker, whose cache never saw the write, maps it too
+            caches["default"].clear()
+            recommendation_index.reset()
+            recommendation_index.ensure_current()
+            self.assertGreater(recommendation_index.snapshot.generation, 0)
+            self.assertIsNotNone(recommendation_index.current_snapshot())
+        recommendation_index.reset()
+
+    """Test that read endpoints run a fixed number of queries whatever they return."""
+
+    def test_constant_queries(self):
+        recommendation_index.ensure_current()
+        filter_index.ensure_current()
+
+        def queries(url, params):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse(url), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(captured)
+
+        self.assertEqual(
+            queries("get_games", {"pageSize": 2}),
+            queries("get_games", {"pageSize": 10, "count": "none"}),
+        )
+        self.assertEqual(
+            queries("get_games", {"pageSize": 2, "pagination": "cursor"}),
+            queries("get_games", {"pageSize": 10, "pagination": "cursor"}),
+        )
+        self.assertEqual(queries("get_game", {"id": self.games[0].id}), 10)
+        # Catalog counters, reference game id, stored recommendations, then the
+        # columns and the 7 relations of the reference game and its neighbours
+        self.assertEqual(queries("get_recommended_games", {"id": self.games[0].id}), 11)
+        self.assertEqual(
+            queries("get_recommended_games_batch", {"ids": str(self.games[0].id)}),
+            queries(
+                "get_recommended_games_batch",
+                {"ids": ",".join(str(game.id) for game in self.games)},
+            ),
+        )
@@ -0,0 +1,221 @@
+import heapq
+import math
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from .catalog import CatalogIndex
+from .models import GameTextVector
+from .recommendations import (
+    SIMILARITY_WEIGHTS,
+    RECOMMENDATION_LIMIT,
+    recommendation_index,
+)
+
+"""Number of hash buckets used for terms (the hashing trick)."""
+
+TERM_BUCKETS = 1 << 18
+
+"""Number of highest weighted terms kept per game."""
+
+TERMS_PER_GAME = 32
+
+"""How many times a game's name counts relative to its description."""
+
+NAME_BOOST = 3
+
+"""Counter versioning the stored vectors (see api.catalog.get_generation)."""
+
+TEXT_GENERATION_KEY = "catalog:text:generation"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by can for from has have in into is it its of on or
+    our that the their them then there these they this to was will with you your
+    game games play player players new more all one
+    """.split())
+
+
+"""Split text into lowercase terms, dropping stop words and very short tokens."""
+
+
+def tokenize(text):
+    return [
+        token
+        for token in TOKEN_PATTERN.findall((text or "").lower())
+        if len(token) > 2 and token not in STOP_WORDS
+    ]
+
+
+"""Return the hashed term counts of a game's name and description."""
+
+
+def term_counts(name, about_the_game):
+    counts = defaultdict(int)
+    for token in tokenize(name):
+        counts[zlib.crc32(token.encode()) % TERM_BUCKETS] += NAME_BOOST
+    for token in tokenize(about_the_game):
+        counts[zlib.crc32(token.encode()) % TERM_BUCKETS] += 1
+    return counts
+
+
+"""
+Return the packed (terms, weights) TF-IDF vector of a game.
+
+Parameters:
+    counts: Hashed term counts from term_counts()
+    idf: Mapping (or array) of term bucket to inverse document frequency
+
+Returns:
+    (array('I'), array('f')) holding the TERMS_PER_GAME best terms, sorted by
+    term id, with weights normalised to unit length
+"""
+
+
+def tfidf_vector(counts, idf):
+    weighted = heapq.nlargest(
+        TERMS_PER_GAME,
+        ((term, (1 + math.log(count)) * idf[term]) for term, count in counts.items()),
+        key=lambda item: item[1],
+    )
+    norm = math.sqrt(sum(weight * weight for _, weight in weighted)) or 1.0
+    weighted.sort()
+    return (
+        array("I", [term for term, _ in weighted]),
+        array("f", [weight / norm for _, weight in weighted]),
+    )
+
+
+"""
+In-memory inverted index over the stored TF-IDF vectors.
+
+Vectors are loaded from GameTextVector rows and kept as packed arrays per game,
+with an inverted index of term to (game ids, weights) for scoring. Because
+vectors have unit length, the cosine similarity of two games is the dot
+product of their vectors, accumulated over the reference game's terms only.
+
+Writes only reload the affected games' stored vectors: new or edited games are
+picked up the next time build_text_index runs. The index is versioned by its
+own counter, TEXT_GENERATION_KEY, bumped by build_text_index, so rebuilding it
+leaves the other indexes and the caches keyed by the catalog generation alone.
+Games deleted by another worker keep their vectors until then; the endpoints
+skip them when they load the recommended games.
+
+Attributes:
+    vectors: Game id to its (terms, weights) arrays
+    postings: Term id to (array of game ids, array of weights)
+    retired: Ids of removed games whose postings have not been rebuilt yet
+"""
+
+
+class TextIndex(CatalogIndex):
+    generation_key = TEXT_GENERATION_KEY
+
+    def __init__(self):
+        super().__init__()
+        self.vectors = {}
+        self.postings = {}
+        self.retired = set()
+
+    def _post(self, game_id, terms, weights):
+        for term, weight in zip(terms, weights):
+            if term not in self.postings:
+                self.postings[term] = (array("q"), array("f"))
+            game_ids, term_weights = self.postings[term]
+            game_ids.append(game_id)
+            term_weights.append(weight)
+
+    def _load(self, rows):
+        vectors = {}
+        for game_id, terms, weights in rows.iterator(chunk_size=5000):
+            vectors[game_id] = (array("I", bytes(terms)), array("f", bytes(weights)))
+        return vectors
+
+    def build(self):
+        self.vectors = self._load(
+            GameTextVector.objects.values_list("game_id", "terms", "weights")
+        )
+        self.postings = {}
+        self.retired = set()
+        for game_id, (terms, weights) in self.vectors.items():
+            self._post(game_id, terms, weights)
+
+    def refresh(self, game_ids):
+        vectors = self._load(
+            GameTextVector.objects.filter(game_id__in=list(game_ids)).values_list(
+                "game_id", "terms", "weights"
+            )
+        )
+        for game_id in game_ids:
+            old, new = self.vectors.pop(game_id, None), vectors.get(game_id)
+            if new is None:
+                # Postings of removed games stay behind and are skipped while scoring
+                if old is not None:
+                    self.retired.add(game_id)
+                continue
+            if (old is not None and old != new) or game_id in self.retired:
+                # Stale postings cannot be removed in place
+                self.build()
+                return
+            self.vectors[game_id] = new
+            if old is None:
+                self._post(game_id, *new)
+
+    """Return a {game_id: cosine similarity} mapping for games sharing a term."""
+
+    def similarities(self, game_id):
+        self.ensure_current()
+        scores = defaultdict(float)
+        terms, weights = self.vectors.get(game_id, ((), ()))
+        for term, weight in zip(terms, weights):
+            for other_id, other_weight in zip(*self.postings[term]):
+                scores[other_id] += weight * other_weight
+        scores.pop(game_id, None)
+        return {
+            other_id: score
+            for other_id, score in scores.items()
+            if other_id in self.vectors
+        }
+
+
+text_index = TextIndex()
+
+
+"""
+Return up to `limit` (game_id, score) pairs blending text and attribute similarity.
+
+The attribute score is divided by the reference game's score against itself so
+that both parts lie between 0 and 1, then:
+
+    score = (1 - text_weight) * attribute_score + text_weight * text_similarity
+
+Candidates are the games sharing an attribute or a term with the reference
+game. Ties are broken by ascending id; when `eligible` is given, only the game
+ids it contains are ranked.
+"""
+
+
+def blended_recommendations(
+    game_id, text_weight=0.5, limit=RECOMMENDATION_LIMIT, eligible=None
+):
+    recommendation_index.ensure_current()
+    features = recommendation_index.features_of(game_id) or frozenset()
+    attribute_scores = recommendation_index.score(features) if features else {}
+    attribute_scores.pop(game_id, None)
+    max_score = sum(SIMILARITY_WEIGHTS[relation] for relation, _ in features) or 1
+
+    text_scores = text_index.similarities(game_id)
+
+    if eligible is not None:
+        attribute_scores = eligible.restrict(attribute_scores)
+        text_scores = eligible.restrict(text_scores)
+
+    blended = {}
+    for other_id in attribute_scores.keys() | text_scores.keys():
+        score = (1 - text_weight) * attribute_scores.get(other_id, 0) / max_score
+        score += text_weight * text_scores.get(other_id, 0.0)
+        if score > 0:
+            blended[other_id] = round(score, 6)
+
+    return heapq.nsmallest(limit, blended.items(), key=lambda item: (-item[1], item[0]))
@@ -5,7 +5,12 @@ from drf_yasg import openapi
 from .api import (
     get_game,
     get_recommended_games,
+    get_recommended_games_batch,
     get_games,
+    get_game_facets,
+    export_games,
+    search_games,
+    autocomplete,
     create_game,
     update_game,
     delete_game,
@@ -40,9 +45,26 @@ urlpatterns = [
     path(
         "api/games/", get_games, name="get_games"
     ),  # GET - List games with filtering and pagination
+    path(
+        "api/games/facets/", get_game_facets, name="get_game_facets"
+    ),  # GET - Count games by genre, tag, category, platform and year
+    path(
+        "api/games/export/", export_games, name="export_games"
+    ),  # GET - Stream every matching game as NDJSON or CSV
+    path(
+        "api/games/search/", search_games, name="search_games"
+    ),  # GET - Search games by name and description
+    path(
+        "api/autocomplete/", autocomplete, name="autocomplete"
+    ),  # GET - Complete typed names of games and attributes
     path(
         "api/games/recommend/", get_recommended_games, name="get_recommended_games"
     ),  # GET - Get recommended games
+    path(
+        "api/games/recommend/batch/",
+        get_recommended_games_batch,
+        name="get_recommended_games_batch",
+    ),  # GET - Get recommended games for several reference games
     # API Documentation endpoints
     path(
         "swagger<format>/", schema_view.without_ui(cache_timeout=0), name="schema-json"
@@ -2,7 +2,6 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-
 # Load environment variables from .env file
 load_dotenv()
 
@@ -127,3 +126,64 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Swagger settings
 SWAGGER_SETTINGS = {"DEFAULT_MODEL_RENDERING": "model example"}
+
+# MinHash/LSH settings for approximate recommendations (mode=approx).
+# More bands or fewer rows per band raise recall at the cost of latency;
+# see `manage.py report_recommendation_recall` to compare configurations.
+RECOMMENDATION_LSH_BANDS = 16
+RECOMMENDATION_LSH_ROWS = 4
+
+# Recommendation snapshot written by `manage.py build_recommendation_snapshot`
+# and memory-mapped by every worker process (see api/snapshot.py)
+RECOMMENDATION_SNAPSHOT_PATH = os.getenv(
+    "RECOMMENDATION_SNAPSHOT_PATH", os.path.join(BASE_DIR, "recommendations.snapshot")
+)
+
+# Answer page-number game listings from the in-memory catalog of each worker
+# (see api/filter_index.py) instead of SQL; about 130 MiB per 1M games. Every
+# worker checks the catalog generation kept in the database before a read and
+# refreshes the games that other workers wrote, as logged in CatalogChange
+GAME_LISTING_INDEX = os.getenv("GAME_LISTING_INDEX", "true").lower() == "true"
+
+# Caches: "default" holds cached counts (keyed by the catalog generation, kept
+# in the database, see api/catalog.py); "responses" holds rendered responses
+# and "fragments" the rendered JSON of single games, apart so that they never
+# push the others out. Setting RESPONSE_CACHE_DIR keeps
+# responses in files shared by every worker of the host instead of in each
+# one's memory; entries are checked against the generations in the database,
+# so a write made by any worker makes them stale for all of them
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+    "responses": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "responses",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fragments",
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    },
+}
+if os.getenv("RESPONSE_CACHE_DIR"):
+    CACHES["responses"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("RESPONSE_CACHE_DIR"),
+    }
+
+# Cache the rendered responses of the read endpoints until the next write to
+# the catalog (see api/response_cache.py), in the cache named by the alias.
+# Off by default: cached responses are served as plain rendered bytes, not as
+# DRF Responses with .data
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "false").lower() == "true"
+RESPONSE_CACHE_ALIAS = "responses"
+
+# Assemble listings and recommendations from the cached JSON of each game,
+# serializing only the games missing from the cache (see api/fragments.py).
+# Off by default: assembled responses are plain rendered bytes, not DRF
+# Responses with .data
+GAME_FRAGMENT_CACHE = os.getenv("GAME_FRAGMENT_CACHE", "false").lower() == "true"
+GAME_FRAGMENT_CACHE_ALIAS = "fragments"
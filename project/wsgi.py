@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "project.settings")
 
 application = get_wsgi_application()
+
+# Build the in-memory catalog indexes once per worker instead of on the first request
+from api.catalog import warm_indexes  # noqa: E402
+
+warm_indexes()